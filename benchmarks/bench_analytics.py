@@ -0,0 +1,144 @@
+# ========== NG 趨勢報表效能基準：每日彙總表 vs 直接掃描判定結果 ==========
+# 以合成的多年判定結果建立結果資料庫，量測：
+#   - 每次匯出寫入（含彙總表增量更新）的時間，與從頭重算彙總表的時間
+#   - 報表頁面使用的查詢（期間 NG 率排行、週 / 月趨勢）在彙總表上的耗時，與同樣查詢直接掃描 results 的耗時
+# 用法：python benchmarks/bench_analytics.py [--years 1 3 5] [--forms-per-day 30] [--rows 15] [--repeat 7]
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_results  # noqa: E402
+
+SEED = 20240813
+MODELS = [f"FR{300 + i}" for i in range(20)]
+MODULES = ["200", "500", "600", "1000", "1200", "1500", "NA", "2000"]
+INSPECTORS = ["嚴瑋莉", "陳孟函", "羅文良", "鍾佳蓉"]
+ITEMS_PER_MODULE = 40
+
+
+def make_form(rng, model, module, rows):
+    # 每個項目有固定的 NG 機率（多數很低，少數偏高），看得出排行與趨勢
+    items = rng.sample(range(ITEMS_PER_MODULE), rows)
+    records = []
+    for no, item in enumerate(items, start=1):
+        base = 0.3 if item % 13 == 0 else 0.03
+        result = "NG" if rng.random() < base else ("N/A" if rng.random() < 0.05 else "OK")
+        records.append({"項次": no, "項目": f"{model}-{module} 點檢項目 {item}", "規範": "", "方法": "",
+                        "重要性": 0.5, "客訴編號": "", "判定結果": result})
+    return pd.DataFrame(records)
+
+
+def build(path, years, forms_per_day, rows, seed=SEED):
+    rng = random.Random(seed)
+    store = ipqc_results.ResultsStore(path)
+    last = date(2026, 9, 30)
+    first = last - timedelta(days=int(365 * years) - 1)
+    day = first
+    t0 = time.perf_counter()
+    while day <= last:
+        exports = []
+        for _ in range(forms_per_day):
+            model = rng.choice(MODELS)
+            module = rng.choice(MODULES)
+            exports.append({"form": make_form(rng, model, module, rows), "model": model, "modules": [module],
+                            "checker": rng.choice(INSPECTORS), "check_time": f"{day} {rng.randint(8, 17):02d}:00",
+                            "source": "bench"})
+        store.record_many(exports)   # 每天一個交易
+        day += timedelta(days=1)
+    return store, time.perf_counter() - t0, (first, last)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def scan_rates(store, keys, start, end):
+    # 不用彙總表：同樣的排行直接由 results 計算
+    where, params = store._where(start=start, end=end)
+    group = ", ".join(keys)
+    return store.query(
+        f"SELECT {group}, COUNT(*) AS rows, SUM(result != '') AS valid, SUM(result = 'NG') AS ng,"
+        " ROUND(100.0 * SUM(result = 'NG') / NULLIF(SUM(result != ''), 0), 2) AS ng_rate"
+        f" FROM results{where} GROUP BY {group} ORDER BY ng_rate DESC", params)
+
+
+def scan_trend(store, keys, start, end):
+    where, params = store._where(start=start, end=end)
+    period = ipqc_results.PERIODS["week"].replace("day", "checked_date")
+    group = ", ".join(keys)
+    return store.query(
+        f"SELECT {period} AS period, {group}, SUM(result = 'NG') AS ng, SUM(result != '') AS valid"
+        f" FROM results{where} GROUP BY period, {group}", params)
+
+
+def bench_queries(store, bounds, repeat):
+    first, last = bounds
+    recent = str(last - timedelta(weeks=12))
+    everything = (str(first), str(last))
+    top_items = [tuple(r) for r in store.ng_rates("item", start=recent, end=str(last), limit=8)
+                 [["model", "module", "item"]].itertuples(index=False)]
+    cases = [
+        ("排行：模組，近 12 週", lambda: store.ng_rates("module", start=recent, end=str(last)),
+         lambda: scan_rates(store, ["model", "module"], recent, str(last))),
+        ("排行：項目，全期間", lambda: store.ng_rates("item", start=everything[0], end=everything[1], min_valid=5, limit=20),
+         lambda: scan_rates(store, ["model", "module", "item"], *everything)),
+        ("排行：點檢人員，全期間", lambda: store.ng_rates("inspector", start=everything[0], end=everything[1]),
+         lambda: scan_rates(store, ["inspector"], *everything)),
+        ("週趨勢：機型，全期間", lambda: store.trend("model", "week", start=everything[0], end=everything[1]),
+         lambda: scan_trend(store, ["model"], *everything)),
+        ("月趨勢：單一機型各模組", lambda: store.trend("module", "month", model=MODELS[0], start=everything[0], end=everything[1]),
+         None),
+        ("週趨勢：NG 最高 8 個項目", lambda: store.trend("item", "week", start=everything[0], end=everything[1], keys=top_items),
+         None),
+    ]
+    report = []
+    for name, rollup, scan in cases:
+        report.append((name, timed(rollup, repeat), timed(scan, max(1, repeat // 3)) if scan else None))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC NG 趨勢報表效能基準")
+    parser.add_argument("--years", type=float, nargs="*", default=[1, 3])
+    parser.add_argument("--forms-per-day", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=15, help="每張表單的項目數")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work:
+        for years in args.years:
+            path = os.path.join(work, f"results_{years}y.sqlite")
+            store, seconds, bounds = build(path, years, args.forms_per_day, args.rows)
+            n_rows = store.query("SELECT COUNT(*) AS n FROM results")["n"][0]
+            n_rollup = store.query("SELECT COUNT(*) AS n FROM rollup_item")["n"][0]
+            print(f"\n=== {years:g} 年：判定結果 {n_rows:,} 列，項目彙總 {n_rollup:,} 列，"
+                  f"資料庫 {os.path.getsize(path) / 2 ** 20:.1f} MB（建立 {seconds:.1f} 秒）===")
+
+            rng = random.Random(SEED + 1)
+            form = make_form(rng, MODELS[0], MODULES[0], args.rows)
+            append_ms = timed(lambda: store.record(form, MODELS[0], [MODULES[0]], checker=INSPECTORS[0],
+                                                   check_time=f"{bounds[1]} 12:00", source="bench"), args.repeat)
+            rebuild_ms = timed(lambda: store.rebuild_rollups(), 1)
+            print(f"單次匯出寫入（含彙總增量更新）：{append_ms:.1f} ms；從頭重算彙總表：{rebuild_ms:.0f} ms")
+
+            print(f"{'查詢':<22} {'彙總表 (ms)':>12} {'掃描 results (ms)':>18}")
+            for name, rollup_ms, scan_ms in bench_queries(store, bounds, args.repeat):
+                scan = f"{scan_ms:.1f}" if scan_ms is not None else "-"
+                print(f"{name:<22} {rollup_ms:>12.1f} {scan:>18}")
+
+
+if __name__ == "__main__":
+    main()
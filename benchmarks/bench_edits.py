@@ -0,0 +1,82 @@
+# ========== 可編輯表格重跑成本：整份複製 vs 基底 + 編輯紀錄 ==========
+# 用法：python benchmarks/bench_edits.py [--sizes 1000 10000 100000] [--edits 10]
+# 原本每次重跑：編輯器回傳的兩張表存進 session、pd.concat 合併後計算必出現 / 其餘筆數。
+# 現在每次重跑：同步編輯紀錄並由紀錄增減筆數；完整表格只在抽樣 / 匯出時產生。
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_data  # noqa: E402
+import ipqc_edits  # noqa: E402
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "項目": [f"項目{i}" for i in range(n)],
+        "規範": "規範",
+        "方法": "目視",
+        "重要性": rng.choice([0, 0.5, 0.8, 1], size=n),
+        "客訴編號": "",
+        "判定結果": "",
+        "來源分頁": "sheet",
+    })
+
+
+def edit_state(n, edits, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(n, size=edits, replace=False)
+    return {"edited_rows": {int(r): {"重要性": 1.0} for r in rows}, "added_rows": [], "deleted_rows": []}
+
+
+def timed(fn, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="可編輯表格重跑成本")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--edits", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'筆數':>8} {'原本 (ms)':>10} {'紀錄 (ms)':>10} {'原本 session (KB)':>18} {'紀錄 session (KB)':>18}")
+    for n in args.sizes:
+        inspection, complaints = synthetic(n), synthetic(n // 10, seed=2)
+        state = edit_state(n, args.edits)
+
+        def legacy():
+            # 編輯器回傳套用編輯後的完整表格，存進 session，再合併計數
+            edited = inspection.copy()
+            for row, values in state["edited_rows"].items():
+                edited.iat[row, edited.columns.get_loc("重要性")] = values["重要性"]
+            session = {"ipqc_data": edited, "complaint_data": complaints.copy()}
+            merged = ipqc_data.item_pool(session["ipqc_data"], session["complaint_data"])
+            return session, len(merged[merged["重要性"] >= 1]), len(merged[merged["重要性"] < 1])
+
+        grids = (ipqc_edits.EditedFrame(inspection), ipqc_edits.EditedFrame(complaints))
+
+        def delta():
+            grids[0].sync(state)
+            grids[1].sync(None)
+            return ipqc_edits.pool_counts(*grids)
+
+        session, must, other = legacy()
+        assert delta() == (must + other, must)
+        t_legacy, t_delta = timed(legacy), timed(delta)
+        # 每次重跑新增的 session 資料：原本是兩張完整表格，現在只有編輯紀錄（基底只在切換機型 / 模組時存一次）
+        kb_legacy = len(pickle.dumps(session)) / 1024
+        kb_delta = len(pickle.dumps([(g.edited_rows, g.added_rows, g.deleted_rows) for g in grids])) / 1024
+        print(f"{n:>8} {t_legacy:>10.3f} {t_delta:>10.3f} {kb_legacy:>18.1f} {kb_delta:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# ========== 匯出效能基準：每張表單匯出時間（50 / 500 / 5,000 列） ==========
+# 用法：python benchmarks/bench_export.py [--repeat 5]
+# legacy_export() 保留原本 📤 匯出結果 的逐格建立樣式與兩次 wb.save 流程，作為對照組。
+# engine = 完整建立；template = 範本填入（openpyxl）；xml = 範本 + 直接寫 XML。
+import argparse
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableStyleInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_export  # noqa: E402
+
+SIZES = [50, 500, 5000]
+HEADER = dict(project_no="S022-0085", check_time="2025-08-12 09:30",
+              supervisor="王主管", checkedby="林作業員", checker="嚴瑋莉")
+
+
+def make_form(n_rows, complaint_ratio=0.2):
+    n_complaint = int(n_rows * complaint_ratio)
+    n_normal = n_rows - n_complaint
+    results = ["OK", "NG", "N/A", ""]
+    normal = pd.DataFrame({
+        "項次": range(1, n_normal + 1),
+        "項目": [f"確認第 {i} 項螺絲鎖附與標示是否符合規範" for i in range(n_normal)],
+        "規範": ["依照組立圖執行"] * n_normal,
+        "方法": ["目視+量測"] * n_normal,
+        "重要性": [0.5] * n_normal,
+        "客訴編號": [""] * n_normal,
+        "判定結果": [results[i % 4] for i in range(n_normal)],
+    })
+    separator = pd.DataFrame([{"項次": "", "項目": "👇 以下為客訴相關項目 👇", "規範": "", "方法": "",
+                               "重要性": "", "客訴編號": "", "判定結果": ""}])
+    complaint = pd.DataFrame({
+        "項次": range(n_normal + 2, n_normal + 2 + n_complaint),
+        "項目": [f"PLC 與 Devicenet 通訊異常 #{i}" for i in range(n_complaint)],
+        "規範": [""] * n_complaint,
+        "方法": [""] * n_complaint,
+        "重要性": [1] * n_complaint,
+        "客訴編號": [f"CC2412{i:05d}" for i in range(n_complaint)],
+        "判定結果": [results[i % 4] for i in range(n_complaint)],
+    })
+    return pd.concat([normal, separator, complaint], ignore_index=True)
+
+
+def legacy_export(edited_df, selected_model, selected_modules, project_no, check_time,
+                  supervisor, checkedby, checker):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "IPQC點檢"
+    ws["A1"] = "IPQC重點點檢表"
+    ws.merge_cells("A1:H1")
+    ws["A1"].font = Font(bold=True, size=14)
+    ws["A2"] = f"機型: {selected_model}    模組: {'/'.join(selected_modules) if isinstance(selected_modules, list) else selected_modules}"
+    ws.merge_cells("A2:H2")
+    ws["A2"].font = Font(bold=True, size=12)
+    ws["A3"] = f"專案序號: {project_no}    檢查時間: {check_time}"
+    ws.merge_cells("A3:H3")
+    ws["A3"].font = Font(bold=True, size=12)
+    headers = [str(col) for col in edited_df.columns]
+    start_row = 4
+    for col_num, col_name in enumerate(headers, start=1):
+        cell = ws.cell(row=start_row, column=col_num, value=col_name)
+        cell.font = Font(bold=True, size=12)
+        cell.fill = PatternFill("solid", fgColor="DDEBF7")
+        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        cell.border = Border(left=Side(style="medium"), right=Side(style="medium"),
+                             top=Side(style="medium"), bottom=Side(style="medium"))
+    filtered_rows = [
+        row for row in edited_df.values.tolist()
+        if any(pd.notna(cell) and str(cell).strip() != "" for cell in row)
+        and "以下為客訴相關項目" not in " ".join([str(cell) for cell in row if pd.notna(cell)])
+    ]
+    for idx, row in enumerate(filtered_rows, start=1):
+        row[0] = idx
+        for j, val in enumerate(row, start=1):
+            cell = ws.cell(row=start_row + idx, column=j, value=val)
+            cell.border = Border(left=Side(style="medium"), right=Side(style="medium"),
+                                 top=Side(style="medium"), bottom=Side(style="medium"))
+            cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
+    end_row = ws.max_row
+    end_col_letter = get_column_letter(len(headers))
+    table = Table(displayName="IPQCTable", ref=f"A{start_row}:{end_col_letter}{end_row}")
+    table.tableStyleInfo = TableStyleInfo(name="TableStyleMedium9", showRowStripes=False, showColumnStripes=False)
+    ws.add_table(table)
+    判定結果列表 = edited_df['判定結果'].dropna().tolist()
+    有效筆數 = len([r for r in 判定結果列表 if str(r).strip()])
+    NG筆數 = 判定結果列表.count("NG")
+    異常百分比 = (NG筆數 / 有效筆數) * 100 if 有效筆數 > 0 else 0
+    try:
+        判定結果_col = list(edited_df.columns).index("判定結果") + 1
+    except ValueError:
+        判定結果_col = len(edited_df.columns)
+    stats_col = 判定結果_col + 6
+    stats_row = start_row
+    ws.cell(row=stats_row, column=stats_col, value="統計資訊").font = Font(bold=True)
+    ws.cell(row=stats_row, column=stats_col).fill = PatternFill("solid", fgColor="DDEBF7")
+    ws.cell(row=stats_row, column=stats_col).border = Border(left=Side(style="medium"), right=Side(style="medium"),
+                                                             top=Side(style="medium"), bottom=Side(style="medium"))
+    ws.cell(row=stats_row, column=stats_col).alignment = Alignment(horizontal="center", vertical="center")
+    stats = [f"1. NG 異常率: {異常百分比:.2f}%", f"2. 異常數: {NG筆數}", f"3. 有效總數: {有效筆數}"]
+    for i, text in enumerate(stats, start=1):
+        cell = ws.cell(row=stats_row + i, column=stats_col, value=text)
+        cell.border = Border(left=Side(style="medium"), right=Side(style="medium"),
+                             top=Side(style="medium"), bottom=Side(style="medium"))
+        cell.alignment = Alignment(horizontal="left", vertical="center")
+    ws.append([])
+    confirm_row = ws.max_row + 3
+    ws.merge_cells(start_row=confirm_row, start_column=1, end_row=confirm_row, end_column=8)
+    ws.cell(row=confirm_row, column=1, value=f"主管確認: {supervisor}        被點檢人員確認: {checkedby}        點檢人員: {checker}")
+    ws.cell(row=confirm_row, column=1).font = Font(bold=True, size=12)
+    for col in ws.columns:
+        max_len = 0
+        col_letter = get_column_letter(col[0].column)
+        for cell in col:
+            if cell.value:
+                max_len = max(max_len, len(str(cell.value)))
+        adjusted_width = min(max_len + 2, 30)
+        if col_letter == "A":
+            ws.column_dimensions[col_letter].width = 6
+        else:
+            ws.column_dimensions[col_letter].width = adjusted_width
+    bio = io.BytesIO()
+    wb.save(bio)
+    download = bio.getvalue()
+    bio = io.BytesIO()
+    wb.save(bio)
+    return download
+
+
+def snapshot(data):
+    # 比對用：儲存格值、合併範圍、欄寬、表格範圍與可見樣式
+    ws = load_workbook(io.BytesIO(data)).active
+    cells = {}
+    for row in ws.iter_rows():
+        for c in row:
+            if c.value is not None or c.has_style:
+                cells[c.coordinate] = (c.value, c.font.b, c.font.sz, c.fill.fgColor.rgb,
+                                       c.border.left.style, c.alignment.horizontal, c.alignment.wrap_text)
+    widths = {k: v.width for k, v in ws.column_dimensions.items()}
+    tables = dict(ws.tables.items())
+    return cells, sorted(map(str, ws.merged_cells.ranges)), widths, tables
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 匯出效能基準")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    ipqc_export._template_parts()  # 範本每個行程只載入一次，不列入計時
+    modules = ["600", "1000"]
+    variants = {
+        "legacy": lambda form: legacy_export(form, "FR301", modules, **HEADER),
+        "engine": lambda form: ipqc_export.export_ipqc_xlsx(form, "FR301", modules, **HEADER),
+        "template": lambda form: ipqc_export.export_ipqc_template_xlsx(form, "FR301", modules, fast=False, **HEADER),
+        "xml": lambda form: ipqc_export.export_ipqc_template_xlsx(form, "FR301", modules, fast=True, **HEADER),
+    }
+    print(f"{'rows':>6} " + " ".join(f"{name + ' (s)':>14}" for name in variants) + "  layout")
+    for n in SIZES:
+        form = make_form(n)
+        expected = snapshot(variants["legacy"](form))
+        same = all(snapshot(fn(form)) == expected for fn in variants.values())
+        times = [timed(lambda: fn(form), args.repeat) for fn in variants.values()]
+        print(f"{n:>6} " + " ".join(f"{t:>14.4f}" for t in times) + f"  {'same' if same else 'DIFF'}")
+
+
+if __name__ == "__main__":
+    main()
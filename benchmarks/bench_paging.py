@@ -0,0 +1,62 @@
+# ========== 項目編輯器：整表 vs 伺服器端分頁 ==========
+# 用法：python benchmarks/bench_paging.py [--sizes 1000 10000 100000] [--page-size 100]
+# st.data_editor 每次重跑都把傳入的表格轉成 Arrow 送到瀏覽器（瀏覽器編輯後整份狀態再送回）。
+# 這裡比較每次重跑的 Arrow 轉換耗時與傳送大小，以及分頁時換頁 / 篩選（伺服器端重新計算）的耗時。
+import argparse
+import os
+import sys
+import time
+
+from streamlit import dataframe_util
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_edits  # noqa: E402
+from bench_edits import edit_state, synthetic, timed  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="項目編輯器分頁基準")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--edits", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'筆數':>8} {'整表重跑 (ms)':>14} {'整表傳送 (KB)':>14} {'分頁重跑 (ms)':>14} {'分頁傳送 (KB)':>14}"
+          f" {'換頁 (ms)':>10} {'篩選+排序 (ms)':>15}")
+    for n in args.sizes:
+        base = synthetic(n)
+        state = edit_state(min(n, args.page_size), args.edits)
+
+        full = ipqc_edits.EditedFrame(base)
+        positions, rows, _ = full.window()
+
+        def full_rerun():
+            dataframe_util.convert_anything_to_arrow_bytes(rows)
+            full.sync_page(positions, state)
+
+        paged = ipqc_edits.EditedFrame(base)
+        page_positions, page_rows, _ = paged.window(page=1, page_size=args.page_size)
+
+        def paged_rerun():
+            dataframe_util.convert_anything_to_arrow_bytes(page_rows)
+            paged.sync_page(page_positions, state)
+
+        pages = iter(range(2, 10 ** 6))
+
+        def turn_page():
+            paged.window(page=next(pages) % max(n // args.page_size, 1) + 1, page_size=args.page_size)
+
+        queries = iter(range(10 ** 6))
+
+        def filter_sort():
+            paged.window(f"項目{next(queries) % 10}", "項目", "重要性", False, 1, args.page_size)
+
+        kb_full = len(dataframe_util.convert_anything_to_arrow_bytes(rows)) / 1024
+        kb_page = len(dataframe_util.convert_anything_to_arrow_bytes(page_rows)) / 1024
+        print(f"{n:>8} {timed(full_rerun, 5):>14.2f} {kb_full:>14.1f} {timed(paged_rerun):>14.2f} {kb_page:>14.1f}"
+              f" {timed(turn_page):>10.2f} {timed(filter_sort, 5):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# ========== 頁面重跑延遲基準：整頁重跑 vs 分區（fragment）重跑 ==========
+# 用法：python benchmarks/bench_reruns.py [--before-rev HEAD~1] [--repeat 5] [--model FR301]
+# 以 streamlit.testing 的 AppTest 執行 try.py，對每一種操作量測一次重跑在伺服器端的耗時（中位數）。
+# AppTest 本身每次都整頁重跑，這裡在送出重跑要求時帶入操作所在 fragment 的 id，
+# 與瀏覽器中操作 fragment 內元件時送出的要求相同；舊版（沒有 fragment）則一律整頁重跑。
+# 只計算腳本執行緒的時間，並比照正式伺服器快取編譯後的腳本（AppTest 每次都重新編譯）。
+# 未設定 OneDrive 憑證時同步步驟會立即失敗，實際部署的差距只會更大。
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from streamlit.proto.WidgetStates_pb2 import WidgetState, WidgetStates
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+_bytecode = {}
+_get_bytecode = ScriptCache.get_bytecode
+
+
+def _cached_bytecode(self, path):
+    if path not in _bytecode:
+        _bytecode[path] = _get_bytecode(self, path)
+    return _bytecode[path]
+
+
+ScriptCache.get_bytecode = _cached_bytecode
+
+_run_times = []
+_run_script = ScriptRunner._run_script
+
+
+def _timed_run_script(self, rerun_data):
+    t0 = time.perf_counter()
+    try:
+        return _run_script(self, rerun_data)
+    finally:
+        _run_times.append(time.perf_counter() - t0)
+
+
+ScriptRunner._run_script = _timed_run_script
+
+
+@contextlib.contextmanager
+def fragment_scope(fragment_id):
+    # 讓下一次重跑只執行指定的 fragment（所有重跑要求都帶入同一個 fragment id，合併後仍只跑該區塊）
+    original = ScriptRequests.request_rerun
+
+    def request_rerun(self, rerun_data):
+        if fragment_id:
+            rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=[fragment_id])
+        return original(self, rerun_data)
+
+    ScriptRequests.request_rerun = request_rerun
+    try:
+        yield
+    finally:
+        ScriptRequests.request_rerun = original
+
+
+def fragment_id(at, key):
+    ids = at._fragment_storage._ids_by_target_key.get(key)
+    return next(iter(ids)) if ids else None
+
+
+def editors(at):
+    return [n for n in at._tree if getattr(n, "type", None) == "dataframe" and n.proto.editing_mode]
+
+
+def timed_run(at, key, extra=None):
+    # 以目前的元件狀態（加上 extra）重跑一次，回傳腳本執行秒數
+    states = WidgetStates()
+    extra = extra or {}
+    for ws in at._tree.get_widget_states().widgets:
+        if ws.id not in extra:
+            states.widgets.append(ws)
+    for widget_id, value in extra.items():
+        states.widgets.append(WidgetState(id=widget_id, string_value=value))
+    scoped = fragment_id(at, key)
+    _run_times.clear()
+    with fragment_scope(scoped):
+        at._run(states)
+    elapsed = sum(_run_times)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if scoped:
+        # fragment 重跑後的元素樹只含該區塊，整頁重跑一次（不計時）以便下一個操作找得到元件
+        at.run()
+    return elapsed
+
+
+def edit(row, column, value):
+    return json.dumps({"edited_rows": {str(row): {column: value}}, "added_rows": [], "deleted_rows": []},
+                      ensure_ascii=False)
+
+
+def prepare(script, model):
+    at = AppTest.from_file(script, default_timeout=120).run()
+    [s for s in at.selectbox if s.label == "選擇機型"][0].select(model).run()
+    [m for m in at.multiselect if m.label == "選擇模組（可複選）"][0].select("全部項目").run()
+    [b for b in at.button if "執行抽樣" in b.label][0].click().run()
+    return at
+
+
+def measure(script, model, repeat):
+    at = prepare(script, model)
+    results = {}
+
+    def record(name, key, action):
+        times = []
+        for i in range(repeat):
+            extra = action(i)
+            times.append(timed_run(at, key, extra))
+        results[name] = statistics.median(times) * 1000
+
+    def toggle_archive(i):
+        boxes = [c for c in at.checkbox if c.key and c.key.startswith("chk_")]
+        if boxes:
+            boxes[0].set_value(i % 2 == 0)
+
+    def edit_pool(i):
+        widget = editors(at)[0]
+        return {widget.proto.id: edit(0, "重要性", 1 if i % 2 else 0.5)}
+
+    def edit_result(i):
+        widget = editors(at)[-1]
+        return {widget.proto.id: edit(0, "判定結果", "OK" if i % 2 else "NG")}
+
+    def click_sample(i):
+        [b for b in at.button if "執行抽樣" in b.label][0].click()
+
+    def submit_export(i):
+        [b for b in at.button if "匯出結果" in b.label][0].click()
+
+    record("勾選已儲存表單", "archive", toggle_archive)
+    record("編輯點檢項目", "editors", edit_pool)
+    record("執行抽樣", "editors", click_sample)
+    record("填寫判定結果", "export_form", edit_result)
+    record("匯出結果", "export_form", submit_export)
+    record("整頁重跑", None, lambda i: None)
+    return results
+
+
+def script_at(rev):
+    # 從 git 取出舊版 try.py，放在專案根目錄以使用相同的相對路徑
+    source = subprocess.run(["git", "show", f"{rev}:try.py"], cwd=ROOT, check=True,
+                            capture_output=True).stdout
+    path = os.path.join(ROOT, f".bench_try_{rev.replace('~', '_').replace('^', '_')}.py")
+    with open(path, "wb") as f:
+        f.write(source)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 頁面重跑延遲基準")
+    parser.add_argument("--before-rev", help="比較用的舊版（git revision），例如 HEAD~1")
+    parser.add_argument("--model", default="FR301")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    after = measure(os.path.join(ROOT, "try.py"), args.model, args.repeat)
+    before = None
+    if args.before_rev:
+        path = script_at(args.before_rev)
+        try:
+            before = measure(path, args.model, args.repeat)
+        finally:
+            os.remove(path)
+
+    print(f"{'操作':<10} {'修改前 (ms)':>12} {'修改後 (ms)':>12} {'加速':>7}")
+    for name, t_after in after.items():
+        if before is None:
+            print(f"{name:<10} {'-':>12} {t_after:>12.1f} {'-':>7}")
+        else:
+            t_before = before[name]
+            print(f"{name:<10} {t_before:>12.1f} {t_after:>12.1f} {t_before / t_after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# ========== 抽樣效能基準：原本 DataFrame.sample 路徑 vs 向量化抽樣引擎 ==========
+# 用法：python benchmarks/bench_sampling.py [--inspection ...] [--complaint ...] [--draws 200]
+# 項目池為整份資料（所有機型 / 模組的點檢 + 客訴項目）。
+# 依近期 NG 調整：以合成的判定結果歷史，量測各機型「全部項目」查近期 NG 計數 + 加權抽樣的耗時。
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_data  # noqa: E402
+import ipqc_results  # noqa: E402
+import ipqc_sampling  # noqa: E402
+
+
+def full_pool(dataset):
+    parts = []
+    for model in dataset.models():
+        parts.append(dataset.item_pool(model, dataset.modules(model)))
+    return pd.concat(parts, ignore_index=True)
+
+
+def legacy_draw(merged_all, sample_count):
+    # 原本 🔍 執行抽樣 的流程
+    merged_all = merged_all.copy()
+    merged_all["重要性"] = pd.to_numeric(merged_all["重要性"], errors="coerce").fillna(0)
+    fixed = merged_all[merged_all['重要性'] >= 1]
+    remaining = merged_all[merged_all['重要性'] < 1]
+    remain_count = sample_count - len(fixed)
+    if remain_count > 0:
+        weights = remaining['重要性'].tolist()
+        sampled = remaining.sample(n=remain_count, weights=weights) if not remaining.empty else pd.DataFrame()
+        return pd.concat([fixed, sampled])
+    return fixed.sample(n=sample_count)
+
+
+def legacy_floor_draw(merged_all, sample_count, floor):
+    # 同樣流程但先套用下限權重，讓原本的路徑也能完成抽樣以比較速度
+    merged_all = merged_all.copy()
+    merged_all["重要性"] = pd.to_numeric(merged_all["重要性"], errors="coerce").fillna(0)
+    fixed = merged_all[merged_all['重要性'] >= 1]
+    remaining = merged_all[merged_all['重要性'] < 1]
+    remain_count = sample_count - len(fixed)
+    weights = np.maximum(remaining['重要性'].to_numpy(), floor)
+    rng = np.random.default_rng()
+    picks = rng.choice(len(remaining), size=min(remain_count, len(remaining)), replace=False, p=weights / weights.sum())
+    return pd.concat([fixed, remaining.iloc[picks]])
+
+
+def fake_history(store, dataset, forms_per_model, seed=20240813):
+    # 每個機型 forms_per_model 張已填寫的表單（最近一年內），每個項目有固定的 NG 機率
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    exports = []
+    for model in dataset.models():
+        pool = dataset.item_pool(model, dataset.modules(model))
+        ng_prob = np.where(rng.random(len(pool)) < 0.1, 0.3, 0.02)
+        for _ in range(forms_per_model):
+            rows = rng.choice(len(pool), size=min(15, len(pool)), replace=False)
+            form = pool.iloc[rows].copy()
+            form["判定結果"] = np.where(rng.random(len(rows)) < ng_prob[rows], "NG", "OK")
+            layout = ipqc_data.layout_form(form)
+            day = today - pd.Timedelta(days=int(rng.integers(0, 365)))
+            exports.append({"form": layout[ipqc_data.FORM_COLUMNS], "model": model, "modules": dataset.modules(model),
+                            "row_modules": layout[ipqc_data.MODULE_COLUMN].fillna("").tolist(),
+                            "check_time": f"{day:%Y-%m-%d} 10:00", "source": "bench"})
+    store.record_many(exports)
+
+
+def bench_adaptive(dataset, forms_per_model, repeat):
+    with tempfile.TemporaryDirectory() as work:
+        store = ipqc_results.ResultsStore(os.path.join(work, "results.sqlite"))
+        t0 = time.perf_counter()
+        fake_history(store, dataset, forms_per_model)
+        n_scores = store.query("SELECT COUNT(*) AS n FROM ng_scores")["n"][0]
+        print(f"\n依近期 NG 調整：合成 {forms_per_model} 張表單 / 機型（{time.perf_counter() - t0:.1f}s），"
+              f"近期 NG 計數 {n_scores} 個項目")
+        print(f"{'機型':<10} {'項目池':>6} {'有紀錄':>6} {'查計數 (ms)':>12} {'加權抽樣 (ms)':>14} {'原本抽樣 (ms)':>14}")
+        models = sorted(dataset.models(), key=lambda m: -len(dataset.item_pool(m, dataset.modules(m))))[:5]
+        for model in models:
+            pool = dataset.item_pool(model, dataset.modules(model))
+            count = min(int((ipqc_sampling.importance_of(pool) >= 1).sum()) + 10, len(pool))
+            history = store.pool_history(pool, model)
+            rate = ipqc_sampling.recent_ng_rate(history)
+            t_lookup = timed(lambda: store.pool_history(pool, model), repeat) * 1000
+            t_draw = timed(lambda: ipqc_sampling.draw_sample(pool, count, seed=1, ng_rate=rate), repeat) * 1000
+            t_plain = timed(lambda: ipqc_sampling.draw_sample(pool, count, seed=1), repeat) * 1000
+            print(f"{model:<10} {len(pool):>6} {int((history['valid'] > 0).sum()):>6} {t_lookup:>12.2f}"
+                  f" {t_draw:>14.3f} {t_plain:>14.3f}")
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 抽樣效能基準")
+    parser.add_argument("--inspection", default=ipqc_data.INSPECTION_PATH)
+    parser.add_argument("--complaint", default=ipqc_data.COMPLAINT_PATH)
+    parser.add_argument("--draws", type=int, default=200)
+    parser.add_argument("--history-forms", type=int, default=200, help="依近期 NG 調整：每個機型合成的表單數（0 不量測）")
+    args = parser.parse_args(argv)
+
+    dataset = ipqc_data.load_dataset(args.inspection, args.complaint)
+    pool = full_pool(dataset)
+    importance = ipqc_sampling.importance_of(pool)
+    n_fixed = int((importance >= 1).sum())
+    print(f"項目池 {len(pool)} 筆（必出現 {n_fixed}，其餘 {len(pool) - n_fixed}，其中權重為 0：{int((importance == 0).sum())}）")
+
+    floor = ipqc_sampling.FLOOR_WEIGHT
+    counts = [n_fixed + 5, n_fixed + 50, len(pool)]
+    print(f"{'抽樣數':>6} {'原本路徑':>14} {'原本+下限 (ms)':>16} {'引擎 (ms)':>10}")
+    for count in counts:
+        count = min(count, len(pool))
+        failures = 0
+        for _ in range(20):
+            try:
+                legacy_draw(pool, count)
+            except ValueError:
+                failures += 1
+        legacy = "失敗 %d/20" % failures if failures else "%.3f ms" % (timed(lambda: legacy_draw(pool, count), args.draws) * 1000)
+        t_floor = timed(lambda: legacy_floor_draw(pool, count, floor), args.draws) * 1000
+        t_engine = timed(lambda: ipqc_sampling.draw_sample(pool, count, seed=1), args.draws) * 1000
+        print(f"{count:>6} {legacy:>14} {t_floor:>16.3f} {t_engine:>10.3f}")
+
+    # 一次抽出多組方案 vs 逐一抽樣
+    plans, count = 1000, min(n_fixed + 20, len(pool))
+    t_loop = timed(lambda: [ipqc_sampling.draw_sample(pool, count, seed=s) for s in range(plans)], 1)
+    t_batch = timed(lambda: ipqc_sampling.draw_positions(importance, count, 1, floor, plans), 1)
+    print(f"{plans} 組方案（各 {count} 筆）：逐一 {t_loop:.3f}s，一次向量化 {t_batch:.4f}s")
+
+    # 分層抽樣：各層配額 + 單次向量化抽出；與不分層比較未涵蓋的層數
+    by = ["source", "kind", "tier"]
+    count = min(ipqc_sampling.min_full_coverage(pool, by) + 10, len(pool))
+    t_strat = timed(lambda: ipqc_sampling.draw_stratified(pool, count, by, seed=1), args.draws) * 1000
+    report = ipqc_sampling.coverage_report(pool, count, by)
+    print(f"分層抽樣（{count} 筆，{len(report)} 層）：{t_strat:.3f} ms；"
+          f"預期涵蓋層數 分層 {report['分層涵蓋率'].sum():.2f} / 不分層 {report['不分層涵蓋率'].sum():.2f}")
+
+    # 分布檢查：指數鍵抽樣的入選機率應與逐次依權重抽出相同
+    w = np.array([0.5, 0.3, 0.1, 0.05, 0.05])
+    trials = 20000
+    keys = ipqc_sampling.draw_positions(np.array(w), 2, 7, floor=0, plans=trials)
+    engine_freq = np.bincount(keys.ravel(), minlength=len(w)) / trials
+    rng = np.random.default_rng(7)
+    seq = np.array([rng.choice(len(w), 2, replace=False, p=w / w.sum()) for _ in range(trials)])
+    seq_freq = np.bincount(seq.ravel(), minlength=len(w)) / trials
+    print("入選機率 引擎:", np.round(engine_freq, 3), " 逐次:", np.round(seq_freq, 3))
+
+    if args.history_forms:
+        bench_adaptive(dataset, args.history_forms, max(1, args.draws // 4))
+
+
+if __name__ == "__main__":
+    main()
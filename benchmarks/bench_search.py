@@ -0,0 +1,97 @@
+# ========== 客訴全文搜尋效能基準：n-gram 倒排索引 vs 每次逐列子字串比對 ==========
+# 以實際的客訴 / 點檢資料為樣本放大成多年份的合成客訴（隨機換機型、模組並插入常見異常詞），量測：
+#   - 建立索引的時間與 gram 數（每個資料集版本一次，在背景暖身時完成）
+#   - 頁面搜尋（單一 / 多個關鍵字、限定機型）在索引上的耗時，與同樣條件用 str.contains 掃描所有欄位的耗時
+# 用法：python benchmarks/bench_search.py [--rows 5000 50000] [--repeat 7]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ipqc_data  # noqa: E402
+import ipqc_search  # noqa: E402
+
+SEED = 20240813
+PHRASES = ["刮傷", "異音", "漏氣", "螺絲未鎖緊", "接頭鬆脫", "通訊異常", "線材干涉", "氧含量異常", "Devicenet 斷線", "標籤錯誤"]
+QUERIES = [("刮傷", False), ("刮傷 / 異音", True), ("通訊異常", False), ("devicenet", True), ("接", True), ("CC23", False)]
+
+
+def synthetic(dataset, rows, seed=SEED):
+    # 以既有客訴為樣本：換機型 / 模組 / 編號並在問題描述中插入常見異常詞
+    rng = random.Random(seed)
+    sample = dataset.complaint_df
+    texts = sample["問題描述"].dropna().astype(str).tolist() or ["外觀異常"]
+    models = dataset.models()
+    records = []
+    for i in range(rows):
+        text = rng.choice(texts)
+        cut = rng.randrange(len(text) + 1)
+        text = text[:cut] + rng.choice(PHRASES) + text[cut:] if rng.random() < 0.3 else text
+        day = pd.Timestamp("2020-01-01") + pd.Timedelta(days=rng.randrange(365 * 6))
+        model = rng.choice(models)
+        records.append({"機型": model, "模組": rng.choice(dataset.modules(model) or ["NA"]),
+                        "客訴編號": f"CC{day:%y%m%d}-{i % 1000:03d}", "問題描述": text,
+                        "客訴單異常類別": rng.choice(["組裝異常", "外觀異常", "功能異常"]),
+                        "立即改善對策": rng.choice(texts[::-1]), "建立日期": day, "來源分頁": f"{day:%Y}"})
+    return pd.DataFrame(records)
+
+
+def scan(frame, inspection, query, models=None):
+    # 不用索引：每次以 str.contains 比對所有索引欄位（與搜尋相同的正規化）
+    total = 0
+    for kind, data in (("complaint", frame), ("inspection", inspection)):
+        if models:
+            data = data[data["機型"].isin(models)]
+        mask = pd.Series(False, index=data.index)
+        for col in ipqc_search.FIELDS[kind]:
+            if col not in data.columns:
+                continue
+            text = data[col].map(ipqc_search.normalize)
+            for term in ipqc_search.split_query(query):
+                mask |= text.str.contains(term, regex=False)
+        total += int(mask.sum())
+    return total
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 客訴全文搜尋效能基準")
+    parser.add_argument("--inspection", default=ipqc_data.INSPECTION_PATH)
+    parser.add_argument("--complaint", default=ipqc_data.COMPLAINT_PATH)
+    parser.add_argument("--rows", type=int, nargs="*", default=[5000, 50000], help="合成客訴筆數")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    dataset = ipqc_data.load_dataset(args.inspection, args.complaint)
+    model = dataset.models()[0]
+    for rows in args.rows:
+        complaints = synthetic(dataset, rows)
+        t0 = time.perf_counter()
+        index = ipqc_search.SearchIndex(dataset.df, complaints)
+        build = time.perf_counter() - t0
+        print(f"\n=== 客訴 {rows:,} 筆 + 點檢項目 {len(dataset.df):,} 筆：建立索引 {build:.2f}s，gram {len(index.postings):,} 個 ===")
+        print(f"{'關鍵字':<16} {'限定機型':>8} {'符合':>7} {'索引 (ms)':>10} {'逐列比對 (ms)':>14}")
+        for query, per_model in QUERIES:
+            models = [model] if per_model else None
+            hits = index.search(query, models=models, limit=None)
+            assert len(hits) == scan(complaints, dataset.df, query, models), query
+            t_index = timed(lambda: index.search(query, models=models), args.repeat)
+            t_scan = timed(lambda: scan(complaints, dataset.df, query, models), max(1, args.repeat // 3))
+            print(f"{query:<16} {model if per_model else '-':>8} {len(hits):>7,} {t_index:>10.2f} {t_scan:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# ========== 效能基準套件（實際資料檔，無畫面） ==========
+# 用法：
+#   python benchmarks/bench_suite.py                                 # 全部案例，輸出表格
+#   python benchmarks/bench_suite.py --output bench.json             # 另存機器可讀結果
+#   python benchmarks/bench_suite.py --baseline bench.json --threshold 0.2   # 與先前結果比較，變慢超過門檻時結束碼為 1
+#   python benchmarks/bench_suite.py --cases sample export --repeat 15
+#   python benchmarks/bench_suite.py --scales 1 10 100               # 以合成活頁簿看讀取 / 篩選 / 抽樣 / 匯出隨資料量的變化
+# 涵蓋：讀取活頁簿、模組欄位清洗、建立索引、機型 / 模組篩選、抽樣、xlsx 匯出、zip 打包。
+# 每個案例先暖身再重複量測，記錄中位數與最小值；亂數種子固定，輸入檔記錄 sha256。
+# 與基準比較時，看起來退步的案例會再重測（--retries），取最好的一次，避免偶發的負載誤報。
+# 為了跨機器 / 跨次比較，每個案例前後各量一次固定的校正運算，比較時使用「最小值 ÷ 校正時間」
+# （最小值受其他程序干擾最少，與 timeit 的做法相同；就近校正可抵銷執行期間機器負載的變化）。
+import argparse
+import gc
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import ipqc_batch  # noqa: E402
+import ipqc_data  # noqa: E402
+import ipqc_export  # noqa: E402
+import ipqc_sampling  # noqa: E402
+import synth_workbooks  # noqa: E402
+
+SCHEMA = "ipqc-bench/1"
+DEFAULT_COMPLAINT = "data/客訴調查總表 2.xlsx"   # 版本庫中的客訴總表（頁面使用的檔名為上傳後的複本）
+SEED = 20240813
+NOISE_FLOOR_S = 0.0005   # 差距小於 0.5 ms 時不視為退步
+SCALING_CASES = ["ingest", "filter", "sample", "export_200"]
+
+
+# ========== 量測 ==========
+def measure(fn, repeat, warmup=1, min_sample_s=0.02):
+    # 短的案例在每次取樣中連續執行多次（至少約 20 ms），降低計時與排程的雜訊；回傳每次呼叫的秒數
+    t0 = time.perf_counter()
+    for _ in range(max(warmup, 1)):
+        fn()
+    once = (time.perf_counter() - t0) / max(warmup, 1)
+    number = max(1, int(min_sample_s / once) if once > 0 else 1)
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - t0) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    q1, _, q3 = statistics.quantiles(times, n=4) if len(times) >= 2 else (times[0], None, times[0])
+    return {"median_s": statistics.median(times), "min_s": min(times), "iqr_s": q3 - q1,
+            "repeat": repeat, "number": number}
+
+
+def calibration(repeat=5):
+    # 固定的 NumPy + 純 Python 運算，用來換算不同機器 / 負載下的相對速度
+    rng = np.random.default_rng(0)
+    data = rng.random(500_000)
+    words = [f"項目{i % 997}" for i in range(200_000)]
+
+    def work():
+        np.sort(data)
+        sorted(words)
+        sum(i * i for i in range(200_000))
+
+    return measure(work, repeat)["min_s"]
+
+
+def run_case(fn, repeat, warmup):
+    before = calibration()
+    result = measure(fn, repeat, warmup)
+    result["calibration_s"] = min(before, calibration())
+    result["normalized"] = result["min_s"] / result["calibration_s"]
+    return result
+
+
+# ========== 案例 ==========
+def build_cases(inspection, complaint):
+    # 回傳 [(名稱, 說明, 函式)]；準備工作在這裡完成，不計入量測
+    raw_df = ipqc_data.read_all_sheets(inspection)
+    raw_complaint = ipqc_data.read_all_sheets(complaint)
+    df, complaint_df = ipqc_data.prepare_frame(raw_df), ipqc_data.prepare_frame(raw_complaint)
+    dataset = ipqc_data.Dataset(df, complaint_df)
+    pairs = [(m, [mod]) for m in dataset.models() for mod in dataset.modules(m)]
+    pools = [dataset.item_pool(m, dataset.modules(m)) for m in dataset.models()]
+    pools = [p for p in pools if not p.empty]
+    full = pd.concat(pools, ignore_index=True)
+    by = ["source", "kind", "tier"]
+    strat_count = min(ipqc_sampling.min_full_coverage(full, by) + 10, len(full))
+
+    model = max(dataset.models(), key=lambda m: len(dataset.item_pool(m, dataset.modules(m))))
+    modules = dataset.modules(model)
+    model_pool = dataset.item_pool(model, modules)
+    forms = {}
+    for n in (20, 200):
+        combined = ipqc_sampling.draw_sample(model_pool, min(n, len(model_pool)), seed=SEED)
+        forms[n] = ipqc_data.layout_form(combined)[ipqc_data.FORM_COLUMNS]
+
+    jobs = ipqc_batch.all_module_jobs(dataset.model_module_df, 5, seed=SEED)
+    generated = [ipqc_batch.generate_form(job, dataset) for job in jobs]
+    generated = [g for g in generated if g is not None]
+
+    def ingest():
+        ipqc_data.read_all_sheets(inspection)
+        ipqc_data.read_all_sheets(complaint)
+
+    def normalize():
+        ipqc_data.prepare_frame(raw_df)
+        ipqc_data.prepare_frame(raw_complaint)
+
+    def index():
+        ipqc_data.Dataset(df, complaint_df)
+
+    def filter_pairs():
+        for m, mods in pairs:
+            dataset.inspection_items(m, mods)
+            dataset.complaint_items(m, mods)
+
+    def sample():
+        for i, pool in enumerate(pools):
+            ipqc_sampling.draw_sample(pool, min(len(pool), 30), seed=SEED + i)
+
+    def sample_stratified():
+        ipqc_sampling.draw_stratified(full, strat_count, by, seed=SEED)
+
+    def export(n):
+        return lambda: ipqc_export.export_form(forms[n], model, modules, seed=SEED)
+
+    def bundle():
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for filename, data, _, _ in generated:
+                zipf.writestr(filename, data)
+        return buffer.getvalue()
+
+    return [
+        ("ingest", f"讀取兩份活頁簿（{len(raw_df)} + {len(raw_complaint)} 列）", ingest),
+        ("normalize", "模組欄位清洗（兩份）", normalize),
+        ("index", "建立機型 / 模組索引", index),
+        ("filter", f"篩選全部（機型, 模組）組合（{len(pairs)} 組）", filter_pairs),
+        ("sample", f"每個機型的完整項目池各抽 30 筆（{len(pools)} 個機型）", sample),
+        ("sample_stratified", f"整份項目池分層抽樣（{strat_count} 筆）", sample_stratified),
+        ("export_20", f"匯出 {len(forms[20])} 列表單（{model}）", export(20)),
+        ("export_200", f"匯出 {len(forms[200])} 列表單（{model}）", export(200)),
+        ("bundle", f"打包 {len(generated)} 張批次表單為 zip", bundle),
+    ]
+
+
+# ========== 執行環境與輸入 ==========
+def file_info(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return {"path": path, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "export_mode": ipqc_export.EXPORT_MODE,
+    }
+
+
+# ========== 比較 ==========
+def compare(current, baseline, threshold):
+    # 回傳 (每個案例的比較列, 是否有退步)
+    rows, regressed = [], False
+    same_inputs = [i["sha256"] for i in current["inputs"]] == [i["sha256"] for i in baseline["inputs"]]
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            rows.append((name, None, result["normalized"], None, "新案例"))
+            continue
+        ratio = result["normalized"] / base["normalized"]
+        diff_s = (ratio - 1) * base["normalized"] * result["calibration_s"]
+        status = "退步" if ratio > 1 + threshold and diff_s > NOISE_FLOOR_S else ("改善" if ratio < 1 - threshold else "持平")
+        regressed |= status == "退步"
+        rows.append((name, base["normalized"], result["normalized"], ratio, status))
+    return rows, regressed, same_inputs
+
+
+# ========== 資料量放大 ==========
+def scaling(scales, names, repeat, warmup, work_dir):
+    # 每個倍數產生一組合成活頁簿後執行指定案例；回傳 {倍數: {"inputs": ..., "rows": ..., "results": ...}}
+    out = {}
+    for scale in scales:
+        inspection, complaint = synth_workbooks.generate(work_dir, scale)
+        cases = [c for c in build_cases(inspection, complaint) if c[0] in names]
+        rows = [p["sheets"] * p["rows"] for p in synth_workbooks.scaled_profiles(scale)]
+        print(f"\n× {scale:g}（點檢 {rows[0]} 列、客訴 {rows[1]} 列）")
+        results = {}
+        for name, description, fn in cases:
+            result = run_case(fn, repeat, warmup)
+            result["description"] = description
+            results[name] = result
+            print(f"  {name:<18} {result['min_s'] * 1000:>10.2f} ms  {description}")
+        out[f"{scale:g}"] = {"inputs": [file_info(inspection), file_info(complaint)], "rows": rows,
+                             "results": results}
+    return out
+
+
+def print_scaling(report):
+    # 各案例在每個倍數的最小值（ms），括號內為相對最小倍數的成長倍數
+    scales = list(report)
+    first = report[scales[0]]["results"]
+    print(f"\n{'案例':<18}" + "".join(f"{'× ' + s:>20}" for s in scales))
+    for name in first:
+        cells = []
+        for s in scales:
+            result = report[s]["results"].get(name)
+            cells.append(f"{result['min_s'] * 1000:.1f} ({result['normalized'] / first[name]['normalized']:.1f}x)"
+                         if result else "-")
+        print(f"{name:<18}" + "".join(f"{c:>20}" for c in cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 效能基準套件")
+    parser.add_argument("--inspection", default=ipqc_data.INSPECTION_PATH)
+    parser.add_argument("--complaint", default=DEFAULT_COMPLAINT)
+    parser.add_argument("--cases", nargs="*", help="只執行指定案例（預設全部）")
+    parser.add_argument("--repeat", type=int, help="每個案例的重複次數（預設 11；--scales 時預設 3）")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="結果 JSON 存檔路徑")
+    parser.add_argument("--baseline", help="比較用的先前結果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="變慢超過此比例視為退步（預設 0.2 = 20%%）")
+    parser.add_argument("--retries", type=int, default=2, help="與基準比較時，超過門檻的案例最多重測幾次")
+    parser.add_argument("--scales", type=float, nargs="*",
+                        help="改用合成活頁簿，依序量測這些資料量倍數（例如 1 10 100）")
+    parser.add_argument("--work-dir", help="--scales 產生的活頁簿存放位置（預設暫存資料夾，結束後刪除）")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    if args.scales:
+        if args.baseline:
+            parser.error("--scales 不能與 --baseline 一起使用")
+        names = args.cases or SCALING_CASES
+        with tempfile.TemporaryDirectory(prefix="ipqc_scale_") as tmp:
+            report = scaling(args.scales, names, args.repeat or 3, args.warmup, args.work_dir or tmp)
+        print_scaling(report)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"schema": SCHEMA, "created": datetime.now().isoformat(timespec="seconds"),
+                           "git": git_revision(), "environment": environment(), "seed": SEED,
+                           "scaling": report}, f, ensure_ascii=False, indent=2)
+            print(f"已儲存：{args.output}")
+        return 0
+    args.repeat = args.repeat or 11
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("schema") != SCHEMA:
+            print(f"⚠️ 基準檔格式不同（{baseline.get('schema')}），無法比較")
+            return 2
+
+    cases = build_cases(args.inspection, args.complaint)
+    if args.cases:
+        unknown = set(args.cases) - {name for name, _, _ in cases}
+        if unknown:
+            parser.error(f"未知的案例：{', '.join(sorted(unknown))}（可用：{', '.join(n for n, _, _ in cases)}）")
+        cases = [c for c in cases if c[0] in args.cases]
+
+    results = {}
+    print(f"{'案例':<18} {'中位數 (ms)':>12} {'最小 (ms)':>10} {'IQR (ms)':>9} {'相對值':>8}  說明")
+    for name, description, fn in cases:
+        result = run_case(fn, args.repeat, args.warmup)
+        base = (baseline or {}).get("results", {}).get(name)
+        retries = 0
+        while base and retries < args.retries and result["normalized"] > base["normalized"] * (1 + args.threshold):
+            again = run_case(fn, args.repeat, args.warmup)
+            retries += 1
+            if again["normalized"] < result["normalized"]:
+                result = again
+        result["retries"] = retries
+        result["description"] = description
+        results[name] = result
+        print(f"{name:<18} {result['median_s'] * 1000:>12.2f} {result['min_s'] * 1000:>10.2f} "
+              f"{result['iqr_s'] * 1000:>9.2f} {result['normalized']:>8.3f}  {description}")
+    calib = statistics.median(r["calibration_s"] for r in results.values())
+    print(f"校正運算：{calib * 1000:.2f} ms（相對值 = 最小值 ÷ 案例前後的校正時間）")
+
+    report = {
+        "schema": SCHEMA,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "environment": environment(),
+        "inputs": [file_info(args.inspection), file_info(args.complaint)],
+        "seed": SEED,
+        "calibration_s": calib,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已儲存：{args.output}")
+
+    if baseline is not None:
+        rows, regressed, same_inputs = compare(report, baseline, args.threshold)
+        if not same_inputs:
+            print("⚠️ 輸入資料檔與基準不同（sha256 不符），比較結果僅供參考")
+        print(f"\n與基準比較（{baseline.get('git')} → {report['git']}，門檻 {args.threshold:.0%}）")
+        print(f"{'案例':<18} {'基準':>8} {'本次':>8} {'比值':>7}  結果")
+        for name, base, cur, ratio, status in rows:
+            base_text = f"{base:.3f}" if base is not None else "-"
+            ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+            print(f"{name:<18} {base_text:>8} {cur:>8.3f} {ratio_text:>7}  {status}")
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+# ========== 多人同時使用的負載測試（實際 Streamlit 伺服器 + 模擬的 Microsoft Graph） ==========
+# 用法：
+#   python benchmarks/loadtest.py                                   # 1、5、10、20、30 個 session，各跑 3 輪
+#   python benchmarks/loadtest.py --sessions 10 30 --iterations 5 --think 1.0
+#   python benchmarks/loadtest.py --output load.json --report benchmarks/loadtest_baseline.md
+#   python benchmarks/loadtest.py --scale 10                        # 改用 10 倍大小的合成活頁簿
+# 每個 session 數各啟動一個全新的 streamlit 伺服器（子程序，工作目錄為暫存資料夾，匯出檔不會寫進專案），
+# 伺服器程序內以模擬的 Graph 取代 requests / msal：回應依設定的延遲與頻寬等待，下載時提供資料檔內容。
+# 每個模擬的使用者以 websocket 連線，送出與瀏覽器相同的 BackMsg（元件狀態、fragment id），流程為
+#   開啟頁面 → 選擇機型 → 選擇模組 → 執行抽樣 → 填寫判定結果 → 匯出結果（之後重複選機型起的步驟）。
+# 延遲為用戶端從送出重跑要求到收到 script_finished 的時間（含排隊），另記錄吞吐量與伺服器 RSS。
+# 開始量測前先以一個 session 跑完一輪（載入資料、快取暖身），不計入結果。
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRIPT = os.path.join(ROOT, "try.py")
+INSPECTION_FILE = "IPQC點檢項目最新1.xlsx"   # try.py 讀取的檔名（data/ 底下）
+COMPLAINT_FILE = "客訴調查總表.xlsx"
+COMPLAINT_SOURCE = "data/客訴調查總表 2.xlsx"   # 版本庫中的客訴總表
+ACTIONS = ["load", "select_model", "select_modules", "sample", "edit", "export"]
+
+# Graph 各操作的模擬延遲（秒）與傳輸頻寬；可用 --graph-latency token=0.2,download=0.5 覆寫
+GRAPH_LATENCY = {"token": 0.15, "site": 0.1, "list": 0.12, "download": 0.25, "upload": 0.3}
+GRAPH_BANDWIDTH = 20 * 2 ** 20   # 每秒位元組數
+
+
+# ========== 模擬的 Microsoft Graph（在伺服器程序內執行） ==========
+class FakeGraph:
+    # 取代 requests.get / requests.put 與 msal.ConfidentialClientApplication；非 Graph 的網址照常送出
+    def __init__(self, source_dir, latency, bandwidth):
+        self.source_dir = source_dir
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.counts = {op: 0 for op in latency}
+        self._lock = threading.Lock()
+
+    def _wait(self, op, size=0):
+        with self._lock:
+            self.counts[op] += 1
+        time.sleep(self.latency[op] + size / self.bandwidth)
+
+    @staticmethod
+    def _response(url, status=200, content=b"", payload=None):
+        import requests
+        response = requests.models.Response()
+        response.url = url
+        response.status_code = status
+        response._content = json.dumps(payload).encode("utf-8") if payload is not None else content
+        return response
+
+    def get(self, url, **kwargs):
+        if "graph.microsoft.com" not in url:
+            return self._real_get(url, **kwargs)
+        path = urllib.parse.unquote(url.split("/v1.0/", 1)[1])
+        if path.endswith(":/children"):
+            self._wait("list")
+            # 與真正的 Graph 一樣附上 eTag / 大小 / 修改時間（條件式取得以 eTag 判斷）
+            items = []
+            for name in sorted(os.listdir(self.source_dir)):
+                st = os.stat(os.path.join(self.source_dir, name))
+                modified = datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                items.append({"name": name, "size": st.st_size, "eTag": f'"{{{st.st_mtime_ns:x}}},1"',
+                              "lastModifiedDateTime": modified})
+            return self._response(url, payload={"value": items})
+        if path.endswith(":/content"):
+            name = os.path.basename(path[:-len(":/content")])
+            file_path = os.path.join(self.source_dir, name)
+            if not os.path.exists(file_path):
+                self._wait("download")
+                return self._response(url, status=404)
+            with open(file_path, "rb") as f:
+                content = f.read()
+            self._wait("download", len(content))
+            return self._response(url, content=content)
+        self._wait("site")
+        return self._response(url, payload={"id": "fake-site"})
+
+    def put(self, url, data=None, **kwargs):
+        if "graph.microsoft.com" not in url:
+            return self._real_put(url, data=data, **kwargs)
+        size = len(data or b"")
+        self._wait("upload", size)
+        name = os.path.basename(urllib.parse.unquote(url).rsplit(":/content", 1)[0])
+        return self._response(url, status=201, payload={"id": uuid.uuid4().hex, "name": name, "size": size})
+
+    def install(self):
+        import msal
+        import requests
+        graph = self
+
+        class FakeClientApplication:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def acquire_token_for_client(self, scopes):
+                graph._wait("token")
+                return {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+
+        self._real_get, self._real_put = requests.get, requests.put
+        requests.get, requests.put = self.get, self.put
+        msal.ConfidentialClientApplication = FakeClientApplication
+
+
+def serve(argv):
+    # 子程序入口：python loadtest.py serve <port> <graph 資料夾> <延遲 JSON> <頻寬>
+    port, source_dir, latency, bandwidth = argv
+    FakeGraph(source_dir, json.loads(latency), float(bandwidth)).install()
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", SCRIPT,
+                "--server.port", port, "--server.address", "127.0.0.1", "--server.headless", "true",
+                "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+                "--logger.level", "error"]
+    return cli.main()
+
+
+# ========== 伺服器 ==========
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_workdir(workdir, scale=None):
+    # 工作目錄：data/ 為頁面讀取的資料檔，graph/ 為模擬 OneDrive 上傳資料夾中的檔案（每次整頁重跑都會同步下載）
+    data_dir, graph_dir = os.path.join(workdir, "data"), os.path.join(workdir, "graph")
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(graph_dir, exist_ok=True)
+    if scale:
+        import synth_workbooks
+        inspection, complaint = synth_workbooks.generate(os.path.join(workdir, "synthetic"), scale)
+    else:
+        inspection, complaint = os.path.join(ROOT, "data", INSPECTION_FILE), os.path.join(ROOT, COMPLAINT_SOURCE)
+    for source, name in [(inspection, INSPECTION_FILE), (complaint, COMPLAINT_FILE)]:
+        shutil.copyfile(source, os.path.join(data_dir, name))
+        shutil.copyfile(source, os.path.join(graph_dir, name))
+    return graph_dir
+
+
+class Server:
+    def __init__(self, workdir, graph_dir, latency, bandwidth):
+        self.port = free_port()
+        env = dict(os.environ, client_id="loadtest", client_secret="loadtest", tenant_id="loadtest",
+                   sharepoint_hostname="loadtest.sharepoint.com")
+        self.log = open(os.path.join(workdir, "server.log"), "ab")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve", str(self.port), graph_dir,
+             json.dumps(latency), str(bandwidth)],
+            cwd=workdir, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("streamlit 伺服器啟動失敗（見工作目錄中的 server.log）")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("等待 streamlit 伺服器逾時")
+
+    def rss(self):
+        return _status(self.process.pid, "VmRSS")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def _status(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    # 定期讀取伺服器程序的 RSS，取得量測期間的峰值
+    def __init__(self, server, interval=0.1):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, self.server.rss() or 0)
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+# ========== 模擬的使用者 ==========
+WIDGET_TYPES = {"selectbox", "multiselect", "button", "number_input", "text_input", "checkbox", "dataframe"}
+
+
+class Session:
+    def __init__(self, url, name, rng):
+        self.url = url
+        self.name = name
+        self.rng = rng
+        self.widgets = {}     # 標籤 → (元素類型, 元素 proto, fragment id)
+        self.editors = {}     # 元件 id → (dataframe proto, fragment id)
+        self.values = {}      # 元件 id → WidgetState（像瀏覽器一樣每次重跑都送出目前的值）
+        self.samples = []     # (動作, 秒數, 是否成功)
+        self.errors = []
+        self.texts = []       # 最近一次重跑的提示訊息
+
+    async def __aenter__(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None,
+                                           open_timeout=60, ping_interval=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    # ---------- 重跑 ----------
+    async def rerun(self, action, fragment_id="", triggers=()):
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.widget_states.widgets.extend(self.values.values())
+        state.widget_states.widgets.extend(triggers)
+        if fragment_id:
+            state.fragment_id = fragment_id
+        self.texts = []
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        ok = True
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(await self.ws.recv())
+            kind = fm.WhichOneof("type")
+            if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                ok &= self._element(fm.delta.new_element, fm.delta.fragment_id)
+            elif kind == "script_finished":
+                ok &= fm.script_finished in (ForwardMsg.FINISHED_SUCCESSFULLY,
+                                             ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+                break
+        elapsed = time.perf_counter() - t0
+        self.samples.append((action, elapsed, ok))
+        return ok
+
+    def _element(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+            return False
+        if kind == "alert":
+            self.texts.append(element.alert.body)
+        if kind not in WIDGET_TYPES:
+            return True
+        proto = getattr(element, kind)
+        if kind == "dataframe":
+            if proto.editing_mode and proto.id:
+                self.editors[proto.id] = (proto, fragment_id)
+        else:
+            self.widgets[proto.label] = (kind, proto, fragment_id)
+        return True
+
+    # ---------- 操作 ----------
+    def widget(self, label):
+        entry = self.widgets.get(label)
+        if entry is None:
+            raise LookupError(f"找不到元件：{label}")
+        return entry
+
+    async def set_value(self, action, label, **value):
+        _, proto, fragment_id = self.widget(label)
+        state = WidgetState(id=proto.id, **value)
+        self.values[proto.id] = state
+        return await self.rerun(action, fragment_id)
+
+    async def click(self, action, label):
+        _, proto, fragment_id = self.widget(label)
+        return await self.rerun(action, fragment_id, [WidgetState(id=proto.id, trigger_value=True)])
+
+    async def edit_results(self, action, ng_rate=0.1):
+        # 判定結果編輯器（有「項次」欄的那一個）：每一列填 OK / NG，分隔列略過
+        for widget_id, (proto, fragment_id) in reversed(list(self.editors.items())):
+            table = pa.ipc.open_stream(proto.arrow_data.data).read_all()
+            if "項次" not in table.column_names:
+                continue
+            items = table.column("項目").to_pylist()
+            edited = {str(i): {"判定結果": "NG" if self.rng.random() < ng_rate else "OK"}
+                      for i, item in enumerate(items) if "👇" not in str(item)}
+            value = json.dumps({"edited_rows": edited, "added_rows": [], "deleted_rows": []}, ensure_ascii=False)
+            self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+            return await self.rerun(action, fragment_id)
+        raise LookupError("找不到判定結果編輯器")
+
+    async def flow(self, think):
+        # 一輪：選機型 → 選模組 → 抽樣 → 填寫判定結果 → 匯出
+        _, models, _ = self.widget("選擇機型")
+        await self.set_value("select_model", "選擇機型", string_value=self.rng.choice(list(models.options)))
+        await asyncio.sleep(think)
+        _, modules, _ = self.widget("選擇模組（可複選）")
+        options = list(modules.options)
+        if self.rng.random() < 0.5 or len(options) < 3:
+            chosen = options[:1]   # 全部項目
+        else:
+            chosen = self.rng.sample(options[1:], min(len(options) - 1, self.rng.randint(1, 3)))
+        await self.set_value("select_modules", "選擇模組（可複選）", string_array_value={"data": chosen})
+        await asyncio.sleep(think)
+        await self.click("sample", "🔍 執行抽樣")
+        await asyncio.sleep(think)
+        await self.edit_results("edit")
+        await asyncio.sleep(think)
+        await self.click("export", "📤 匯出結果")
+        if not any("匯出成功" in t for t in self.texts):
+            self.errors.append("匯出後沒有成功訊息")
+            action, elapsed, _ = self.samples[-1]
+            self.samples[-1] = (action, elapsed, False)
+        await asyncio.sleep(think)
+
+
+async def run_session(url, name, seed, iterations, think, delay):
+    await asyncio.sleep(delay)
+    session = Session(url, name, random.Random(seed))
+    try:
+        async with session:
+            await session.rerun("load")
+            for _ in range(iterations):
+                await session.flow(think)
+    except Exception as e:   # 單一 session 失敗不中斷整體測試
+        session.errors.append(f"{type(e).__name__}: {e}")
+    return session
+
+
+async def run_sessions(url, count, iterations, think, ramp, seed):
+    return await asyncio.gather(*[
+        run_session(url, f"s{i}", seed + i, iterations, think, ramp * i / max(count, 1))
+        for i in range(count)
+    ])
+
+
+# ========== 統計 ==========
+def percentiles(values):
+    if not values:
+        return {"count": 0, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+    return {"count": len(values), "p50_ms": round(p50, 1), "p90_ms": round(p90, 1), "p99_ms": round(p99, 1),
+            "max_ms": round(max(values) * 1000, 1)}
+
+
+def run_level(count, args, latency):
+    with tempfile.TemporaryDirectory(prefix="ipqc_load_") as workdir:
+        graph_dir = prepare_workdir(workdir, args.scale)
+        server = Server(workdir, graph_dir, latency, args.bandwidth)
+        try:
+            server.wait_ready()
+            warm = asyncio.run(run_sessions(server.url, 1, 1, 0, 0, args.seed - 1))
+            if warm[0].errors:
+                raise RuntimeError(f"暖身失敗：{warm[0].errors[0]}")
+            rss_idle = server.rss()
+            sampler = RssSampler(server)
+            sampler.start()
+            t0 = time.perf_counter()
+            sessions = asyncio.run(run_sessions(server.url, count, args.iterations, args.think, args.ramp, args.seed))
+            wall = time.perf_counter() - t0
+            rss_peak = max(sampler.stop(), server.rss() or 0)
+            rss_after = server.rss()
+        finally:
+            server.stop()
+
+    samples = [s for session in sessions for s in session.samples]
+    ok = [seconds for _, seconds, good in samples if good]
+    flows = sum(1 for action, _, good in samples if action == "export" and good)
+    return {
+        "sessions": count,
+        "wall_s": round(wall, 2),
+        "reruns": len(samples),
+        "failed": sum(1 for _, _, good in samples if not good),
+        "errors": sorted({e for session in sessions for e in session.errors})[:10],
+        "throughput_rps": round(len(ok) / wall, 2),
+        "flows_per_min": round(flows / wall * 60, 1),
+        "latency": percentiles(ok),
+        "actions": {a: percentiles([t for action, t, good in samples if action == a and good]) for a in ACTIONS},
+        "rss_idle_mb": round(rss_idle / 2 ** 20, 1),
+        "rss_peak_mb": round(rss_peak / 2 ** 20, 1),
+        "rss_after_mb": round(rss_after / 2 ** 20, 1),
+        "rss_per_session_mb": round((rss_after - rss_idle) / 2 ** 20 / count, 2),
+    }
+
+
+# ========== 報告 ==========
+def print_header():
+    print(f"{'sessions':>8} {'重跑數':>6} {'失敗':>4} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'重跑/秒':>8} {'流程/分':>8} {'RSS 閒置':>9} {'RSS 峰值':>9} {'每 session':>10}")
+
+
+def print_level(r):
+    lat = r["latency"]
+    print(f"{r['sessions']:>8} {r['reruns']:>6} {r['failed']:>4} {lat['p50_ms'] or 0:>9.1f} {lat['p90_ms'] or 0:>9.1f} "
+          f"{lat['p99_ms'] or 0:>9.1f} {r['throughput_rps']:>8.2f} {r['flows_per_min']:>8.1f} "
+          f"{r['rss_idle_mb']:>8.1f}M {r['rss_peak_mb']:>8.1f}M {r['rss_per_session_mb']:>9.2f}M")
+
+
+def markdown(report):
+    env, cfg = report["environment"], report["config"]
+    lines = [
+        "# 負載測試基準（benchmarks/loadtest.py）",
+        "",
+        f"- 產生時間：{report['created']}（git {report['git']}）",
+        f"- 環境：Python {env['python']}、{env['platform']}、{env['cpus']} CPU、streamlit {env['streamlit']}",
+        f"- 設定：每個 session {cfg['iterations']} 輪、操作間隔 {cfg['think']} 秒、啟動間隔 {cfg['ramp']} 秒、"
+        f"資料 {'×' + format(cfg['scale'], 'g') + ' 合成活頁簿' if cfg['scale'] else '版本庫中的資料檔'}",
+        f"- 模擬 Graph 延遲（秒）：{', '.join(f'{k}={v}' for k, v in cfg['graph_latency'].items())}；"
+        f"頻寬 {cfg['bandwidth'] / 2 ** 20:.0f} MB/s",
+        "",
+        "## 整體",
+        "",
+        "| sessions | 重跑數 | 失敗 | p50 (ms) | p90 (ms) | p99 (ms) | 重跑/秒 | 流程/分 | RSS 閒置 (MB) | RSS 峰值 (MB) | 每 session (MB) |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for r in report["levels"]:
+        lat = r["latency"]
+        lines.append(f"| {r['sessions']} | {r['reruns']} | {r['failed']} | {lat['p50_ms']} | {lat['p90_ms']} | "
+                     f"{lat['p99_ms']} | {r['throughput_rps']} | {r['flows_per_min']} | {r['rss_idle_mb']} | "
+                     f"{r['rss_peak_mb']} | {r['rss_per_session_mb']} |")
+    lines += ["", "## 各操作 p50 / p90 / p99 (ms)", "",
+              "| sessions | " + " | ".join(ACTIONS) + " |", "|---:|" + "---:|" * len(ACTIONS)]
+    for r in report["levels"]:
+        cells = [f"{a['p50_ms']} / {a['p90_ms']} / {a['p99_ms']}" if a["count"] else "-"
+                 for a in (r["actions"][name] for name in ACTIONS)]
+        lines.append(f"| {r['sessions']} | " + " | ".join(cells) + " |")
+    errors = sorted({e for r in report["levels"] for e in r["errors"]})
+    if errors:
+        lines += ["", "## 錯誤", ""] + [f"- {e}" for e in errors]
+    return "\n".join(lines) + "\n"
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_latency(text):
+    latency = dict(GRAPH_LATENCY)
+    for part in filter(None, (text or "").split(",")):
+        op, _, value = part.partition("=")
+        if op.strip() not in latency:
+            raise argparse.ArgumentTypeError(f"未知的 Graph 操作：{op}（可用：{', '.join(latency)}）")
+        latency[op.strip()] = float(value)
+    return latency
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        return serve(argv[1:])
+    parser = argparse.ArgumentParser(description="IPQC 多人同時使用負載測試")
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1, 5, 10, 20, 30])
+    parser.add_argument("--iterations", type=int, default=3, help="每個 session 跑幾輪流程（預設 3）")
+    parser.add_argument("--think", type=float, default=0.0, help="每個操作之間的等待秒數（預設 0，最壞情況）")
+    parser.add_argument("--ramp", type=float, default=0.0, help="所有 session 在幾秒內陸續開始（預設 0，同時開始）")
+    parser.add_argument("--scale", type=float, help="改用合成活頁簿，資料量為目前的幾倍")
+    parser.add_argument("--graph-latency", type=parse_latency, default=dict(GRAPH_LATENCY),
+                        help="模擬 Graph 延遲，例如 token=0.2,download=0.5")
+    parser.add_argument("--bandwidth", type=float, default=GRAPH_BANDWIDTH, help="模擬 Graph 傳輸頻寬（位元組 / 秒）")
+    parser.add_argument("--seed", type=int, default=20240813)
+    parser.add_argument("--output", help="結果 JSON 存檔路徑")
+    parser.add_argument("--report", help="Markdown 報告存檔路徑")
+    args = parser.parse_args(argv)
+
+    import streamlit
+    levels = []
+    print_header()
+    for count in args.sessions:
+        result = run_level(count, args, args.graph_latency)
+        levels.append(result)
+        print_level(result)
+        for e in result["errors"]:
+            print(f"  ⚠️ {e}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "streamlit": streamlit.__version__},
+        "config": {"iterations": args.iterations, "think": args.think, "ramp": args.ramp, "scale": args.scale,
+                   "graph_latency": args.graph_latency, "bandwidth": args.bandwidth, "seed": args.seed},
+        "levels": levels,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已儲存：{args.output}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(markdown(report))
+        print(f"已儲存：{args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
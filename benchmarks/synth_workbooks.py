@@ -0,0 +1,244 @@
+# ========== 合成活頁簿產生器（放大測試用） ==========
+# 產生與 ipqc_data.read_all_sheets 預期版面相同的點檢表與客訴總表：
+# 標題列前可有若干列表頭文字、混入沒有機型 / 模組欄位的說明分頁，模組欄位帶有實際資料常見的雜訊
+# （100.0、"100.0"、QQA、NA、空白、OQC 等無效值），並可在分頁中嵌入圖片。
+# 用法：
+#   python benchmarks/synth_workbooks.py --scale 10 --out-dir /tmp/ipqc_x10
+#   python benchmarks/synth_workbooks.py --scale 1 --inspection-sheets 12 --rows 80 --header-offset 4 --no-images
+# --scale 1 約等於目前兩份資料檔的大小（點檢 6 個資料分頁約 200 列、客訴 1 個分頁約 320 列），
+# 放大時每個資料分頁的列數與圖片數依比例增加，分頁數不變（可另外指定）。
+import argparse
+import io
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import openpyxl
+
+SEED = 20240813
+MODELS = ["MINI IV", "MINI V", "FR301", "FV501", "200STK", "HAL", "EFEM", "ELV"]
+MODULES = [200, 300, 400, 500, 600, 700, 800, 900, 1000]
+NOISE_MODULES = ["QQA", "NQA", "NA", "", None, "OQC", "ALL"]   # 前四種歸為 NA；空白與其他文字會被排除
+RESULT_TEXT = "□OK   □NG  □N/A"
+
+INSPECTION_HEADER = ["模組-項次", "項次", "項目", "機型", "模組", "規範", "方法", "判定結果", "重要性"]
+COMPLAINT_HEADER = ["狀態", "指派人員", "客訴編號", "專案序號", "機型", "客戶名稱", "客訴單異常類別", "調查真因類別",
+                    "建立日期", "問題描述", "立即改善對策", "記錄人", "備註", "圖片", "年", "月", "部門", "模組", "重要性"]
+
+# 目前資料檔的規模（--scale 1）
+INSPECTION_PROFILE = {"sheets": 6, "rows": 33, "filler_sheets": 23, "header_offset": 2, "images": 20}
+COMPLAINT_PROFILE = {"sheets": 1, "rows": 320, "filler_sheets": 11, "header_offset": 0, "images": 18}
+
+_PARTS = ["滑軌", "滑塊", "Cover", "螺絲", "氣管", "Sensor", "配電盤", "Shelf", "Load Port", "手臂", "門片", "線槽"]
+_CHECKS = ["無油漬、異物", "鎖緊確認", "外觀無刮傷", "訊號回饋正常", "無異音、干涉", "標籤正確", "綁線整齊", "無漏氣"]
+_METHODS = ["目視判斷", "用十字起子抽查", "查看TP螢幕確認", "手動操作確認", "量測"]
+_CATEGORIES = ["組裝異常", "部品異常", "設計異常", "真因不明", "參數異常", "客戶問題"]
+_PEOPLE = ["林美琴", "陳志明", "王小華", "張家豪", "李佩珊"]
+
+
+# ========== 共用 ==========
+def _module_value(rng, noise):
+    # 有效模組以數字、浮點數或數字字串出現；依 noise 比例混入 NA 類與無效值
+    if rng.random() < noise:
+        return rng.choice(NOISE_MODULES)
+    module = rng.choice(MODULES)
+    form = rng.random()
+    if form < 0.6:
+        return module
+    if form < 0.85:
+        return float(module)
+    return f"{module}.0"
+
+
+def _model_value(rng, models):
+    model = rng.choice(models)
+    return model + "\n" if rng.random() < 0.1 else model   # 實際資料中有儲存格帶換行
+
+
+def _png(width=120, height=40):
+    # 沒有 Pillow 時回傳 None，不嵌入圖片
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (70, 130, 180)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _add_images(ws, count, rows, column, png):
+    if not count or png is None:
+        return
+    from openpyxl.drawing.image import Image
+    for i in range(count):
+        image = Image(io.BytesIO(png))
+        ws.add_image(image, f"{column}{1 + (i * rows) // count + 1}")
+
+
+def _filler_sheet(wb, title, rng, rows=30):
+    # 沒有「機型」+「模組」標題列的分頁（空白表單、樞紐分析表等），讀取時應略過
+    ws = wb.create_sheet(title)
+    ws.append([None, "IPQC重點點檢表"])
+    ws.append([None, "機型：_________________", "專案序號：________________"])
+    ws.append(["項次", "項目", "規範", "方法", "判定結果"])
+    for i in range(rows):
+        ws.append([i + 1, f"{rng.choice(_PARTS)}{rng.choice(_CHECKS)}", None, rng.choice(_METHODS), RESULT_TEXT])
+    return ws
+
+
+def _decoy_sheet(wb, title, rng):
+    # 含「機型：」「模組：」字樣但欄位名稱不同的分頁（例如螺絲巡檢表），會被找到標題列但不會採用
+    ws = wb.create_sheet(title)
+    ws.append([None, None, "IPQC重點點檢表－螺絲鎖附點檢表"])
+    ws.append([None, "機型：", None, "模組：", None, None, "專案序號：", "檢驗日期："])
+    ws.append([None, "受檢作業人員", None, "項目", "項次", "點檢項目", "點檢內容", "驗證方式", "點檢結果"])
+    for i in range(8):
+        ws.append([None, None, None, rng.choice(_PARTS), i + 1, rng.choice(_CHECKS), None, rng.choice(_METHODS), RESULT_TEXT])
+    return ws
+
+
+def _title_rows(ws, header_offset, model):
+    # 標題列之前的表頭文字（前兩列仿照實際點檢表，其餘為空白列）
+    texts = [[None, "IPQC重點點檢表"], [None, None, f"機型：{model}", None, None, "專案序號：________________"]]
+    for i in range(header_offset):
+        ws.append(texts[i] if i < len(texts) else [])
+
+
+# ========== 點檢表 ==========
+def inspection_workbook(path, sheets=6, rows=33, filler_sheets=23, header_offset=2, noise=0.1, images=20,
+                        models=MODELS, seed=SEED):
+    rng = random.Random(seed)
+    png = _png()
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    _filler_sheet(wb, "空白表單發行", rng)
+    if filler_sheets > 1:
+        _decoy_sheet(wb, "螺絲巡檢", rng)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"{models[s % len(models)]} {s + 1}")
+        _title_rows(ws, header_offset, models[s % len(models)])
+        ws.append(INSPECTION_HEADER)
+        first = header_offset + 2
+        for i in range(rows):
+            ws.append([
+                f"{rng.choice(MODULES)}-{rng.randint(1, 40)}",
+                f"=ROW()-{first - 1}",
+                f"{rng.choice(_PARTS)}{rng.choice(_CHECKS)}（{s + 1}-{i + 1}）",
+                _model_value(rng, models),
+                _module_value(rng, noise),
+                rng.choice(_CHECKS),
+                rng.choice(_METHODS),
+                RESULT_TEXT,
+                rng.choice([1, 0.8, 0.6, "1", None]),
+            ])
+        _add_images(ws, images // sheets + (s < images % sheets) if sheets else 0, rows, "K", png)
+    for s in range(max(filler_sheets - 2, 0)):
+        _filler_sheet(wb, f"說明 {s + 1}", rng)
+    wb.save(path)
+    return path
+
+
+# ========== 客訴總表 ==========
+def complaint_workbook(path, sheets=1, rows=320, filler_sheets=11, header_offset=0, noise=0.1, images=18,
+                       blank_modules=0.9, models=MODELS, seed=SEED):
+    # 實際客訴總表大多數列沒有填模組（blank_modules），有填的再依 noise 混入雜訊
+    rng = random.Random(seed + 1)
+    png = _png()
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    start = datetime(2024, 12, 1)
+    serial = 0
+    for s in range(sheets):
+        ws = wb.create_sheet("2024年12月到現在" if s == 0 else f"客訴 {s + 1}")
+        _title_rows(ws, header_offset, "")
+        ws.append(COMPLAINT_HEADER)
+        for i in range(rows):
+            serial += 1
+            day = start + timedelta(days=serial // 3)
+            row = header_offset + i + 2
+            ws.append([
+                rng.choice(["結案", "處理中", "暫緩"]),
+                rng.choice(_PEOPLE),
+                f"CC{day:%y%m%d}-{serial:05d}",
+                f"S0{rng.randint(20, 25)}-{rng.randint(1, 200):04d}",
+                _model_value(rng, models),
+                rng.choice(["北方華創", "客戶A", "客戶B"]),
+                rng.choice(_CATEGORIES),
+                rng.choice(_CATEGORIES),
+                day,
+                f"{rng.choice(_PARTS)}{rng.choice(['通訊異常', '干涉', '漏裝', '鬆脫', '刮傷'])}，{rng.choice(_CHECKS)}",
+                "更換部品",
+                rng.choice(_PEOPLE),
+                None,
+                None,
+                f"=YEAR(I{row})",
+                f"=MONTH(I{row})",
+                "產品一部",
+                "" if rng.random() < blank_modules else _module_value(rng, noise),
+                rng.choice(["1", 1, 0.8, None]),
+            ])
+        _add_images(ws, images // sheets + (s < images % sheets) if sheets else 0, rows, "N", png)
+    for s in range(filler_sheets):
+        _filler_sheet(wb, f"統計 {s + 1}", rng, rows=20)
+    wb.save(path)
+    return path
+
+
+# ========== 依倍數產生 ==========
+def scaled_profiles(scale, **overrides):
+    # 每個資料分頁的列數與圖片數乘上倍數；overrides 可覆寫任一項（例如 sheets=12）
+    inspection = dict(INSPECTION_PROFILE, rows=round(INSPECTION_PROFILE["rows"] * scale),
+                      images=round(INSPECTION_PROFILE["images"] * scale))
+    complaint = dict(COMPLAINT_PROFILE, rows=round(COMPLAINT_PROFILE["rows"] * scale),
+                     images=round(COMPLAINT_PROFILE["images"] * scale))
+    for key, value in overrides.items():
+        if value is None:
+            continue
+        if key.startswith("complaint_"):
+            complaint[key[len("complaint_"):]] = value
+        elif key.startswith("inspection_"):
+            inspection[key[len("inspection_"):]] = value
+        else:
+            inspection[key] = value
+            complaint[key] = value
+    return inspection, complaint
+
+
+def generate(out_dir, scale=1, noise=0.1, with_images=True, seed=SEED, **overrides):
+    # 回傳 (點檢表路徑, 客訴總表路徑)
+    os.makedirs(out_dir, exist_ok=True)
+    inspection, complaint = scaled_profiles(scale, **overrides)
+    if not with_images:
+        inspection["images"] = complaint["images"] = 0
+    tag = f"x{scale:g}"
+    return (
+        inspection_workbook(os.path.join(out_dir, f"inspection_{tag}.xlsx"), noise=noise, seed=seed, **inspection),
+        complaint_workbook(os.path.join(out_dir, f"complaint_{tag}.xlsx"), noise=noise, seed=seed, **complaint),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="產生合成的點檢表與客訴總表")
+    parser.add_argument("--scale", type=float, default=1, help="相對目前資料量的倍數（預設 1）")
+    parser.add_argument("--out-dir", default="synthetic")
+    parser.add_argument("--inspection-sheets", type=int, help="點檢表資料分頁數（預設 6）")
+    parser.add_argument("--complaint-sheets", type=int, help="客訴總表資料分頁數（預設 1）")
+    parser.add_argument("--rows", type=int, help="每個資料分頁的列數（覆寫 --scale 算出的列數）")
+    parser.add_argument("--filler-sheets", type=int, help="沒有機型 / 模組欄位的分頁數")
+    parser.add_argument("--header-offset", type=int, help="標題列之前的列數")
+    parser.add_argument("--noise", type=float, default=0.1, help="模組欄位雜訊比例（預設 0.1）")
+    parser.add_argument("--no-images", action="store_true", help="不嵌入圖片")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    paths = generate(args.out_dir, args.scale, noise=args.noise, with_images=not args.no_images, seed=args.seed,
+                     inspection_sheets=args.inspection_sheets, complaint_sheets=args.complaint_sheets,
+                     rows=args.rows, filler_sheets=args.filler_sheets, header_offset=args.header_offset)
+    for path in paths:
+        print(f"{path}（{os.path.getsize(path) / 1024:.0f} KB）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
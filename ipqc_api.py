@@ -0,0 +1,336 @@
+# ========== IPQC 本機 HTTP JSON API ==========
+# 給產線平板與 MES 串接使用，和頁面共用資料集、索引與匯出引擎，只用標準函式庫。
+#   python ipqc_api.py --port 8765
+#
+#   GET  /health                       → {"status": "ok", "version": ...}
+#   GET  /models                       → {"models": [...]}
+#   GET  /models/<機型>/modules         → {"model": ..., "modules": [...]}
+#   GET  /search?q=刮傷/異音&model=<機型>&kind=complaint&limit=20 → {"query", "hits": [...]}（客訴 / 點檢項目全文搜尋，依相關程度排序）
+#   POST /sample  {"model", "modules", "count", "seed", "floor", "strata", "adaptive"} → 抽樣結果 JSON（含實際使用的 seed，項目附模組）
+#   POST /export  {... 同上, "project_no", "check_time", "checker", "supervisor", "checkedby",
+#                  "items": [...]（可省略；提供時直接匯出這些項目）} → xlsx（同時存到表單存放處並記錄判定結果）
+#   GET  /metrics                      → 各路由請求數、錯誤數與延遲百分位數
+#   GET  /metrics/prometheus           → 同上與資料集 / 匯出等指標，Prometheus 文字格式
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+import pandas as pd
+
+import ipqc_data
+import ipqc_export
+import ipqc_metrics
+import ipqc_results
+import ipqc_sampling
+import ipqc_search
+import ipqc_storage
+import ipqc_warm
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MAX_BODY = 10 * 1024 * 1024
+RELOAD_CHECK_SECONDS = 2.0
+ROUTES = {"/", "/health", "/metrics", "/models", "/search", "/sample", "/export"}
+
+logger = logging.getLogger("ipqc.api")
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ========== 資料集快取（檔案變更時在背景重新載入） ==========
+class DatasetCache(ipqc_warm.DatasetStore):
+    # 背景執行緒每 RELOAD_CHECK_SECONDS 秒檢查資料檔，新版本載入完成才切換，請求不會等待重新載入
+    def __init__(self, inspection_path=ipqc_data.INSPECTION_PATH, complaint_path=ipqc_data.COMPLAINT_PATH):
+        super().__init__(inspection_path, complaint_path, interval=RELOAD_CHECK_SECONDS)
+
+    def get(self, timeout=None):
+        dataset = super().get(timeout)
+        if dataset is None:
+            raise ApiError(503, f"資料集無法載入：{self.error}")
+        return dataset
+
+
+# ========== 延遲統計 ==========
+class LatencyMetrics:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._routes = {}
+
+    def record(self, route, seconds, error=False):
+        with self._lock:
+            entry = self._routes.setdefault(route, {"count": 0, "errors": 0, "samples": deque(maxlen=self._window)})
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["samples"].append(seconds)
+        ipqc_metrics.API_REQUESTS.inc(route=route, outcome="error" if error else "ok")
+        ipqc_metrics.API_SECONDS.observe(seconds, route=route)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {k: (v["count"], v["errors"], list(v["samples"])) for k, v in self._routes.items()}
+        out = {}
+        for route, (count, errors, samples) in routes.items():
+            s = pd.Series(samples, dtype=float) * 1000
+            out[route] = {
+                "count": count,
+                "errors": errors,
+                "p50_ms": round(float(s.quantile(0.5)), 3) if len(s) else None,
+                "p95_ms": round(float(s.quantile(0.95)), 3) if len(s) else None,
+                "p99_ms": round(float(s.quantile(0.99)), 3) if len(s) else None,
+                "max_ms": round(float(s.max()), 3) if len(s) else None,
+            }
+        return out
+
+
+# ========== 請求處理 ==========
+def _modules_arg(dataset, model, modules):
+    if not model:
+        raise ApiError(400, "缺少 model")
+    if not isinstance(model, str):
+        raise ApiError(400, "model 必須是字串")
+    if model not in dataset.models():
+        raise ApiError(404, f"找不到機型：{model}")
+    if isinstance(modules, str):
+        modules = [modules]
+    if modules is not None and not (isinstance(modules, list) and all(isinstance(m, str) for m in modules)):
+        raise ApiError(400, "modules 必須是字串或字串陣列")
+    return dataset.resolve_modules(model, modules or [ipqc_data.ALL_MODULES])
+
+
+def sample_form(dataset, body):
+    model = body.get("model")
+    modules = _modules_arg(dataset, model, body.get("modules"))
+    pool = dataset.item_pool(model, modules)
+    if pool.empty:
+        raise ApiError(404, "此機型 / 模組沒有可抽樣的項目")
+    try:
+        count = int(body.get("count", 5))
+        seed = ipqc_sampling.resolve_seed(body.get("seed"))
+        floor = ipqc_sampling.resolve_floor(body.get("floor"))
+    except (TypeError, ValueError):
+        raise ApiError(400, "count / seed / floor 格式錯誤")
+    if count < 1:
+        raise ApiError(400, "count 必須 >= 1")
+    strata = body.get("strata") or []
+    if isinstance(strata, str):
+        strata = [strata]
+    if not (isinstance(strata, list) and all(isinstance(k, str) for k in strata)):
+        raise ApiError(400, "strata 必須是字串或字串陣列")
+    unknown = [k for k in strata if k not in ipqc_sampling.STRATA]
+    if unknown:
+        raise ApiError(400, f"未知的分層方式：{', '.join(map(str, unknown))}")
+    # adaptive：依判定結果資料庫的近期 NG 紀錄提高權重
+    ng_rate = None
+    if body.get("adaptive"):
+        ng_rate = ipqc_sampling.recent_ng_rate(ipqc_results.store().pool_history(pool, model))
+    combined = ipqc_sampling.sample(pool, min(count, len(pool)), seed=seed, floor=floor, strata=strata, ng_rate=ng_rate)
+    # 項目附帶模組：送回 /export 時判定結果資料庫可記錄每列的模組
+    form = ipqc_data.layout_form(combined)[ipqc_data.FORM_COLUMNS + [ipqc_data.MODULE_COLUMN]]
+    return model, modules, form.fillna({ipqc_data.MODULE_COLUMN: ""}), seed
+
+
+def search_hits(dataset, params):
+    # params 為 parse_qs 的結果；model / kind 可重複指定
+    query = " ".join(params.get("q", [])).strip()
+    if not query:
+        raise ApiError(400, "缺少 q")
+    kinds = params.get("kind") or None
+    unknown = [k for k in kinds or [] if k not in ipqc_search.KINDS]
+    if unknown:
+        raise ApiError(400, f"未知的類別：{', '.join(unknown)}")
+    try:
+        limit = ipqc_search.resolve_limit(params.get("limit", [50])[0])
+    except ValueError:
+        raise ApiError(400, "limit 必須是正整數")
+    hits = dataset.search_index().search(query, models=params.get("model") or None, kinds=kinds, limit=limit)
+    return {"query": query, "hits": _records(ipqc_search.public(hits))}
+
+
+def export_items(items):
+    # /export 直接提供的項目：非空的物件陣列，且包含表單的所有欄位（/sample 回傳的 items 可原樣送回）
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, "items 必須是非空的物件陣列")
+    frame = pd.DataFrame(items)
+    missing = [c for c in ipqc_data.FORM_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ApiError(400, f"items 缺少欄位：{', '.join(missing)}")
+    return frame
+
+
+def _records(form):
+    return json.loads(form.to_json(orient="records", force_ascii=False))
+
+
+def make_handler(cache, metrics):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "IPQC-API/1.0"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, body, content_type="application/json; charset=utf-8", headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json_body(self):
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                raise ApiError(400, "Content-Length 格式錯誤")
+            if length < 0:
+                raise ApiError(400, "Content-Length 格式錯誤")
+            if length > MAX_BODY:
+                raise ApiError(413, "請求內容過大")
+            raw = self.rfile.read(length) if length else b"{}"
+            try:
+                body = json.loads(raw.decode("utf-8") or "{}")
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                raise ApiError(400, "請求內容不是有效的 JSON")
+            if not isinstance(body, dict):
+                raise ApiError(400, "請求內容必須是 JSON 物件")
+            return body
+
+        def _dispatch(self, method):
+            t0 = time.perf_counter()
+            parts = [unquote(p) for p in urlparse(self.path).path.strip("/").split("/") if p]
+            route = "/" + "/".join(parts[:1]) if parts else "/"
+            if len(parts) == 3 and parts[0] == "models" and parts[2] == "modules":
+                route = "/models/{model}/modules"
+            elif route not in ROUTES:
+                route = "/other"   # 未知路徑合併計數，避免指標標籤無限增加
+            error = False
+            try:
+                self._route(method, parts)
+            except ApiError as e:
+                error = e.status >= 500
+                self._send(e.status, {"error": e.message})
+            except Exception as e:
+                error = True
+                self._send(500, {"error": str(e)})
+            finally:
+                metrics.record(f"{method} {route}", time.perf_counter() - t0, error)
+
+        def _route(self, method, parts):
+            if method == "GET" and parts == ["health"]:
+                dataset = cache.get()
+                return self._send(200, {"status": "ok" if not dataset.empty else "no-data",
+                                        "version": str(cache.version)})
+            if method == "GET" and parts == ["metrics"]:
+                return self._send(200, metrics.snapshot())
+            if method == "GET" and parts == ["metrics", "prometheus"]:
+                return self._send(200, ipqc_metrics.render().encode("utf-8"), ipqc_metrics.CONTENT_TYPE)
+            if method == "GET" and parts == ["models"]:
+                return self._send(200, {"models": cache.get().models()})
+            if method == "GET" and len(parts) == 3 and parts[0] == "models" and parts[2] == "modules":
+                dataset = cache.get()
+                if parts[1] not in dataset.models():
+                    raise ApiError(404, f"找不到機型：{parts[1]}")
+                return self._send(200, {"model": parts[1], "modules": dataset.modules(parts[1])})
+            if method == "GET" and parts == ["search"]:
+                return self._send(200, search_hits(cache.get(), parse_qs(urlparse(self.path).query)))
+            if method == "POST" and parts == ["sample"]:
+                model, modules, form, seed = sample_form(cache.get(), self._json_body())
+                return self._send(200, {"model": model, "modules": modules, "seed": seed,
+                                        "count": int((form["項目"] != ipqc_data.SEPARATOR_ITEM).sum()),
+                                        "items": _records(form)})
+            if method == "POST" and parts == ["export"]:
+                return self._export(self._json_body())
+            raise ApiError(404, "找不到路徑")
+
+        def _export(self, body):
+            dataset = cache.get()
+            if body.get("items") is not None:
+                model = body.get("model")
+                modules = _modules_arg(dataset, model, body.get("modules"))
+                items = export_items(body["items"])
+                form = items.reindex(columns=ipqc_data.FORM_COLUMNS).fillna("")
+                row_modules = items[ipqc_data.MODULE_COLUMN].fillna("").tolist() if ipqc_data.MODULE_COLUMN in items else None
+                seed = body.get("seed")
+                if seed is not None and seed != "":
+                    try:
+                        seed = ipqc_sampling.resolve_seed(seed)
+                    except (TypeError, ValueError):
+                        raise ApiError(400, "seed 格式錯誤")
+            else:
+                model, modules, form, seed = sample_form(dataset, body)
+                row_modules = form.pop(ipqc_data.MODULE_COLUMN).tolist()
+            header = {k: str(body.get(k, "")) for k in
+                      ["project_no", "check_time", "supervisor", "checkedby", "checker"]}
+            data = ipqc_export.export_form(form, model, modules, seed=seed, **header)
+            ipqc_metrics.EXPORTS.inc(source="api")
+            filename = ipqc_export.export_filename(model, modules)
+            # 與頁面相同：存到目前部署的表單存放處，再把判定結果附加到結果資料庫；
+            # 兩者失敗都只記錄在日誌，不影響下載（存檔失敗時結果不指向不存在的檔案）
+            archived = None
+            try:
+                ipqc_storage.deployment().archive.write(filename, data)
+                archived = filename
+            except Exception:
+                logger.exception("API 匯出存檔失敗：%s", filename)
+            try:
+                ipqc_results.store().record(form, model, modules, file=archived, seed=seed, source="api",
+                                            row_modules=row_modules, file_sha256=ipqc_results.file_hash(data), **header)
+            except Exception:
+                logger.exception("API 匯出寫入判定結果資料庫失敗：%s", filename)
+            return self._send(200, data, XLSX_MIME, {
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
+            })
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+    return Handler
+
+
+def make_server(host="127.0.0.1", port=8765, cache=None, metrics=None):
+    cache = (cache or DatasetCache()).start()
+    metrics = metrics or LatencyMetrics()
+    server = ThreadingHTTPServer((host, port), make_handler(cache, metrics))
+    server.daemon_threads = True
+    server.cache = cache
+    server.metrics = metrics
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPQC 本機 HTTP JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--inspection", default=ipqc_data.INSPECTION_PATH)
+    parser.add_argument("--complaint", default=ipqc_data.COMPLAINT_PATH)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, DatasetCache(args.inspection, args.complaint))
+    server.cache.get()  # 啟動時先載入，第一個請求不必等待
+    print(f"IPQC API 已啟動：http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# ========== 補建判定結果資料庫（既有的匯出表單） ==========
+# 結果資料庫上線前匯出的 *_IPQC填寫版.xlsx（output/、同步資料夾、OneDrive 歷史資料夾）沒有進資料庫，
+# 這裡把它們讀回來補記：多個工作行程解析表單（ipqc_export.parse_export：表頭、項目列、判定結果、統計資訊），
+# 主行程依序寫入資料庫（SQLite 只有一個寫入者，不必搶鎖）。
+#   冪等    以 xlsx 內容的 sha256 判斷；即時匯出時已記錄的表單、各資料夾中的相同複本都只記一次
+#   可續跑  每一批檔案的判定結果與處理紀錄（indexed_files）在同一個交易中提交；中斷後重跑，etag 沒變的檔案不再下載解析
+#   模組    只選一個模組的表單以該模組記錄；多個模組時依目前資料集中（機型, 項目）所屬的模組對回每一列
+# 用法：python ipqc_cli.py backfill [--dir output/ ...] [--workers 4]
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+import ipqc_export
+import ipqc_results
+import ipqc_storage
+
+FORM_SUFFIX = "_IPQC填寫版.xlsx"
+BATCH_SIZE = 50      # 每個交易寫入的檔案數
+INFLIGHT = 4         # 每個工作行程最多排幾個待解析的檔案（限制記憶體）
+
+STATUS_LABELS = {"indexed": "新記錄", "known": "已記錄過", "blank": "沒有判定結果", "error": "無法解析", "unchanged": "未變更略過"}
+
+# 工作行程內的（機型, 項目）→ 模組（由 initializer 設定，每個行程只傳一次）
+_worker_data = {}
+
+
+# ========== 來源 ==========
+def sources(dirs=None, deployment=None):
+    # 指定資料夾時只掃描這些資料夾；否則為目前部署的表單存放處與 OneDrive 歷史資料夾
+    if dirs:
+        return [ipqc_storage.Storage(ipqc_storage.LocalBackend(d)) for d in dirs]
+    deployment = deployment or ipqc_storage.deployment()
+    return [s for s in (deployment.archive, deployment.history) if s is not None]
+
+
+def pending(storage, store):
+    # 位置中待處理的表單：檔名 → stat；處理過且 etag 沒變的略過（無法解析的每次重試）
+    done = store.indexed_files(storage.backend.key)
+    todo, unchanged = {}, 0
+    storage.invalidate()
+    for name in storage.list():
+        if not name.endswith(FORM_SUFFIX):
+            continue
+        st = storage.stat(name) or {"name": name, "etag": None, "modified": None}
+        etag, status = done.get(name, (None, None))
+        if st["etag"] is not None and st["etag"] == etag and status != "error":
+            unchanged += 1
+            continue
+        todo[name] = st
+    return todo, unchanged
+
+
+# ========== 解析（工作行程） ==========
+def item_modules(dataset):
+    # （機型, 項目）→ 該項目所屬的模組；客訴項目以問題描述為項目
+    pairs = [dataset.df[["機型", "項目", "模組"]]] if not dataset.df.empty else []
+    if not dataset.complaint_df.empty and "問題描述" in dataset.complaint_df.columns:
+        pairs.append(dataset.complaint_df[["機型", "問題描述", "模組"]].rename(columns={"問題描述": "項目"}))
+    if not pairs:
+        return {}
+    frame = pd.concat(pairs, ignore_index=True).dropna()
+    frame["項目"] = frame["項目"].astype(str).str.strip()
+    return {key: set(group) for key, group in frame.groupby(["機型", "項目"])["模組"]}
+
+
+def _init_worker(mapping):
+    _worker_data["item_modules"] = mapping
+
+
+def row_modules(form, model, modules, mapping):
+    # 多模組表單每一列的模組：項目只屬於表單中的一個模組時才填，否則留空
+    if len(modules) <= 1:
+        return None
+    result = []
+    for item in form["項目"].astype(str).str.strip():
+        found = mapping.get((model, item), set()) & set(modules)
+        result.append(next(iter(found)) if len(found) == 1 else "")
+    return result
+
+
+def check_time(parsed, name, modified):
+    # 表單上的檢查時間是手填文字：看不懂或不合理（打錯年份）時依序改用檔名中的日期、檔案修改時間
+    text = parsed["check_time"]
+    if ipqc_results.parse_time(text) is not None:
+        return text
+    when = ipqc_export.filename_date(name)
+    if when is None and isinstance(modified, (int, float)):   # 本機：epoch 秒
+        when = datetime.fromtimestamp(modified)
+    elif when is None and modified:                            # Graph：ISO 8601（UTC）
+        ts = pd.to_datetime(modified, errors="coerce", utc=True)
+        when = None if pd.isna(ts) else ts.tz_convert(None).to_pydatetime()
+    return when.isoformat() if when is not None else ""
+
+
+def parse_file(name, data, modified=None, mapping=None):
+    # 回傳 {status, detail, export}；export 為 ResultsStore.record 的參數
+    mapping = _worker_data.get("item_modules", {}) if mapping is None else mapping
+    try:
+        parsed = ipqc_export.parse_export(data)
+    except ipqc_export.FormLayoutError as e:
+        return {"status": "error", "detail": str(e), "export": None}
+    form, model, modules = parsed["form"], parsed["model"], parsed["modules"]
+    if not model:
+        return {"status": "error", "detail": "表頭沒有機型", "export": None}
+
+    # 表單上的統計是匯出當下算的；匯出後在 Excel 改過判定結果時會不一致，以判定結果為準並記下差異
+    detail = None
+    stats, recomputed = parsed["stats"], ipqc_export.form_stats(form)
+    if stats and (stats.get("異常數"), stats.get("有效總數")) != (recomputed["異常數"], recomputed["有效總數"]):
+        detail = (f"統計資訊與判定結果不符：表單 {stats.get('異常數')}/{stats.get('有效總數')}，"
+                  f"判定結果 {recomputed['異常數']}/{recomputed['有效總數']}")
+    return {"status": "parsed", "detail": detail, "export": {
+        "form": form, "model": model, "modules": modules, "file": name,
+        "checker": parsed["checker"], "supervisor": parsed["supervisor"], "checkedby": parsed["checkedby"],
+        "project_no": parsed["project_no"], "check_time": check_time(parsed, name, modified),
+        "seed": parsed["seed"], "source": "backfill", "row_modules": row_modules(form, model, modules, mapping),
+    }}
+
+
+def _parse_job(job):
+    return parse_file(*job)
+
+
+# ========== 執行 ==========
+def run(storages, store=None, dataset=None, workers=None, progress=None):
+    # 回傳各狀態的檔案數；progress(已處理, 總數) 在每一批寫入後呼叫
+    store = store or ipqc_results.store()
+    mapping = item_modules(dataset) if dataset is not None else {}
+    counts = Counter()
+    plan = []
+    for storage in storages:
+        todo, unchanged = pending(storage, store)
+        counts["unchanged"] += unchanged
+        plan.extend((storage, name, st) for name, st in todo.items())
+
+    batch, done = [], [0]
+    parsed = {}   # sha256 → 第一份的（狀態, 說明），給同一次執行中重複的內容使用
+
+    def flush(force=False):
+        if batch and (force or len(batch) >= BATCH_SIZE):
+            for status, _ in store.record_files(batch):
+                counts[status] += 1
+            done[0] += len(batch)
+            batch.clear()
+            if progress:
+                progress(done[0], len(plan))
+
+    def collect(entry, result):
+        parsed.setdefault(entry["sha256"], (result["status"], result["detail"]))
+        batch.append(dict(entry, status=result["status"], detail=result["detail"], export=result["export"]))
+        flush()
+
+    def read(storage, name, st):
+        data = storage.read(name)
+        entry = {"location": storage.backend.key, "name": name, "etag": st.get("etag"),
+                 "sha256": ipqc_results.file_hash(data)}
+        return entry, data
+
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1 and len(plan) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mapping,))
+    try:
+        inflight, seen, deferred = {}, set(), []
+        limit = INFLIGHT * workers
+        for storage, name, st in plan:
+            entry, data = read(storage, name, st)
+            # 已記錄過的內容不必解析；同一次執行中重複的內容等第一份寫入後再記錄：
+            # 第一份無法解析時沿用它的錯誤（下次重跑再試），否則記為已記錄（或沒有判定結果）
+            if entry["sha256"] in seen:
+                deferred.append(entry)
+                continue
+            seen.add(entry["sha256"])
+            if store.known_hashes([entry["sha256"]]):
+                collect(entry, {"status": "known", "detail": None, "export": None})
+                continue
+            if pool is None:
+                collect(entry, parse_file(name, data, st.get("modified"), mapping))
+                continue
+            inflight[pool.submit(_parse_job, (name, data, st.get("modified")))] = entry
+            if len(inflight) >= limit:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(inflight.pop(future), future.result())
+        for future in list(inflight):
+            collect(inflight.pop(future), future.result())
+        flush(force=True)
+        for entry in deferred:
+            status, detail = parsed[entry["sha256"]]
+            if status != "error":
+                status, detail = "known", None
+            collect(entry, {"status": status, "detail": detail, "export": None})
+        flush(force=True)
+    except KeyboardInterrupt:
+        # 已完成解析的先寫入，下次從未完成的檔案繼續
+        flush(force=True)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return counts
+
+
+def summary(counts):
+    return {STATUS_LABELS[k]: counts.get(k, 0) for k in STATUS_LABELS}
+
+
+def print_progress(done, total):
+    print(f"已處理 {done}/{total}", file=sys.stderr)
@@ -0,0 +1,105 @@
+# ========== 批次產生空白點檢表 ==========
+# 一次處理多組（機型, 模組）：在多個工作行程中抽樣並匯出空白表單，
+# 寫入 output/ 與上傳待傳區（outbox/，都在共用資料夾下），最後打包成單一 zip 回傳。
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import ipqc_data
+import ipqc_export
+import ipqc_sampling
+import ipqc_shared
+
+OUTPUT_DIR = ipqc_shared.path("output")
+OUTBOX_DIR = ipqc_shared.path("outbox")
+BUNDLE_NAME = "IPQC_批次空白表單.zip"
+
+# 工作行程內的資料集（由 initializer 設定，每個行程只傳一次）
+_worker_data = {}
+
+
+def make_job(model, modules, count, seed=None, strata=None):
+    return {"model": model, "modules": list(modules), "count": int(count), "seed": seed, "strata": list(strata or [])}
+
+
+def all_module_jobs(model_module_df, count, models=None, seed=None, strata=None):
+    # 「全部機型的全部模組」：每個（機型, 模組）各一張表單
+    jobs = []
+    for model in models or ipqc_data.list_models(model_module_df):
+        for module in ipqc_data.list_modules(model_module_df, model):
+            jobs.append(make_job(model, [module], count, strata=strata))
+    return assign_seeds(jobs, seed)
+
+
+def model_jobs(model_module_df, models, count, seed=None, strata=None):
+    # 每個機型一張表單，包含該機型所有模組
+    jobs = [make_job(model, ipqc_data.list_modules(model_module_df, model), count, strata=strata) for model in models]
+    return assign_seeds(jobs, seed)
+
+
+def assign_seeds(jobs, seed):
+    # 指定 seed 時每張表單取得固定且不同的亂數種子，結果可重現；未指定時各表單自行產生並記錄
+    if seed is not None:
+        for i, job in enumerate(jobs):
+            if job.get("seed") is None:
+                job["seed"] = seed + i
+    return jobs
+
+
+def _init_worker(df, complaint_df):
+    _worker_data["dataset"] = ipqc_data.Dataset(df, complaint_df)
+
+
+def generate_form(job, dataset=None):
+    # 回傳 (檔名, xlsx bytes, 項目數, 抽樣種子)；沒有可抽項目時回傳 None
+    dataset = _worker_data["dataset"] if dataset is None else dataset
+    model, modules = job["model"], job["modules"]
+    pool = dataset.item_pool(model, modules)
+    if pool.empty:
+        return None
+    count = max(1, min(job["count"], len(pool)))
+    seed = ipqc_sampling.resolve_seed(job.get("seed"))
+    combined = ipqc_sampling.sample(pool, count, seed=seed, strata=job.get("strata"))
+    form = ipqc_data.layout_form(combined)[ipqc_data.FORM_COLUMNS]
+    filename = ipqc_export.export_filename(model, modules)
+    return filename, ipqc_export.export_form(form, model, modules, seed=seed), len(combined), seed
+
+
+def run_batch(jobs, dataset, output_dir=OUTPUT_DIR, outbox_dir=OUTBOX_DIR, workers=None):
+    # 相同（機型, 模組）只產生一次；回傳 (zip bytes, 每張表單摘要)
+    unique, seen = [], set()
+    for job in jobs:
+        key = (job["model"], tuple(job["modules"]))
+        if key not in seen:
+            seen.add(key)
+            unique.append(job)
+
+    if workers == 1 or len(unique) <= 1:
+        results = [generate_form(job, dataset) for job in unique]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dataset.df, dataset.complaint_df)) as pool:
+            results = list(pool.map(generate_form, unique, chunksize=max(1, len(unique) // 32)))
+
+    summary = []
+    bundle = io.BytesIO()
+    with zipfile.ZipFile(bundle, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for job, result in zip(unique, results):
+            if result is None:
+                summary.append({"機型": job["model"], "模組": "/".join(job["modules"]), "檔案": "", "項目數": 0, "抽樣種子": None})
+                continue
+            filename, data, n_items, seed = result
+            if output_dir:
+                ipqc_shared.save_file(output_dir, filename, data)
+            if outbox_dir:
+                ipqc_shared.save_file(outbox_dir, filename, data)
+            zipf.writestr(filename, data)
+            summary.append({"機型": job["model"], "模組": "/".join(job["modules"]), "檔案": filename, "項目數": n_items, "抽樣種子": seed})
+    return bundle.getvalue(), summary
+
+
+def outbox_files(outbox_dir=OUTBOX_DIR):
+    if not os.path.isdir(outbox_dir):
+        return []
+    return sorted(f for f in os.listdir(outbox_dir) if f.endswith(".xlsx"))
@@ -0,0 +1,127 @@
+# ========== 產出檔暫存區（以內容雜湊存放在磁碟） ==========
+# 匯出的 xlsx、批次 zip 等下載檔寫入本機資料夾，session 只保存一個小的 handle（雜湊、檔名、類型、大小），
+# 下載按鈕在點擊時才從磁碟讀取。相同內容只存一份；超過保存時間（TTL）或總容量上限時由最舊的開始刪除。
+#   IPQC_BLOB_DIR        存放資料夾（預設共用資料夾下的 blobs/）
+#   IPQC_BLOB_TTL        保存秒數（預設 86400，一天）
+#   IPQC_BLOB_MAX_BYTES  總容量上限（預設 512 MB）
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import ipqc_shared
+
+BLOB_DIR = os.environ.get("IPQC_BLOB_DIR") or ipqc_shared.path("blobs")
+BLOB_TTL = float(os.environ.get("IPQC_BLOB_TTL", 24 * 3600))
+BLOB_MAX_BYTES = int(os.environ.get("IPQC_BLOB_MAX_BYTES", 512 * 1024 * 1024))
+EVICT_INTERVAL = 60.0   # 兩次全面清理之間至少間隔的秒數（超過容量上限時不受限制）
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+
+
+class BlobExpiredError(FileNotFoundError):
+    # 下載檔已被 TTL / 容量清理刪除（或從未寫入），需重新產生
+    def __init__(self, handle):
+        super().__init__(f"下載檔 {handle.get('name', handle.get('id'))} 已過期，請重新產生")
+        self.handle = handle
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR, ttl=BLOB_TTL, max_bytes=BLOB_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+        self._total = None   # 目前總大小（第一次清理時掃描取得，之後隨寫入 / 刪除增減）
+        os.makedirs(root, exist_ok=True)
+        self.evict()
+
+    # ---------- 寫入 / 讀取 ----------
+    def _path(self, blob_id):
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def put(self, data, name, mime=XLSX_MIME):
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            os.utime(path)   # 已有相同內容：更新時間，視為最近使用
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先寫暫存檔再改名，讀取端不會看到寫一半的檔案
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                if self._total is not None:
+                    self._total += len(data)
+        handle = {"id": blob_id, "name": name, "mime": mime, "size": len(data)}
+        self._maybe_evict()
+        return handle
+
+    def exists(self, handle):
+        return bool(handle) and os.path.exists(self._path(handle["id"]))
+
+    def open(self, handle):
+        # 檔案可能在 exists() 之後才被清理刪除：統一轉成 BlobExpiredError
+        path = self._path(handle["id"])
+        try:
+            os.utime(path)
+            return open(path, "rb")
+        except FileNotFoundError:
+            raise BlobExpiredError(handle) from None
+
+    def read(self, handle):
+        with self.open(handle) as f:
+            return f.read()
+
+    def reader(self, handle):
+        # 給 st.download_button(data=...) 使用：點擊下載時才讀取
+        # 點擊時檔案已被清理會引發 BlobExpiredError，頁面重新整理後 exists() 為 False 即提示重新產生
+        return lambda: self.read(handle)
+
+    # ---------- 清理 ----------
+    def _entries(self):
+        entries = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _maybe_evict(self):
+        with self._lock:
+            over = self._total is not None and self._total > self.max_bytes
+            due = time.time() - self._last_evict >= EVICT_INTERVAL
+        if over or due:
+            self.evict()
+
+    def evict(self, now=None):
+        # 刪除過期的檔案，再由最舊的開始刪到總大小低於上限；回傳刪除的檔案數
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if now - mtime <= self.ttl and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._total = total
+            self._last_evict = time.time()
+        return removed
+
+    def usage(self):
+        entries = self._entries()
+        return {"files": len(entries), "bytes": sum(size for _, size, _ in entries)}
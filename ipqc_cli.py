@@ -0,0 +1,230 @@
+# ========== IPQC 命令列工具（不需 Streamlit） ==========
+# 供排程預先產生表單與腳本化效能量測使用，例如：
+#   python ipqc_cli.py models
+#   python ipqc_cli.py modules --model FR301
+#   python ipqc_cli.py sample --model FR301 --modules 600 1000 --count 10 --seed 42 --output out/
+#   python ipqc_cli.py sample --model FR301 --count 10 --strata source kind --coverage
+#   python ipqc_cli.py sample --model FR301 --modules 600 --count 10 --adaptive
+#   python ipqc_cli.py batch --all --count 10 --seed 1 --output IPQC_批次空白表單.zip
+#   python ipqc_cli.py backfill --dir output/ --workers 4
+#   python ipqc_cli.py search "刮傷 / 異音" --model FR301
+import argparse
+import json
+import os
+import sys
+import time
+
+import ipqc_backfill
+import ipqc_batch
+import ipqc_data
+import ipqc_export
+import ipqc_results
+import ipqc_sampling
+import ipqc_search
+import ipqc_storage
+
+
+def _load(args):
+    t0 = time.perf_counter()
+    dataset = ipqc_data.load_dataset(args.inspection, args.complaint)
+    if dataset.empty:
+        sys.exit(f"⛔ 無法讀取點檢資料：{args.inspection}")
+    if args.verbose:
+        print(f"載入資料 {time.perf_counter() - t0:.3f}s", file=sys.stderr)
+    return dataset
+
+
+def _output_path(output, filename):
+    # 指定資料夾（或以 / 結尾）時使用標準檔名
+    if output.endswith(os.sep) or output.endswith("/") or os.path.isdir(output):
+        os.makedirs(output, exist_ok=True)
+        return os.path.join(output, filename)
+    parent = os.path.dirname(output)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    return output
+
+
+def cmd_models(args):
+    dataset = _load(args)
+    for model in dataset.models():
+        print(model)
+
+
+def cmd_modules(args):
+    dataset = _load(args)
+    for module in dataset.modules(args.model):
+        print(module)
+
+
+def cmd_sample(args):
+    dataset = _load(args)
+    if args.model not in dataset.models():
+        sys.exit(f"⛔ 找不到機型：{args.model}")
+    modules = dataset.resolve_modules(args.model, args.modules or [ipqc_data.ALL_MODULES])
+    pool = dataset.item_pool(args.model, modules)
+    if pool.empty:
+        sys.exit("⛔ 此機型 / 模組沒有可抽樣的項目")
+
+    t0 = time.perf_counter()
+    seed = ipqc_sampling.resolve_seed(args.seed)
+    count = min(args.count, len(pool))
+    ng_rate = None
+    if args.adaptive:
+        ng_rate = ipqc_sampling.recent_ng_rate(ipqc_results.store().pool_history(pool, args.model))
+    combined = ipqc_sampling.sample(pool, count, seed=seed, floor=args.floor, strata=args.strata, ng_rate=ng_rate)
+    form = ipqc_data.layout_form(combined)[ipqc_data.FORM_COLUMNS]
+    t_sample = time.perf_counter() - t0
+
+    if args.coverage:
+        report = ipqc_sampling.coverage_report(pool, count, args.strata or ["kind"], floor=args.floor, ng_rate=ng_rate)
+        print(report.to_string(index=False), file=sys.stderr)
+
+    if args.json:
+        print(form.to_json(orient="records", force_ascii=False))
+    if args.output:
+        t0 = time.perf_counter()
+        data = ipqc_export.export_form(form, args.model, modules, project_no=args.project_no,
+                                       check_time=args.check_time, checker=args.checker, seed=seed)
+        path = _output_path(args.output, ipqc_export.export_filename(args.model, modules))
+        with open(path, "wb") as f:
+            f.write(data)
+        if args.verbose:
+            print(f"抽樣 {t_sample:.3f}s（種子 {seed}），匯出 {time.perf_counter() - t0:.3f}s", file=sys.stderr)
+        print(path)
+
+
+def _outbox_dir(args):
+    # 未指定 --outbox-dir 時，只有部署設定了歷史資料夾（graph 模式）才放進上傳待傳區，否則不會有人去清空它
+    if args.outbox_dir is not None:
+        return args.outbox_dir or None
+    try:
+        storage = ipqc_storage.deployment()
+    except (RuntimeError, ValueError) as e:
+        print(f"⚠️ 無法取得部署設定，不寫入上傳待傳區：{e}", file=sys.stderr)
+        return None
+    return ipqc_batch.OUTBOX_DIR if storage.history is not None else None
+
+
+def cmd_batch(args):
+    dataset = _load(args)
+    if args.all:
+        jobs = ipqc_batch.all_module_jobs(dataset.model_module_df, args.count, seed=args.seed, strata=args.strata)
+    elif args.per_model:
+        jobs = ipqc_batch.model_jobs(dataset.model_module_df, args.models, args.count, seed=args.seed, strata=args.strata)
+    else:
+        jobs = ipqc_batch.all_module_jobs(dataset.model_module_df, args.count, models=args.models, seed=args.seed,
+                                          strata=args.strata)
+    if not jobs:
+        sys.exit("⛔ 請指定 --all 或 --models")
+
+    t0 = time.perf_counter()
+    bundle, summary = ipqc_batch.run_batch(jobs, dataset, output_dir=args.output_dir,
+                                           outbox_dir=_outbox_dir(args), workers=args.workers)
+    path = _output_path(args.output, ipqc_batch.BUNDLE_NAME)
+    with open(path, "wb") as f:
+        f.write(bundle)
+    if args.verbose:
+        print(f"批次 {len(jobs)} 張 {time.perf_counter() - t0:.3f}s", file=sys.stderr)
+    print(json.dumps(summary, ensure_ascii=False, indent=1))
+    print(path)
+
+
+def cmd_search(args):
+    dataset = _load(args)
+    t0 = time.perf_counter()
+    index = dataset.search_index()
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    hits = index.search(" ".join(args.query), models=args.model or None, kinds=args.kind or None, limit=args.limit)
+    if args.verbose:
+        print(f"建立索引 {t_build:.3f}s（{len(index)} 筆），搜尋 {time.perf_counter() - t0:.4f}s", file=sys.stderr)
+    hits = ipqc_search.public(hits)
+    if args.json:
+        print(hits.to_json(orient="records", force_ascii=False))
+    else:
+        print(hits.to_string(index=False))
+
+
+def cmd_backfill(args):
+    # 資料集只用來把多模組表單的項目對回模組；讀不到時照樣補建（各列模組留空）
+    dataset = ipqc_data.load_dataset(args.inspection, args.complaint)
+    storages = ipqc_backfill.sources(args.dir)
+    t0 = time.perf_counter()
+    counts = ipqc_backfill.run(storages, ipqc_results.ResultsStore(args.db), None if dataset.empty else dataset,
+                               workers=args.workers, progress=ipqc_backfill.print_progress if args.verbose else None)
+    if args.verbose:
+        print(f"補建 {sum(counts.values())} 個檔案 {time.perf_counter() - t0:.3f}s", file=sys.stderr)
+    print(json.dumps(ipqc_backfill.summary(counts), ensure_ascii=False, indent=1))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="IPQC 點檢表抽樣與匯出（命令列）")
+    parser.add_argument("--inspection", default=ipqc_data.INSPECTION_PATH, help="點檢資料 xlsx")
+    parser.add_argument("--complaint", default=ipqc_data.COMPLAINT_PATH, help="客訴資料 xlsx")
+    parser.add_argument("-v", "--verbose", action="store_true", help="在 stderr 顯示各階段耗時")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("models", help="列出機型").set_defaults(func=cmd_models)
+
+    p = sub.add_parser("modules", help="列出機型的模組")
+    p.add_argument("--model", required=True)
+    p.set_defaults(func=cmd_modules)
+
+    p = sub.add_parser("sample", help="抽樣並匯出一張表單")
+    p.add_argument("--model", required=True)
+    p.add_argument("--modules", nargs="*", help=f"模組（省略或填「{ipqc_data.ALL_MODULES}」表示全部）")
+    p.add_argument("--count", type=int, default=5, help="抽樣數量")
+    p.add_argument("--seed", type=ipqc_sampling.resolve_seed, default=None,
+                   help="亂數種子（非負整數，可重現；省略時自動產生並記錄在匯出檔）")
+    p.add_argument("--floor", type=ipqc_sampling.resolve_floor, default=ipqc_sampling.FLOOR_WEIGHT,
+                   help="加權抽樣的最低權重（非負）")
+    p.add_argument("--strata", nargs="*", choices=list(ipqc_sampling.STRATA), default=[],
+                   help="分層抽樣：source（來源分頁）/ kind（客訴與一般）/ tier（重要性層級）")
+    p.add_argument("--adaptive", action="store_true", help="依判定結果資料庫中的近期 NG 紀錄提高權重")
+    p.add_argument("--coverage", action="store_true", help="在 stderr 顯示各層預期涵蓋率")
+    p.add_argument("--output", help="輸出 xlsx 路徑或資料夾")
+    p.add_argument("--json", action="store_true", help="在 stdout 輸出抽樣結果 JSON")
+    p.add_argument("--project-no", default="", help="專案序號")
+    p.add_argument("--check-time", default="", help="檢查時間")
+    p.add_argument("--checker", default="", help="點檢人員")
+    p.set_defaults(func=cmd_sample)
+
+    p = sub.add_parser("batch", help="批次產生空白表單")
+    p.add_argument("--all", action="store_true", help="全部機型的全部模組")
+    p.add_argument("--models", nargs="*", default=[], help="指定機型")
+    p.add_argument("--per-model", action="store_true", help="每個機型一張（包含全部模組）")
+    p.add_argument("--count", type=int, default=5)
+    p.add_argument("--seed", type=ipqc_sampling.resolve_seed, default=None)
+    p.add_argument("--strata", nargs="*", choices=list(ipqc_sampling.STRATA), default=[])
+    p.add_argument("--workers", type=int, default=None, help="工作行程數（預設為 CPU 數）")
+    p.add_argument("--output", default=ipqc_batch.BUNDLE_NAME, help="zip 輸出路徑或資料夾")
+    p.add_argument("--output-dir", default=ipqc_batch.OUTPUT_DIR, help="表單存放資料夾")
+    p.add_argument("--outbox-dir", default=None,
+                   help="上傳待傳區（省略時僅在部署有歷史資料夾時使用共用的 outbox/；給空字串則不寫入）")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("search", help="全文搜尋客訴 / 點檢項目")
+    p.add_argument("query", nargs="+", help="關鍵字（多個以空白或 / 分隔，符合任一個即列出）")
+    p.add_argument("--model", nargs="*", default=[], help="只看這些機型")
+    p.add_argument("--kind", nargs="*", choices=list(ipqc_search.KINDS), default=[], help="complaint（客訴）/ inspection（點檢項目）")
+    p.add_argument("--limit", type=ipqc_search.resolve_limit, default=20)
+    p.add_argument("--json", action="store_true", help="輸出 JSON")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("backfill", help="把既有的匯出表單補進判定結果資料庫（可重跑、可中斷後續跑）")
+    p.add_argument("--dir", nargs="*", default=[],
+                   help="表單資料夾（省略時為目前部署 IPQC_STORAGE 的表單存放處與 OneDrive 歷史資料夾）")
+    p.add_argument("--workers", type=int, default=None, help="解析表單的工作行程數（預設為 CPU 數）")
+    p.add_argument("--db", default=ipqc_results.RESULTS_DB, help="判定結果資料庫")
+    p.set_defaults(func=cmd_backfill)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
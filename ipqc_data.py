@@ -0,0 +1,245 @@
+# ========== IPQC 資料載入與整理（不依賴 Streamlit） ==========
+# 頁面、批次與命令列共用：讀取所有分頁、模組欄位清洗、依機型/模組篩選項目、抽樣後排版。
+import os
+
+import numpy as np
+import pandas as pd
+
+import ipqc_search
+import ipqc_shared
+
+# 目前版本的資料檔（共用資料夾 IPQC_SHARED_DIR 下的 data/，預設即 data/）
+INSPECTION_PATH = ipqc_shared.path("data", ipqc_shared.DATA_FILES["inspection"])
+COMPLAINT_PATH = ipqc_shared.path("data", ipqc_shared.DATA_FILES["complaint"])
+
+ITEM_COLUMNS = ["項目", "規範", "方法", "重要性", "客訴編號", "判定結果"]
+FORM_COLUMNS = ["項次"] + ITEM_COLUMNS
+SOURCE_COLUMN = "來源分頁"
+MODULE_COLUMN = "模組"
+POOL_COLUMNS = ITEM_COLUMNS + [SOURCE_COLUMN, MODULE_COLUMN]   # 項目池多帶來源分頁（分層抽樣）與模組（判定結果紀錄）
+ALL_MODULES = "全部項目"
+SEPARATOR_ITEM = "👇 以下為客訴相關項目 👇"
+
+
+# ========== 載入資料 ==========
+def read_all_sheets(path):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    xls = pd.ExcelFile(path)
+    all_dfs = []
+    for sheet in xls.sheet_names:
+        df_raw = pd.read_excel(xls, sheet_name=sheet, header=None)
+        header_row = df_raw[df_raw.apply(lambda row: row.astype(str).str.contains("機型").any() and row.astype(str).str.contains("模組").any(), axis=1)].index
+        if not header_row.empty:
+            header_idx = header_row[0]
+            df = pd.read_excel(xls, sheet_name=sheet, header=header_idx)
+            df.columns = df.columns.astype(str).str.strip()
+            if "機型" in df.columns and "模組" in df.columns:
+                df['來源分頁'] = sheet
+                all_dfs.append(df)
+    return pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
+
+
+# ========== 模組欄位清洗 ==========
+def normalize_module(val):
+    if pd.isna(val) or str(val).strip() == "":
+        return ""  # 空的就不處理
+
+    val = str(val).strip().upper()
+    if val in ["NA", "NAN", "QQA", "NQA", "QQC"]:
+        return "NA"  # 全部歸類為 NA
+
+    try:
+        return str(int(float(val)))  # 數字轉為整數字串，例如 100.0 → "100"
+    except:
+        return ""  # 非數字且不是 NA 類，就當作無效，排除
+
+
+def prepare_frame(df):
+    # 欄位處理與清洗，並只保留有效模組
+    if df.empty:
+        return df
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    df["機型"] = df["機型"].astype(str).str.strip()
+    df["模組"] = df["模組"].apply(normalize_module)
+    return df[df['模組'] != ""]
+
+
+def load_datasets(inspection_path, complaint_path):
+    return prepare_frame(read_all_sheets(inspection_path)), prepare_frame(read_all_sheets(complaint_path))
+
+
+# ========== 機型 / 模組清單 ==========
+def model_module_pairs(df, complaint_df):
+    # 合併主資料與客訴資料的機型與模組組合
+    return pd.concat([
+        df[['機型', '模組']],
+        complaint_df[['機型', '模組']] if not complaint_df.empty else pd.DataFrame(columns=["機型", "模組"])
+    ]).drop_duplicates().reset_index(drop=True)
+
+
+def list_models(model_module_df):
+    return sorted(model_module_df["機型"].dropna().unique())
+
+
+def module_sort_key(x):
+    return (x == "NA", int(x) if x.isdigit() else float('inf'))
+
+
+def list_modules(model_module_df, model):
+    return sorted(
+        model_module_df[model_module_df['機型'] == model]['模組'].dropna().unique(),
+        key=module_sort_key
+    )
+
+
+def resolve_modules(model_module_df, model, selected):
+    # 選了「全部項目」就展開成該機型的所有模組
+    if ALL_MODULES in selected:
+        return list_modules(model_module_df, model)
+    return list(selected)
+
+
+# ========== （機型, 模組）索引 ==========
+def build_index(frame):
+    # (機型, 模組) → 列位置；篩選時直接取列，不必每次掃描整張表
+    if frame.empty:
+        return {}
+    return dict(frame.groupby(["機型", "模組"], sort=False).indices)
+
+
+def select_rows(frame, model, modules, index=None):
+    # 與 frame[(機型 == model) & 模組.isin(modules)] 相同（保留原始順序）
+    if index is None:
+        return frame[(frame['機型'] == model) & (frame['模組'].isin(modules))]
+    positions = [index[(model, m)] for m in modules if (model, m) in index]
+    if not positions:
+        return frame.iloc[0:0]
+    return frame.iloc[np.sort(np.concatenate(positions))]
+
+
+# ========== 依機型 / 模組取出項目 ==========
+def inspection_items(df, model, modules, index=None):
+    return inspection_pool(select_rows(df, model, modules, index))
+
+
+def inspection_pool(rows):
+    # 點檢資料列 → 項目池格式
+    filtered = rows.copy()
+    filtered["判定結果"] = ""
+    filtered["客訴編號"] = ""
+    if SOURCE_COLUMN not in filtered.columns:
+        filtered[SOURCE_COLUMN] = ""
+    return filtered[POOL_COLUMNS]
+
+
+def complaint_items(complaint_df, model, modules, index=None):
+    if complaint_df.empty:
+        return pd.DataFrame(columns=POOL_COLUMNS)
+    return complaint_pool(select_rows(complaint_df, model, modules, index))
+
+
+def complaint_pool(rows):
+    # 客訴資料列 → 項目池格式（問題描述為項目）
+    if rows.empty:
+        return pd.DataFrame(columns=POOL_COLUMNS)
+    complaints = rows.copy()
+    complaints["項目"] = complaints["問題描述"] if "問題描述" in complaints.columns else ""
+    for col in ["項目", "規範", "方法", "重要性", "客訴編號", SOURCE_COLUMN]:
+        if col not in complaints.columns:
+            complaints[col] = ""
+    complaints_filtered = complaints[["項目", "規範", "方法", "重要性", "客訴編號"]].copy()
+    complaints_filtered["判定結果"] = ""
+    complaints_filtered[SOURCE_COLUMN] = complaints[SOURCE_COLUMN]
+    complaints_filtered[MODULE_COLUMN] = complaints[MODULE_COLUMN]
+    return complaints_filtered
+
+
+def item_pool(inspection, complaints):
+    merged = pd.concat([inspection, complaints], ignore_index=True)
+    merged["重要性"] = pd.to_numeric(merged["重要性"], errors="coerce").fillna(0)
+    return merged
+
+
+# ========== 資料集（整理後的兩張表 + 索引） ==========
+class Dataset:
+    def __init__(self, df, complaint_df):
+        self.df = df
+        self.complaint_df = complaint_df
+        self.model_module_df = model_module_pairs(df, complaint_df)
+        self.index = build_index(df)
+        self.complaint_index = build_index(complaint_df)
+        self._models = None
+        self._modules = {}   # 機型 → 模組清單（warm() 預先建立，或第一次查詢時建立）
+        self._search = None  # 客訴 / 點檢項目全文搜尋索引
+
+    def warm(self):
+        # 預先建立機型 / 模組清單與搜尋索引，之後的查詢只是取字典
+        for model in self.models():
+            self.modules(model)
+        self.search_index()
+        return self
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def models(self):
+        if self._models is None:
+            self._models = list_models(self.model_module_df)
+        return self._models
+
+    def modules(self, model):
+        if model not in self._modules:
+            self._modules[model] = list_modules(self.model_module_df, model)
+        return self._modules[model]
+
+    def resolve_modules(self, model, selected):
+        return resolve_modules(self.model_module_df, model, selected)
+
+    def inspection_items(self, model, modules):
+        return inspection_items(self.df, model, modules, self.index)
+
+    def complaint_items(self, model, modules):
+        return complaint_items(self.complaint_df, model, modules, self.complaint_index)
+
+    def item_pool(self, model, modules):
+        return item_pool(self.inspection_items(model, modules), self.complaint_items(model, modules))
+
+    def search_index(self):
+        if self._search is None:
+            self._search = ipqc_search.SearchIndex(self.df, self.complaint_df)
+        return self._search
+
+    def hit_items(self, hits, kind):
+        # 搜尋結果（ipqc_search）中某一類別的列 → 項目池格式
+        rows = hits.loc[hits["kind"] == kind, "row"].astype(int).to_numpy()
+        if kind == "complaint":
+            return complaint_pool(self.complaint_df.iloc[rows])
+        return inspection_pool(self.df.iloc[rows])
+
+
+def load_dataset(inspection_path=INSPECTION_PATH, complaint_path=COMPLAINT_PATH):
+    return Dataset(*load_datasets(inspection_path, complaint_path))
+
+
+# ========== 抽樣結果排版 ==========
+def layout_form(combined):
+    # 區分客訴，一般項目在前，分隔列之後為客訴項目
+    is_complaint = combined["客訴編號"].astype(str).str.strip() != ""
+    df_normal = combined[~is_complaint].reset_index(drop=True)
+    df_normal["項次"] = range(1, len(df_normal)+1)
+    df_complaint = combined[is_complaint].reset_index(drop=True)
+    df_complaint["項次"] = range(len(df_normal)+2, len(df_normal)+2+len(df_complaint))
+
+    separator_row = pd.DataFrame([{
+        "項次": "",
+        "項目": SEPARATOR_ITEM,
+        "規範": "",
+        "方法": "",
+        "重要性": "",
+        "客訴編號": "",
+        "判定結果": ""
+    }])
+    return pd.concat([df_normal, separator_row, df_complaint], ignore_index=True)
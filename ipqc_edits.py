@@ -0,0 +1,262 @@
+# ========== 可編輯表格：基底資料 + 編輯紀錄 ==========
+# session 只保存一次不會變動的基底資料，以及 st.data_editor 的編輯紀錄（修改的儲存格、新增列、刪除列），
+# 需要完整表格時（抽樣、匯出）才套用紀錄產生；筆數統計直接由紀錄增減，
+# 每次重跑的運算量與記憶體只跟編輯數量有關，與表格大小無關。
+# 項目很多時可改用分頁編輯：篩選 / 排序在伺服器上對整份資料進行，只把目前頁面送到瀏覽器，
+# 頁面上的編輯依列位置換算後寫回同一份編輯紀錄。
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def editor_key(prefix, signature):
+    # 每個（機型, 模組）或每次抽樣使用各自的編輯器，切換時不會把舊的編輯套到新的資料上
+    return f"{prefix}_{hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:12]}"
+
+
+class EditedFrame:
+    def __init__(self, base, signature=None):
+        self.base = base.reset_index(drop=True)
+        self.signature = signature
+        self.edited_rows = {}
+        self.added_rows = []
+        self.deleted_rows = []
+        self.version = 0
+        # 分頁編輯：切換頁面 / 篩選時確認（commit）目前的編輯，頁面資料與位置以確認後的紀錄為準
+        self.commits = 0
+        self._committed = ({}, [], [])
+        self._window_key = None
+        self._window = None
+        self._view_cache = (None, None)
+        # 重要性只在建立時轉換一次，統計時依編輯紀錄增減
+        if "重要性" in self.base.columns:
+            self._importance = pd.to_numeric(self.base["重要性"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        else:
+            self._importance = np.zeros(len(self.base))
+        self._base_must = int((self._importance >= 1).sum())
+
+    # ---------- 編輯紀錄 ----------
+    def sync(self, state):
+        # state 為 st.session_state[編輯器 key]：{"edited_rows", "added_rows", "deleted_rows"}
+        state = state or {}
+        edited = {int(k): dict(v) for k, v in (state.get("edited_rows") or {}).items()}
+        added = [dict(r) for r in state.get("added_rows") or []]
+        deleted = sorted({int(i) for i in state.get("deleted_rows") or []})
+        return self._set_log(edited, added, deleted)
+
+    def _set_log(self, edited, added, deleted):
+        if edited != self.edited_rows or added != self.added_rows or deleted != self.deleted_rows:
+            self.edited_rows, self.added_rows, self.deleted_rows = edited, added, deleted
+            self.version += 1
+        return self
+
+    @property
+    def edit_count(self):
+        return sum(len(v) for v in self.edited_rows.values()) + len(self.added_rows) + len(self.deleted_rows)
+
+    def __len__(self):
+        return len(self.base) + len(self.added_rows) - len(self.deleted_rows)
+
+    # ---------- 不必產生完整表格的統計 ----------
+    def importance_counts(self):
+        # 回傳 (總筆數, 重要性 >= 1 的筆數)
+        n_base = len(self._importance)
+        must = self._base_must
+        deleted = set(self.deleted_rows)
+        for row in deleted:
+            if 0 <= row < n_base:
+                must -= int(self._importance[row] >= 1)
+        for row, values in self.edited_rows.items():
+            if row in deleted or not 0 <= row < n_base or "重要性" not in values:
+                continue
+            must += int(_to_importance(values["重要性"]) >= 1) - int(self._importance[row] >= 1)
+        for j, added in enumerate(self.added_rows):
+            if n_base + j in deleted:
+                continue
+            value = self.edited_rows.get(n_base + j, {}).get("重要性", added.get("重要性"))
+            must += int(_to_importance(value) >= 1)
+        return len(self), must
+
+    # ---------- 完整表格（需要時才產生） ----------
+    def frame(self):
+        # 套用順序與 st.data_editor 相同：修改儲存格 → 刪除列 → 新增列
+        # （分頁編輯時，位置 >= 基底筆數代表新增列，可再被修改或刪除）
+        return _apply_log(self.base, self.edited_rows, self.added_rows, self.deleted_rows)
+
+    # ---------- 分頁編輯 ----------
+    def commit(self):
+        # 目前的編輯紀錄成為頁面的基準；新增列上的修改併入新增列本身
+        n_base = len(self.base)
+        edited = {}
+        added = [dict(r) for r in self.added_rows]
+        for row, values in self.edited_rows.items():
+            if n_base <= row < n_base + len(added):
+                added[row - n_base].update(values)
+            else:
+                edited[row] = dict(values)
+        self.edited_rows, self.added_rows = edited, added
+        self._committed = ({k: dict(v) for k, v in edited.items()}, [dict(r) for r in added], list(self.deleted_rows))
+        self.commits += 1
+        return self
+
+    def append(self, rows):
+        # 由程式新增列（例如搜尋結果加入項目池）：併入已確認的新增列，編輯器以新的頁面資料重新開始
+        self.commit()
+        self._set_log(self.edited_rows, self.added_rows + [dict(r) for r in rows], self.deleted_rows)
+        self._window_key = None
+        return self.commit()
+
+    def window(self, query="", column=None, sort_by=None, ascending=True, page=1, page_size=None):
+        # 回傳 (本頁各列位置, 本頁資料, 符合條件的筆數)；條件或頁數改變時才重新計算，並先確認目前的編輯
+        key = (query, column, sort_by, ascending, page, page_size)
+        if key != self._window_key:
+            self.commit()
+            # 紀錄沒有變動時（例如只是換頁）沿用上次篩選 / 排序的結果
+            view_key = (self.version, query, column, sort_by, ascending)
+            if self._view_cache[0] != view_key:
+                self._view_cache = (view_key, self._view(query, column, sort_by, ascending))
+            positions = self._view_cache[1]
+            if page_size:
+                positions_page = positions[(page - 1) * page_size:page * page_size]
+            else:
+                positions_page = positions
+            self._window = (positions_page, self.rows(positions_page), len(positions))
+            self._window_key = key
+        return self._window
+
+    def sync_page(self, positions, state):
+        # state 為分頁編輯器的狀態（相對於 rows(positions)），換算成整份資料的位置後與已確認的紀錄合併
+        state = state or {}
+        committed_edited, committed_added, committed_deleted = self._committed
+        edited = {k: dict(v) for k, v in committed_edited.items()}
+        deleted = set(committed_deleted)
+        for i, values in (state.get("edited_rows") or {}).items():
+            i = int(i)
+            if 0 <= i < len(positions):
+                edited.setdefault(int(positions[i]), {}).update(values)
+        for i in state.get("deleted_rows") or []:
+            i = int(i)
+            if 0 <= i < len(positions):
+                deleted.add(int(positions[i]))
+        added = [dict(r) for r in committed_added] + [dict(r) for r in state.get("added_rows") or []]
+        return self._set_log(edited, added, sorted(deleted))
+
+    def rows(self, positions):
+        # 指定位置的資料（已確認的紀錄），只處理這幾列
+        edited, added, deleted = self._committed
+        n_base = len(self.base)
+        positions = np.asarray(positions, dtype=int)
+        if len(positions) == n_base and not (edited or added or deleted) and (positions == np.arange(n_base)).all():
+            return self.base
+        is_base = positions < n_base
+        page = self.base.iloc[positions[is_base]]
+        if not is_base.all():
+            extra = pd.DataFrame([added[p - n_base] for p in positions[~is_base]]).reindex(columns=self.base.columns)
+            page = pd.concat([page, extra])
+            order = np.argsort(np.concatenate([np.flatnonzero(is_base), np.flatnonzero(~is_base)]), kind="stable")
+            page = page.iloc[order]
+        page = page.reset_index(drop=True)
+        for i, p in enumerate(positions):
+            for col, value in edited.get(int(p), {}).items():
+                _set_cell(page, i, col, value)
+        return page
+
+    def _view(self, query, column, sort_by, ascending):
+        # 已確認紀錄下仍存在的列，依關鍵字篩選、依欄位排序，回傳位置陣列
+        _, added, deleted = self._committed
+        n_base = len(self.base)
+        positions = np.setdiff1d(np.arange(n_base + len(added)), np.asarray(deleted, dtype=int))
+        if query:
+            columns = [column] if column else list(self.base.columns)
+            mask = np.zeros(len(positions), dtype=bool)
+            for col in columns:
+                text = self._values(col, positions).fillna("").astype(str)
+                mask |= text.str.contains(query, case=False, regex=False).to_numpy()
+            positions = positions[mask]
+        if sort_by:
+            values = self._values(sort_by, positions)
+            if _is_numeric(self.base, sort_by):
+                values = pd.to_numeric(values, errors="coerce")
+            else:
+                values = values.fillna("").astype(str)
+            order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index
+            positions = positions[order.to_numpy()]
+        return positions
+
+    def _values(self, col, positions):
+        # 指定欄位在各位置的值（已確認的紀錄）；positions 需由小到大排列
+        edited, added, _ = self._committed
+        n_base = len(self.base)
+        values = np.empty(len(positions), dtype=object)
+        is_base = positions < n_base
+        values[is_base] = self.base[col].to_numpy(dtype=object)[positions[is_base]]
+        for i in np.flatnonzero(~is_base):
+            values[i] = added[positions[i] - n_base].get(col)
+        for row, changes in edited.items():
+            i = np.searchsorted(positions, row)
+            if col in changes and i < len(positions) and positions[i] == row:
+                values[i] = changes[col]
+        return pd.Series(values, dtype=object)
+
+
+def _is_numeric(frame, col):
+    return pd.api.types.is_numeric_dtype(frame[col].dtype) and not pd.api.types.is_bool_dtype(frame[col].dtype)
+
+
+def _set_cell(frame, row, col, value):
+    if col not in frame.columns or not 0 <= row < len(frame):
+        return
+    if _needs_object(frame[col], value):
+        frame[col] = frame[col].astype(object)
+    frame.iat[row, frame.columns.get_loc(col)] = value
+
+
+def _apply_log(base, edited_rows, added_rows, deleted_rows):
+    frame = base.copy()
+    n_base = len(frame)
+    added = [dict(r) for r in added_rows]
+    for row, values in edited_rows.items():
+        if n_base <= row < n_base + len(added):
+            added[row - n_base].update(values)
+            continue
+        for col, value in values.items():
+            _set_cell(frame, row, col, value)
+    deleted = set(deleted_rows)
+    if deleted:
+        frame = frame.drop(index=[r for r in sorted(deleted) if r < n_base])
+    added = [r for j, r in enumerate(added) if n_base + j not in deleted]
+    if added:
+        frame = pd.concat([frame, pd.DataFrame(added).reindex(columns=frame.columns)], ignore_index=True)
+    return frame.reset_index(drop=True)
+
+
+def _to_importance(value):
+    value = pd.to_numeric(pd.Series([value]), errors="coerce").iloc[0]
+    return 0.0 if pd.isna(value) else float(value)
+
+
+def _needs_object(series, value):
+    # 欄位型別放不下填入的值時（例如數值欄填入文字）改為 object，避免 pandas 型別錯誤；清空儲存格為 None
+    dtype = series.dtype
+    if dtype == object or value is None:
+        return False
+    if pd.api.types.is_bool_dtype(dtype):
+        return not isinstance(value, (bool, np.bool_))
+    if pd.api.types.is_integer_dtype(dtype):
+        return not (isinstance(value, (int, np.integer)) and not isinstance(value, bool))
+    if pd.api.types.is_numeric_dtype(dtype):
+        return not isinstance(value, (int, float, np.number)) or isinstance(value, bool)
+    if pd.api.types.is_string_dtype(dtype):
+        return not isinstance(value, str)
+    return True
+
+
+def pool_counts(*grids):
+    # 多個表格合計的 (總筆數, 必出現筆數)
+    total = must = 0
+    for grid in grids:
+        n, m = grid.importance_counts()
+        total += n
+        must += m
+    return total, must
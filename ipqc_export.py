@@ -0,0 +1,541 @@
+# ========== IPQC 點檢表匯出引擎 ==========
+# 版面與原本 📤 匯出結果 相同：標題三列、IPQCTable 表格、統計資訊區塊、簽核列。
+# 樣式只建立一次（NamedStyle），欄寬直接由 DataFrame 計算，活頁簿只序列化一次。
+# 範本模式：固定骨架存成 templates/ 下的 xlsx，匯出時只填入表頭、項目列與統計；
+# 項目很多時改走直接寫 XML 的快速路徑。
+# 讀回（parse_export）：由匯出的版面取回表頭欄位、項目列、判定結果與統計，供補建結果資料庫使用。
+import functools
+import io
+import os
+import re
+import zipfile
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableStyleInfo
+
+EXPORT_COLUMNS = ["項次", "項目", "規範", "方法", "重要性", "客訴編號", "判定結果"]
+SEPARATOR_TEXT = "以下為客訴相關項目"
+SHEET_TITLE = "IPQC點檢"
+FORM_TITLE = "IPQC重點點檢表"
+TABLE_NAME = "IPQCTable"
+TABLE_STYLE = "TableStyleMedium9"
+HEADER_ROW = 4          # 表格標題列所在列
+MERGE_LAST_COL = 8      # 標題 / 簽核列合併到 H 欄
+STATS_OFFSET = 6        # 統計資訊放在「判定結果」右邊第 6 欄
+MAX_COL_WIDTH = 30
+INDEX_COL_WIDTH = 6     # 「項次」欄（A 欄）固定寬度
+SEED_KEYWORD = "抽樣種子"  # 抽樣種子記錄在文件摘要的「關鍵字」，可用來重現抽樣
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "IPQC重點點檢表_template.xlsx")
+XML_FAST_PATH_ROWS = 1000   # 項目列超過此數量時改用直接寫 XML
+EXPORT_MODE = os.environ.get("IPQC_EXPORT_MODE", "template")   # "template" 或 "build"
+
+# === 共用樣式元件（模組載入時建立一次） ===
+_MEDIUM = Side(style="medium")
+_BORDER = Border(left=_MEDIUM, right=_MEDIUM, top=_MEDIUM, bottom=_MEDIUM)
+_HEADER_FILL = PatternFill("solid", fgColor="DDEBF7")
+
+# 名稱 → (font, fill, border, alignment)；None 表示沿用活頁簿預設（與未設定樣式的儲存格相同）
+_STYLE_SPECS = {
+    "ipqc_title": (Font(bold=True, size=14), None, DEFAULT_BORDER, None),
+    "ipqc_subtitle": (Font(bold=True, size=12), None, DEFAULT_BORDER, None),
+    "ipqc_header": (Font(bold=True, size=12), _HEADER_FILL, _BORDER,
+                    Alignment(horizontal="center", vertical="center", wrap_text=True)),
+    "ipqc_cell": (DEFAULT_FONT, None, _BORDER,
+                  Alignment(horizontal="left", vertical="center", wrap_text=True)),
+    "ipqc_stats_title": (Font(bold=True), _HEADER_FILL, _BORDER,
+                         Alignment(horizontal="center", vertical="center")),
+    "ipqc_stats": (DEFAULT_FONT, None, _BORDER, Alignment(horizontal="left", vertical="center")),
+}
+
+
+def register_styles(wb):
+    # NamedStyle 綁定後會記住所屬活頁簿，所以每本活頁簿註冊一份新的
+    for name, (font, fill, border, alignment) in _STYLE_SPECS.items():
+        style = NamedStyle(name=name)
+        if font is not None:
+            style.font = font
+        if fill is not None:
+            style.fill = fill
+        if border is not None:
+            style.border = border
+        if alignment is not None:
+            style.alignment = alignment
+        wb.add_named_style(style)
+
+
+def modules_label(modules, sep="/"):
+    return sep.join(modules) if isinstance(modules, (list, tuple)) else str(modules)
+
+
+def export_filename(model, modules, when=None):
+    # 西元日期、不包含時間，例如 FR301_600_20250812_IPQC填寫版.xlsx
+    date_str = (when or datetime.now()).strftime("%Y%m%d")
+    return f"{model}_{modules_label(modules, '_')}_{date_str}_IPQC填寫版.xlsx"
+
+
+# ========== 資料整理（向量化） ==========
+def form_rows(edited_df):
+    # 移除空白列與「以下為客訴相關項目」分隔列，並重新編號項次（第一欄）
+    frame = edited_df.reset_index(drop=True)
+    text = frame.astype(str).where(frame.notna(), "")
+    keep = text.apply(lambda s: s.str.strip() != "").any(axis=1)
+    keep &= ~text.apply(lambda s: s.str.contains(SEPARATOR_TEXT, regex=False)).any(axis=1)
+    frame = frame[keep].reset_index(drop=True)
+    if len(frame.columns):
+        frame.isetitem(0, list(range(1, len(frame) + 1)))
+    return frame
+
+
+def form_stats(edited_df):
+    results = edited_df["判定結果"].dropna()
+    valid = int((results.astype(str).str.strip() != "").sum())
+    ng = int((results == "NG").sum())
+    rate = (ng / valid) * 100 if valid > 0 else 0
+    return {"NG 異常率": rate, "異常數": ng, "有效總數": valid}
+
+
+def stats_lines(stats):
+    return [
+        f"1. NG 異常率: {stats['NG 異常率']:.2f}%",
+        f"2. 異常數: {stats['異常數']}",
+        f"3. 有效總數: {stats['有效總數']}",
+    ]
+
+
+def stats_column(columns):
+    try:
+        return list(columns).index("判定結果") + 1 + STATS_OFFSET
+    except ValueError:
+        return len(columns) + STATS_OFFSET
+
+
+def _text_widths(frame):
+    # 與逐格 len(str(value)) 相同，但以欄為單位計算；空值 / 0 不列入
+    if frame.empty:
+        return [0] * len(frame.columns)
+    widths = []
+    for col in frame.columns:
+        s = frame[col]
+        lens = s.astype(str).str.len().where(s.astype(bool), 0)
+        widths.append(int(lens.max()))
+    return widths
+
+
+def column_widths(headers, rows, stats_col, lines):
+    # 回傳 {欄字母: 寬度}，與原本逐格掃描 ws.columns 的結果一致
+    body = _text_widths(rows)
+    max_len = {}
+    for j, header in enumerate(headers, start=1):
+        max_len[j] = max(len(header), body[j - 1] if body else 0)
+    max_len[stats_col] = max(max_len.get(stats_col, 0), len("統計資訊"), *(len(t) for t in lines))
+    last_col = max(stats_col, len(headers), MERGE_LAST_COL)
+    widths = {}
+    for j in range(1, last_col + 1):
+        letter = get_column_letter(j)
+        widths[letter] = INDEX_COL_WIDTH if letter == "A" else min(max_len.get(j, 0) + 2, MAX_COL_WIDTH)
+    return widths
+
+
+def seed_keywords(seed):
+    return f"{SEED_KEYWORD}={seed}"
+
+
+def header_texts(model, modules, project_no, check_time, supervisor, checkedby, checker):
+    return {
+        "title": FORM_TITLE,
+        "model_line": f"機型: {model}    模組: {modules_label(modules)}",
+        "project_line": f"專案序號: {project_no}    檢查時間: {check_time}",
+        "confirm_line": f"主管確認: {supervisor}        被點檢人員確認: {checkedby}        點檢人員: {checker}",
+    }
+
+
+# ========== 建立活頁簿 ==========
+def build_ipqc_workbook(edited_df, model, modules, project_no="", check_time="",
+                        supervisor="", checkedby="", checker="", seed=None):
+    texts = header_texts(model, modules, project_no, check_time, supervisor, checkedby, checker)
+    wb = Workbook()
+    register_styles(wb)
+    if seed is not None:
+        wb.properties.keywords = seed_keywords(seed)
+    ws = wb.active
+    ws.title = SHEET_TITLE
+
+    # === 表頭 ===
+    for row, key, style in [(1, "title", "ipqc_title"), (2, "model_line", "ipqc_subtitle"),
+                            (3, "project_line", "ipqc_subtitle")]:
+        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=MERGE_LAST_COL)
+        cell = ws.cell(row=row, column=1, value=texts[key])
+        cell.style = style
+
+    # === 表格標題列 ===
+    headers = [str(col) for col in edited_df.columns]
+    for col_num, col_name in enumerate(headers, start=1):
+        ws.cell(row=HEADER_ROW, column=col_num, value=col_name).style = "ipqc_header"
+
+    # === 資料列 ===
+    rows = form_rows(edited_df)
+    for idx, row in enumerate(rows.values.tolist(), start=1):
+        for j, val in enumerate(row, start=1):
+            ws.cell(row=HEADER_ROW + idx, column=j, value=val).style = "ipqc_cell"
+
+    # === Excel 樣式表格 ===
+    end_row = HEADER_ROW + len(rows)
+    table = Table(displayName=TABLE_NAME, ref=f"A{HEADER_ROW}:{get_column_letter(len(headers))}{end_row}")
+    table.tableStyleInfo = TableStyleInfo(name=TABLE_STYLE, showRowStripes=False, showColumnStripes=False)
+    ws.add_table(table)
+
+    # === 統計資訊 ===
+    stats_col = stats_column(edited_df.columns)
+    lines = stats_lines(form_stats(edited_df))
+    ws.cell(row=HEADER_ROW, column=stats_col, value="統計資訊").style = "ipqc_stats_title"
+    for i, text in enumerate(lines, start=1):
+        ws.cell(row=HEADER_ROW + i, column=stats_col, value=text).style = "ipqc_stats"
+
+    # === 主管 / 被點檢人員 / 點檢人員 簽核列 ===
+    confirm_row = max(end_row, HEADER_ROW + len(lines)) + 3
+    ws.merge_cells(start_row=confirm_row, start_column=1, end_row=confirm_row, end_column=MERGE_LAST_COL)
+    ws.cell(row=confirm_row, column=1, value=texts["confirm_line"]).style = "ipqc_subtitle"
+
+    # === 欄寬 ===
+    for letter, width in column_widths(headers, rows, stats_col, lines).items():
+        ws.column_dimensions[letter].width = width
+    return wb
+
+
+def workbook_bytes(wb):
+    bio = io.BytesIO()
+    wb.save(bio)
+    return bio.getvalue()
+
+
+def export_ipqc_xlsx(edited_df, model, modules, **header):
+    # 只序列化一次；同一份 bytes 供下載、存檔與上傳共用
+    return workbook_bytes(build_ipqc_workbook(edited_df, model, modules, **header))
+
+
+# ========== 範本填入模式 ==========
+def build_template():
+    # 固定骨架：標題、空白表頭列、表格標題列、一列樣式原型、統計資訊標題與三格統計、IPQCTable
+    wb = Workbook()
+    register_styles(wb)
+    ws = wb.active
+    ws.title = SHEET_TITLE
+    for row, style in [(1, "ipqc_title"), (2, "ipqc_subtitle"), (3, "ipqc_subtitle")]:
+        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=MERGE_LAST_COL)
+        ws.cell(row=row, column=1).style = style
+    ws["A1"] = FORM_TITLE
+    for col_num, col_name in enumerate(EXPORT_COLUMNS, start=1):
+        ws.cell(row=HEADER_ROW, column=col_num, value=col_name).style = "ipqc_header"
+        # 原型列：提供項目列的樣式編號，填入時會被覆寫或移除
+        ws.cell(row=HEADER_ROW + 1, column=col_num).style = "ipqc_cell"
+    stats_col = stats_column(EXPORT_COLUMNS)
+    ws.cell(row=HEADER_ROW, column=stats_col, value="統計資訊").style = "ipqc_stats_title"
+    for i in range(1, 4):
+        ws.cell(row=HEADER_ROW + i, column=stats_col).style = "ipqc_stats"
+    table = Table(displayName=TABLE_NAME, ref=f"A{HEADER_ROW}:{get_column_letter(len(EXPORT_COLUMNS))}{HEADER_ROW + 1}")
+    table.tableStyleInfo = TableStyleInfo(name=TABLE_STYLE, showRowStripes=False, showColumnStripes=False)
+    ws.add_table(table)
+    ws.column_dimensions["A"].width = INDEX_COL_WIDTH
+    return wb
+
+
+@functools.lru_cache(maxsize=None)
+def template_bytes(path=TEMPLATE_PATH):
+    # 每個行程只讀一次；範本檔不存在時以程式建立同樣的骨架
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return workbook_bytes(build_template())
+
+
+@functools.lru_cache(maxsize=None)
+def _template_parts(path=TEMPLATE_PATH):
+    with zipfile.ZipFile(io.BytesIO(template_bytes(path))) as zf:
+        parts = [(name, zf.read(name)) for name in zf.namelist()]
+    sheet_name = next(n for n, _ in parts if n.startswith("xl/worksheets/sheet"))
+    table_name = next(n for n, _ in parts if n.startswith("xl/tables/"))
+    sheet_xml = dict(parts)[sheet_name].decode("utf-8")
+    # 從骨架儲存格取得各具名樣式的 cellXfs 編號
+    style_of = lambda ref: re.search(rf'<c r="{ref}" s="(\d+)"', sheet_xml).group(1)
+    stats_letter = get_column_letter(stats_column(EXPORT_COLUMNS))
+    style_ids = {
+        "title": style_of("A1"),
+        "subtitle": style_of("A2"),
+        "header": style_of(f"A{HEADER_ROW}"),
+        "cell": style_of(f"A{HEADER_ROW + 1}"),
+        "stats_title": style_of(f"{stats_letter}{HEADER_ROW}"),
+        "stats": style_of(f"{stats_letter}{HEADER_ROW + 1}"),
+    }
+    return parts, sheet_name, table_name, style_ids
+
+
+def _fits_template(edited_df):
+    return [str(col) for col in edited_df.columns] == EXPORT_COLUMNS
+
+
+def fill_template(edited_df, model, modules, project_no="", check_time="",
+                  supervisor="", checkedby="", checker="", seed=None):
+    # openpyxl 路徑：載入骨架後只填入變動內容
+    texts = header_texts(model, modules, project_no, check_time, supervisor, checkedby, checker)
+    wb = load_workbook(io.BytesIO(template_bytes()))
+    if seed is not None:
+        wb.properties.keywords = seed_keywords(seed)
+    ws = wb.active
+    ws["A2"] = texts["model_line"]
+    ws["A3"] = texts["project_line"]
+
+    rows = form_rows(edited_df)
+    if rows.empty:
+        # 沒有項目列時移除原型列，避免留下有框線的空白列
+        for col_num in range(1, len(EXPORT_COLUMNS) + 1):
+            ws._cells.pop((HEADER_ROW + 1, col_num), None)
+    for idx, row in enumerate(rows.values.tolist(), start=1):
+        for j, val in enumerate(row, start=1):
+            cell = ws.cell(row=HEADER_ROW + idx, column=j, value=val)
+            if idx > 1:
+                cell.style = "ipqc_cell"
+
+    end_row = HEADER_ROW + len(rows)
+    table = ws.tables[TABLE_NAME]
+    table.ref = f"A{HEADER_ROW}:{get_column_letter(len(EXPORT_COLUMNS))}{end_row}"
+    table.autoFilter.ref = table.ref
+
+    stats_col = stats_column(EXPORT_COLUMNS)
+    lines = stats_lines(form_stats(edited_df))
+    for i, text in enumerate(lines, start=1):
+        ws.cell(row=HEADER_ROW + i, column=stats_col, value=text)
+
+    confirm_row = max(end_row, HEADER_ROW + len(lines)) + 3
+    ws.merge_cells(start_row=confirm_row, start_column=1, end_row=confirm_row, end_column=MERGE_LAST_COL)
+    ws.cell(row=confirm_row, column=1, value=texts["confirm_line"]).style = "ipqc_subtitle"
+
+    for letter, width in column_widths(EXPORT_COLUMNS, rows, stats_col, lines).items():
+        ws.column_dimensions[letter].width = width
+    return wb
+
+
+# === 直接寫 XML 的快速路徑 ===
+def _xml_cell(ref, style, val):
+    # 與 openpyxl 寫出的儲存格相同：字串用 inlineStr，數字以 %.16g 表示
+    if val is None:
+        return f'<c r="{ref}" s="{style}" t="n" />'
+    if isinstance(val, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(val)}</v></c>'
+    if isinstance(val, (int, float)):
+        text = "" if val != val or val in (float("inf"), float("-inf")) else "%.16g" % val
+        return f'<c r="{ref}" s="{style}" t="n"><v>{text}</v></c>'
+    if val == "":
+        return f'<c r="{ref}" s="{style}" t="inlineStr" />'
+    space = ' xml:space="preserve"' if val.strip() and val != val.strip() else ""
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{escape(val)}</t></is></c>'
+
+
+def _xml_safe(values):
+    # 只處理 openpyxl 會原樣寫出的型別；公式、日期或非法字元交回 openpyxl 路徑
+    for val in values:
+        if val is None or isinstance(val, (bool, int, float)):
+            continue
+        if not isinstance(val, str) or val.startswith("=") or ILLEGAL_CHARACTERS_RE.search(val):
+            return False
+    return True
+
+
+def _core_xml(core_xml, seed):
+    # 更新建立 / 修改時間，並記錄抽樣種子
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    core_xml = re.sub(r"(<dcterms:(?:created|modified)[^>]*>)[^<]*(</dcterms:)", rf"\g<1>{now}\g<2>", core_xml)
+    if seed is not None:
+        core_xml = core_xml.replace("</cp:coreProperties>",
+                                    f"<cp:keywords>{escape(seed_keywords(seed))}</cp:keywords></cp:coreProperties>")
+    return core_xml
+
+
+def render_template_xml(edited_df, model, modules, project_no="", check_time="",
+                        supervisor="", checkedby="", checker="", seed=None):
+    texts = header_texts(model, modules, project_no, check_time, supervisor, checkedby, checker)
+    rows = form_rows(edited_df)
+    values = rows.values.tolist()
+    if not _xml_safe(v for row in values for v in row) or not _xml_safe(texts.values()):
+        return None
+
+    parts, sheet_name, table_name, sid = _template_parts()
+    stats_col = stats_column(EXPORT_COLUMNS)
+    stats_letter = get_column_letter(stats_col)
+    lines = stats_lines(form_stats(edited_df))
+    end_row = HEADER_ROW + len(rows)
+    confirm_row = max(end_row, HEADER_ROW + len(lines)) + 3
+    letters = [get_column_letter(j) for j in range(1, len(EXPORT_COLUMNS) + 1)]
+
+    out = [
+        f'<row r="1">{_xml_cell("A1", sid["title"], texts["title"])}</row>',
+        f'<row r="2">{_xml_cell("A2", sid["subtitle"], texts["model_line"])}</row>',
+        f'<row r="3">{_xml_cell("A3", sid["subtitle"], texts["project_line"])}</row>',
+        f'<row r="{HEADER_ROW}">'
+        + "".join(_xml_cell(f"{l}{HEADER_ROW}", sid["header"], h) for l, h in zip(letters, EXPORT_COLUMNS))
+        + _xml_cell(f"{stats_letter}{HEADER_ROW}", sid["stats_title"], "統計資訊") + "</row>",
+    ]
+    for r in range(HEADER_ROW + 1, max(end_row, HEADER_ROW + len(lines)) + 1):
+        cells = ""
+        if r <= end_row:
+            cells = "".join(_xml_cell(f"{l}{r}", sid["cell"], v) for l, v in zip(letters, values[r - HEADER_ROW - 1]))
+        if r - HEADER_ROW <= len(lines):
+            cells += _xml_cell(f"{stats_letter}{r}", sid["stats"], lines[r - HEADER_ROW - 1])
+        out.append(f'<row r="{r}">{cells}</row>')
+    out.append(f'<row r="{confirm_row}">{_xml_cell(f"A{confirm_row}", sid["subtitle"], texts["confirm_line"])}</row>')
+
+    widths = column_widths(EXPORT_COLUMNS, rows, stats_col, lines)
+    cols = "".join(
+        f'<col width="{"%.16g" % w}" customWidth="1" min="{j}" max="{j}" />'
+        for j, w in enumerate(widths.values(), start=1)
+    )
+    merges = [f"A{r}:{get_column_letter(MERGE_LAST_COL)}{r}" for r in (1, 2, 3, confirm_row)]
+    last_letter = get_column_letter(max(stats_col, len(EXPORT_COLUMNS), MERGE_LAST_COL))
+    table_ref = f"A{HEADER_ROW}:{letters[-1]}{end_row}"
+
+    xml_parts = dict(parts)
+    sheet_xml = xml_parts[sheet_name].decode("utf-8")
+    sheet_xml = re.sub(r"<dimension [^>]*/>", f'<dimension ref="A1:{last_letter}{confirm_row}" />', sheet_xml)
+    sheet_xml = re.sub(r"<cols>.*?</cols>", f"<cols>{cols}</cols>", sheet_xml, flags=re.S)
+    sheet_xml = re.sub(r"<sheetData>.*?</sheetData>", "<sheetData>" + "".join(out) + "</sheetData>", sheet_xml, flags=re.S)
+    sheet_xml = re.sub(
+        r"<mergeCells .*?</mergeCells>",
+        f'<mergeCells count="{len(merges)}">' + "".join(f'<mergeCell ref="{m}" />' for m in merges) + "</mergeCells>",
+        sheet_xml, flags=re.S,
+    )
+    table_xml = re.sub(r'ref="[A-Z]+\d+:[A-Z]+\d+"', f'ref="{table_ref}"', xml_parts[table_name].decode("utf-8"))
+
+    bio = io.BytesIO()
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts:
+            if name == sheet_name:
+                data = sheet_xml.encode("utf-8")
+            elif name == table_name:
+                data = table_xml.encode("utf-8")
+            elif name == "docProps/core.xml":
+                data = _core_xml(data.decode("utf-8"), seed).encode("utf-8")
+            zf.writestr(name, data)
+    return bio.getvalue()
+
+
+def export_ipqc_template_xlsx(edited_df, model, modules, fast=None, **header):
+    # fast=None 時依項目數自動選擇；欄位不是標準表單欄位時退回完整建立
+    if not _fits_template(edited_df):
+        return export_ipqc_xlsx(edited_df, model, modules, **header)
+    if fast is None:
+        fast = len(edited_df) >= XML_FAST_PATH_ROWS
+    if fast:
+        data = render_template_xml(edited_df, model, modules, **header)
+        if data is not None:
+            return data
+    return workbook_bytes(fill_template(edited_df, model, modules, **header))
+
+
+def export_form(edited_df, model, modules, mode=None, **header):
+    # 頁面使用的入口；mode 預設取環境變數 IPQC_EXPORT_MODE
+    if (mode or EXPORT_MODE) == "template":
+        return export_ipqc_template_xlsx(edited_df, model, modules, **header)
+    return export_ipqc_xlsx(edited_df, model, modules, **header)
+
+
+# ========== 讀回匯出的表單 ==========
+_MODEL_LINE_RE = re.compile(r"機型:\s*(?P<model>.*?)\s+模組:\s*(?P<modules>.*)$", re.S)
+_PROJECT_LINE_RE = re.compile(r"專案序號:\s*(?P<project_no>.*?)\s+檢查時間:\s*(?P<check_time>.*)$", re.S)
+_CONFIRM_LINE_RE = re.compile(
+    r"主管確認:\s*(?P<supervisor>.*?)\s+被點檢人員確認:\s*(?P<checkedby>.*?)\s+點檢人員:\s*(?P<checker>.*)$", re.S)
+_STATS_RE = re.compile(r"(NG 異常率|異常數|有效總數):\s*([\d.]+)")
+_FILENAME_DATE_RE = re.compile(r"_(\d{8})_IPQC填寫版")
+
+
+class FormLayoutError(ValueError):
+    pass
+
+
+def filename_date(filename):
+    # export_filename 的日期部分；不是標準檔名時回傳 None
+    match = _FILENAME_DATE_RE.search(filename or "")
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d")
+        except ValueError:
+            return None
+    return None
+
+
+def _line(rows, row, pattern):
+    text = rows[row - 1][0] if len(rows) >= row and rows[row - 1] else None
+    match = pattern.match(str(text).strip()) if text is not None else None
+    return {k: v.strip() for k, v in match.groupdict().items()} if match else None
+
+
+def parse_export(data):
+    # 由 *_IPQC填寫版.xlsx 取回 {model, modules, project_no, check_time, supervisor, checkedby, checker,
+    # seed, form（EXPORT_COLUMNS，已無分隔列）, stats（表單上的統計資訊）}；不是這個版面時丟出 FormLayoutError
+    try:
+        wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except Exception as e:
+        raise FormLayoutError(f"無法開啟活頁簿：{e}") from e
+    try:
+        ws = wb[SHEET_TITLE] if SHEET_TITLE in wb.sheetnames else wb.active
+        rows = [tuple(r) for r in ws.iter_rows(values_only=True)]
+        keywords = wb.properties.keywords or ""
+    finally:
+        wb.close()
+
+    head = _line(rows, 2, _MODEL_LINE_RE)
+    if head is None or len(rows) < HEADER_ROW:
+        raise FormLayoutError("找不到「機型 / 模組」表頭")
+    headers = [str(v).strip() if v is not None else "" for v in rows[HEADER_ROW - 1]]
+    if "項目" not in headers or "判定結果" not in headers:
+        raise FormLayoutError("找不到項目表格標題列")
+    columns = {name: headers.index(name) for name in EXPORT_COLUMNS if name in headers}
+
+    # 項目列：標題列之後到第一個項目欄位全空的列（統計資訊可能比項目多，只看項目欄位）
+    records, end = [], HEADER_ROW
+    for row in rows[HEADER_ROW:]:
+        values = {name: (row[i] if i < len(row) else None) for name, i in columns.items()}
+        if all(v is None or str(v).strip() == "" for v in values.values()):
+            break
+        records.append({name: "" if values.get(name) is None else values[name] for name in EXPORT_COLUMNS})
+        end += 1
+    form = pd.DataFrame(records, columns=EXPORT_COLUMNS)
+
+    stats = {}
+    if "統計資訊" in headers:
+        stats_at = headers.index("統計資訊")
+        for row in rows[HEADER_ROW:HEADER_ROW + 3]:
+            match = _STATS_RE.search(str(row[stats_at])) if stats_at < len(row) and row[stats_at] else None
+            if match:
+                stats[match.group(1)] = float(match.group(2)) if match.group(1) == "NG 異常率" else int(match.group(2))
+
+    confirm = {}
+    for r in range(end + 1, len(rows) + 1):
+        confirm = _line(rows, r, _CONFIRM_LINE_RE)
+        if confirm:
+            break
+    seed = re.search(rf"{SEED_KEYWORD}=(\d+)", keywords)
+    return dict(
+        model=head["model"],
+        modules=[m for m in head["modules"].split("/") if m],
+        **(_line(rows, 3, _PROJECT_LINE_RE) or {"project_no": "", "check_time": ""}),
+        **(confirm or {"supervisor": "", "checkedby": "", "checker": ""}),
+        seed=int(seed.group(1)) if seed else None,
+        form=form,
+        stats=stats,
+    )
+
+
+if __name__ == "__main__":
+    # 重新產生範本：python ipqc_export.py
+    os.makedirs(os.path.dirname(TEMPLATE_PATH), exist_ok=True)
+    with open(TEMPLATE_PATH, "wb") as f:
+        f.write(workbook_bytes(build_template()))
+    print(f"✅ 已產生範本：{TEMPLATE_PATH}")
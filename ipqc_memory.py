@@ -0,0 +1,171 @@
+# ========== 記憶體分析（可在執行中開關） ==========
+# 開啟後以 tracemalloc 在載入、抽樣、匯出等階段前後各取一次配置快照，比較差異找出配置最多的程式位置，
+# 同時記錄該階段的 RSS 與峰值 RSS（Linux 上每個階段開始時重設 VmHWM，取得該階段內的峰值）。
+# 關閉時 stage() 直接回傳共用的空 context manager；tracemalloc 本身也會停止，不影響一般效能。
+# tracemalloc 追蹤的是整個程序，同時間其他 session 的配置也會計入；各階段彼此不互相等待，只有取快照時短暫上鎖，
+# 階段進行中關閉分析時該階段不記錄（不影響階段內的工作）。
+#   IPQC_MEMORY         設為 1 啟動時即開啟
+#   IPQC_MEMORY_FRAMES  每個配置保留的呼叫層數（預設 1，只看配置所在行）
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+FRAMES = int(os.environ.get("IPQC_MEMORY_FRAMES", 1))
+TOP = 15
+KEEP = 200
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()   # 取快照與開關 tracemalloc 時上鎖（不在階段進行期間持有）
+_records = collections.deque(maxlen=KEEP)
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def enabled():
+    return tracemalloc.is_tracing()
+
+
+def enable(on=True):
+    with _lock:
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+        elif not on and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+# ---------- RSS ----------
+def _status(field):
+    # /proc/self/status 的欄位（kB）；非 Linux 時回傳 None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss():
+    value = _status("VmRSS")
+    if value is None:
+        import resource
+        value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return value
+
+
+def _reset_peak_rss():
+    # 寫入 5 會把 VmHWM 重設為目前的 RSS（Linux 4.0 以上）
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+# ---------- 階段 ----------
+class _Stage:
+    def __init__(self, name, session_id):
+        self.name = name
+        self.session_id = session_id
+
+    def __enter__(self):
+        self.started = time.time()
+        self.rss_before = rss()
+        self.hwm = _reset_peak_rss()
+        self.before = None
+        with _lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                self.before = tracemalloc.take_snapshot()
+                self.traced_before = tracemalloc.get_traced_memory()[0]
+        if self.before is not None:
+            self.before = self.before.filter_traces(_FILTERS)
+        return self
+
+    def __exit__(self, *exc):
+        with _lock:
+            # 階段進行中關閉了分析：沒有可比較的快照，不記錄
+            if self.before is None or not tracemalloc.is_tracing():
+                return False
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        after = after.filter_traces(_FILTERS)
+        rss_after = rss()
+        peak = _status("VmHWM") if self.hwm else None
+        top = [
+            {
+                "位置": f"{s.traceback[0].filename}:{s.traceback[0].lineno}" if s.traceback else "?",
+                "增加 (KB)": round(s.size_diff / 1024, 1),
+                "目前 (KB)": round(s.size / 1024, 1),
+                "配置數增加": s.count_diff,
+            }
+            for s in after.compare_to(self.before, "lineno")[:TOP]
+        ]
+        _records.append({
+            "time": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "session": self.session_id,
+            "stage": self.name,
+            "rss_before_mb": round(self.rss_before / 2 ** 20, 1),
+            "rss_after_mb": round(rss_after / 2 ** 20, 1),
+            "peak_rss_mb": round((peak if peak is not None else max(self.rss_before, rss_after)) / 2 ** 20, 1),
+            "traced_diff_mb": round((traced_after - self.traced_before) / 2 ** 20, 2),
+            "traced_peak_mb": round((traced_peak - self.traced_before) / 2 ** 20, 2),
+            "top": top,
+        })
+        return False
+
+
+def stage(name, session_id=None):
+    # with ipqc_memory.stage("export", session_id): ...（未開啟時不做任何事）
+    if not tracemalloc.is_tracing():
+        return _NULL
+    return _Stage(name, session_id)
+
+
+def records():
+    return list(_records)
+
+
+def clear():
+    _records.clear()
+
+
+def summary(recs=None):
+    # 每筆階段紀錄一列（不含配置位置明細）
+    recs = records() if recs is None else recs
+    columns = ["time", "session", "stage", "rss_before_mb", "rss_after_mb", "peak_rss_mb",
+               "traced_diff_mb", "traced_peak_mb"]
+    return pd.DataFrame([{k: r[k] for k in columns} for r in recs], columns=columns)
+
+
+# ---------- 物件大小 ----------
+def sizeof(value):
+    # 大致估計 session 中物件佔用的位元組數（DataFrame 含字串內容）
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, "base") and isinstance(value.base, pd.DataFrame):
+        return sizeof(value.base)   # ipqc_edits.EditedFrame：基底資料為主
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+if os.environ.get("IPQC_MEMORY", "") not in ("", "0"):
+    enable()
@@ -0,0 +1,328 @@
+# ========== 監控指標（Prometheus 文字格式） ==========
+# 只用標準函式庫：計數器、量表與直方圖，輸出成 Prometheus text exposition format（0.0.4）。
+# 重跑次數與各階段耗時由 ipqc_timing 的紀錄累計，其餘（快取、Graph 呼叫、匯出數）在呼叫處累加。
+#   IPQC_METRICS_PORT      在本機開一個 HTTP 連接埠提供 /metrics（例如 9108）
+#   IPQC_METRICS_HOST      監聽位址（預設 127.0.0.1，只給本機的 scraper 讀取）
+#   IPQC_METRICS_FILE      定期寫入檔案（給 node_exporter textfile collector，例如 metrics/ipqc.prom）
+#   IPQC_METRICS_INTERVAL  寫檔間隔秒數（預設 15）
+# 任一項有設定時會同時啟用 ipqc_timing 的分段計時（只累計指標，不另外寫計時記錄檔）。
+import bisect
+import functools
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ipqc_batch
+import ipqc_shared
+import ipqc_timing
+
+METRICS_PORT = os.environ.get("IPQC_METRICS_PORT", "")
+METRICS_HOST = os.environ.get("IPQC_METRICS_HOST", "127.0.0.1")
+METRICS_FILE = os.environ.get("IPQC_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("IPQC_METRICS_INTERVAL", 15))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------- 指標類型 ----------
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        super().__init__(name, help_text, labels)
+        self._collect = collect   # 輸出時才呼叫：回傳 {標籤值 tuple: 數值}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        if self._collect is not None:
+            try:
+                collected = self._collect()
+            except Exception:
+                collected = {}
+            with self._lock:
+                self._values = {tuple(str(x) for x in k): v for k, v in collected.items()}
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, n) in items:
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {running}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {n}")
+        return lines
+
+
+# ---------- 登錄 ----------
+_registry = []
+
+
+def counter(name, help_text, labels=()):
+    metric = Counter(name, help_text, labels)
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name, help_text, labels=(), collect=None):
+    metric = Gauge(name, help_text, labels, collect)
+    _registry.append(metric)
+    return metric
+
+
+def histogram(name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help_text, labels, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ========== IPQC 指標 ==========
+RERUNS = counter("ipqc_reruns_total", "Script reruns by scope (full page or fragment:<name>).", ["scope"])
+RERUN_SECONDS = histogram("ipqc_rerun_seconds", "Server-side rerun duration.", ["scope"])
+STAGE_SECONDS = histogram("ipqc_stage_seconds", "Duration of each timed stage within a rerun.", ["stage"])
+CACHE_REQUESTS = counter("ipqc_cache_requests_total", "Cache lookups by cache and result (hit/miss).",
+                         ["cache", "result"])
+GRAPH_REQUESTS = counter("ipqc_graph_requests_total", "Microsoft Graph calls by operation.", ["op"])
+GRAPH_ERRORS = counter("ipqc_graph_errors_total", "Failed Microsoft Graph calls by operation.", ["op"])
+GRAPH_SECONDS = histogram("ipqc_graph_request_seconds", "Microsoft Graph call latency.", ["op"])
+EXPORTS = counter("ipqc_exports_total", "Generated forms by source (form, batch, api).", ["source"])
+API_REQUESTS = counter("ipqc_api_requests_total", "HTTP API requests by route and outcome.", ["route", "outcome"])
+API_SECONDS = histogram("ipqc_api_request_seconds", "HTTP API request latency.", ["route"])
+WARMUPS = counter("ipqc_dataset_warmups_total", "Background dataset loads by result (ok/error).", ["result"])
+WARMUP_SECONDS = histogram("ipqc_dataset_warmup_seconds", "Background dataset load duration (read, normalize, index).")
+
+
+def _outbox_depth():
+    return {(): len(ipqc_batch.outbox_files())}
+
+
+def _manifest():
+    # 共用資料夾的版本檔（ipqc_shared.DatasetVersions）：各副本實際載入的就是這個版本；尚未發佈時不輸出
+    return ipqc_shared.DatasetVersions().current()
+
+
+def _dataset_version():
+    manifest = _manifest()
+    return {(manifest["version"],): 1} if manifest else {}
+
+
+def _dataset_updates():
+    # 各資料檔在版本檔中的更新時間（Unix 秒），標籤帶該檔 sha256 的前 12 碼
+    manifest = _manifest()
+    out = {}
+    for name, entry in (manifest or {}).get("files", {}).items():
+        updated = datetime.fromisoformat(entry["updated_at"]).timestamp()
+        out[(name, entry["sha256"][:12])] = updated
+    return out
+
+
+OUTBOX_DEPTH = gauge("ipqc_outbox_files", "Forms waiting in the upload outbox.", collect=_outbox_depth)
+DATASET_VERSION = gauge("ipqc_dataset_version_info", "Dataset version currently published in data/CURRENT.json.",
+                        ["version"], collect=_dataset_version)
+DATASET_UPDATED = gauge("ipqc_dataset_version_timestamp_seconds",
+                        "When each source workbook in the current dataset version was published.",
+                        ["dataset", "sha256"], collect=_dataset_updates)
+
+
+def observe_rerun(record):
+    # ipqc_timing 每完成一筆重跑紀錄時呼叫；同一次重跑中同名階段先加總
+    RERUNS.inc(scope=record["scope"])
+    RERUN_SECONDS.observe(record["total_ms"] / 1000, scope=record["scope"])
+    totals = {}
+    for s in record["spans"]:
+        totals[s["stage"]] = totals.get(s["stage"], 0.0) + s["ms"]
+    for stage, ms in totals.items():
+        STAGE_SECONDS.observe(ms / 1000, stage=stage)
+
+
+ipqc_timing.add_listener(observe_rerun)
+
+
+class _GraphCall:
+    __slots__ = ("op", "t0")
+
+    def __init__(self, op):
+        self.op = op
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        GRAPH_REQUESTS.inc(op=self.op)
+        GRAPH_SECONDS.observe(time.perf_counter() - self.t0, op=self.op)
+        if exc_type is not None:
+            GRAPH_ERRORS.inc(op=self.op)
+        return False
+
+
+def graph_call(op):
+    # with ipqc_metrics.graph_call("download"): ...   或當作裝飾器：@ipqc_metrics.graph("download")
+    return _GraphCall(op)
+
+
+def graph(op):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _GraphCall(op):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------- 對外提供 ----------
+def write_file(path=METRICS_FILE):
+    # 先寫暫存檔再改名，collector 不會讀到寫一半的檔案
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def make_server(host=METRICS_HOST, port=9108):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    server.daemon_threads = True
+    return server
+
+
+_started = threading.Lock()
+_exporters = {}
+
+
+def start_from_env():
+    # 依環境變數啟動 HTTP 連接埠與 / 或定期寫檔；同一個程序只啟動一次，回傳是否有啟用
+    with _started:
+        if _exporters:
+            return True
+        if not (METRICS_PORT or METRICS_FILE):
+            return False
+        ipqc_timing.ENABLED = True
+        if METRICS_PORT:
+            server = make_server(METRICS_HOST, METRICS_PORT)
+            threading.Thread(target=server.serve_forever, name="ipqc-metrics-http", daemon=True).start()
+            _exporters["http"] = server
+        if METRICS_FILE:
+            def loop():
+                while True:
+                    try:
+                        write_file(METRICS_FILE)
+                    except OSError:
+                        pass
+                    time.sleep(METRICS_INTERVAL)
+            thread = threading.Thread(target=loop, name="ipqc-metrics-file", daemon=True)
+            thread.start()
+            _exporters["file"] = thread
+        return True
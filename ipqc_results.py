@@ -0,0 +1,662 @@
+# ========== 判定結果資料庫（SQLite） ==========
+# 每次匯出填寫版表單時，把每一列的判定結果（OK / NG / N/A / 未填）附加到 SQLite，
+# NG 率等歷史查詢直接查資料庫（機型 / 模組 / 日期有索引），不必逐一開啟 output 中的 xlsx。
+#   exports  每次匯出一筆：檔名、機型、模組、點檢人員、主管、專案序號、檢查時間、抽樣種子、來源、xlsx 的 sha256
+#   results  每個項目一筆：機型、模組、項次、項目、重要性、客訴編號、判定結果、點檢人員、檢查時間 / 日期
+#   rollup_* 彙總（機型 / 模組、項目、點檢人員 × 日 / 週 / 月 / 年）：筆數、有效數、OK / NG / N/A 數，
+#            在寫入判定結果的同一個交易中累加（upsert），報表只查彙總表，不必重新掃描所有判定結果
+#   indexed_files  補建（ipqc_backfill）處理過的表單檔：位置、檔名、etag、sha256、對應的 export 與狀態
+#   ng_scores  每個（機型, 模組, 項目）的近期 NG 數 / 有效數（依檢查日期指數衰減，半衰期 NG_HALF_LIFE 天），
+#              與彙總表同一個交易中累加；依近期 NG 調整抽樣權重時（ipqc_sampling）直接查這張表
+# NG 異常率與匯出表單上的統計相同：NG 數 / 有效總數（有填判定結果的筆數，含 N/A）。
+# 多個副本共用資料庫時以 ipqc_shared 的 results 鎖排隊寫入（網路磁碟上不使用 WAL）。
+#   IPQC_RESULTS_DB   資料庫路徑（預設共用資料夾下 results/ipqc_results.sqlite）
+#   IPQC_NG_HALF_LIFE 近期 NG 的半衰期天數（預設 30，至少 1 天；改變後第一次開啟資料庫時重算）
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import ipqc_data
+import ipqc_shared
+
+RESULTS_DB = os.environ.get("IPQC_RESULTS_DB") or ipqc_shared.path("results", "ipqc_results.sqlite")
+
+# ---------- 彙總表 ----------
+ROLLUPS = {
+    "rollup_module": ["model", "module"],
+    "rollup_item": ["model", "module", "item"],
+    "rollup_inspector": ["model", "module", "inspector"],
+}
+MEASURES = ["rows", "valid", "ok", "ng", "na"]
+
+# 每種彙總各有日 / 週 / 月 / 年四個粒度的表（day 欄位為該期第一天，週以星期一開始）；
+# 查詢期間拆成「完整的年 + 完整的月 + 頭尾的日」，多年的期間也只讀幾萬列
+GRAINS = ["day", "week", "month", "year"]
+
+# 報表維度 → （彙總，分組欄位）
+DIMENSIONS = {
+    "model": ("rollup_module", ["model"]),
+    "module": ("rollup_module", ["model", "module"]),
+    "item": ("rollup_item", ["model", "module", "item"]),
+    "inspector": ("rollup_inspector", ["inspector"]),
+}
+
+# 期間 → 每一期第一天的 SQL 運算式
+PERIODS = {
+    "day": "day",
+    "week": "date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "substr(day, 1, 7) || '-01'",
+    "year": "substr(day, 1, 4) || '-01-01'",
+}
+
+# 趨勢的每一期可以由哪些粒度組成（由粗到細）；排行則用年 / 月 / 日
+TREND_GRAINS = {"day": ["day"], "week": ["week", "day"], "month": ["month", "day"], "year": ["year", "month", "day"]}
+RANGE_GRAINS = ["year", "month", "day"]
+
+# ---------- 近期 NG（衰減計數） ----------
+# 計數都衰減到基準日（settings 的 ng_ref_day，寫入過的最晚檢查日期）：每筆判定結果以 2 ** ((檢查日期 - 基準日) / 半衰期)
+# 加權累加，新增 / 刪除都只是加減；寫入更晚的日期時先把所有計數乘上衰減倍數再換基準日。
+# 權重永遠 <= 1（很舊的判定結果下溢為 0），不論半衰期或日期都不會溢位；查詢時再衰減到查詢當天。
+MIN_HALF_LIFE = 1.0
+
+
+def _half_life(value):
+    half_life = float(value)
+    if not math.isfinite(half_life) or half_life < MIN_HALF_LIFE:
+        raise ValueError(f"IPQC_NG_HALF_LIFE 必須是至少 {MIN_HALF_LIFE:g} 天的數字：{value}")
+    return half_life
+
+
+NG_HALF_LIFE = _half_life(os.environ.get("IPQC_NG_HALF_LIFE", 30))
+
+# 手填的檢查時間早於 EARLIEST_CHECK 或晚於現在 FUTURE_TOLERANCE 以上時視為打錯字
+EARLIEST_CHECK = datetime(2000, 1, 1)
+FUTURE_TOLERANCE = timedelta(days=1)
+
+
+def decay_weight(day, ref, half_life=None):
+    # day 相對於基準日 ref 的權重；晚於基準日的視為基準日（權重最多為 1）
+    day, ref = date.fromisoformat(str(day)[:10]), date.fromisoformat(str(ref)[:10])
+    return 2.0 ** ((min(day, ref) - ref).days / (half_life or NG_HALF_LIFE))
+
+
+def rollup_table(name, grain):
+    return name if grain == "day" else f"{name}_{grain}"
+
+
+def period_start(day, grain):
+    # 'YYYY-MM-DD' 所在那一期的第一天（與 PERIODS 相同）
+    if grain == "month":
+        return day[:8] + "01"
+    if grain == "year":
+        return day[:5] + "01-01"
+    if grain == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return day
+
+
+def period_next(day, grain):
+    # 下一期的第一天（day 須為一期的第一天）
+    d = date.fromisoformat(day)
+    if grain == "month":
+        return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    if grain == "year":
+        return date(d.year + 1, 1, 1)
+    return d + timedelta(days=7 if grain == "week" else 1)
+
+
+def spans(start, end, grains):
+    # [start, end] 拆成連續的 (粒度, 第一期, 最後一期)：每一天用最粗、且整期都在範圍內的粒度
+    cur, end = date.fromisoformat(str(start)), date.fromisoformat(str(end))
+    result = []
+    while cur <= end:
+        day = cur.isoformat()
+        for grain in grains:
+            if period_start(day, grain) == day and period_next(day, grain) - timedelta(days=1) <= end:
+                break
+        if result and result[-1][0] == grain:
+            result[-1][2] = day
+        else:
+            result.append([grain, day, day])
+        cur = period_next(day, grain)
+    return result
+
+
+def _rollup_schema():
+    # {彙總}_keys 把分組欄位值對應成整數 id；各粒度的彙總表以（該期第一天, key_id）為主鍵，加總時以整數分組
+    parts = []
+    for name, keys in ROLLUPS.items():
+        columns = ", ".join(f"{k} TEXT NOT NULL" for k in keys)
+        measures = ", ".join(f"{m} INTEGER NOT NULL" for m in MEASURES)
+        parts.append(f"CREATE TABLE IF NOT EXISTS {name}_keys (id INTEGER PRIMARY KEY, {columns},"
+                     f" UNIQUE ({', '.join(keys)}));")
+        for grain in GRAINS:
+            table = rollup_table(name, grain)
+            parts.append(f"CREATE TABLE IF NOT EXISTS {table} (day TEXT NOT NULL, key_id INTEGER NOT NULL,"
+                         f" {measures}, PRIMARY KEY (day, key_id)) WITHOUT ROWID;")
+            parts.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_key ON {table} (key_id, day);")
+    return "\n".join(parts)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exports (
+    id          INTEGER PRIMARY KEY,
+    file        TEXT,
+    model       TEXT NOT NULL,
+    modules     TEXT,
+    project_no  TEXT,
+    checker     TEXT,
+    supervisor  TEXT,
+    checkedby   TEXT,
+    checked_at  TEXT NOT NULL,
+    exported_at TEXT NOT NULL,
+    seed        INTEGER,
+    source      TEXT,
+    file_sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id           INTEGER PRIMARY KEY,
+    export_id    INTEGER NOT NULL REFERENCES exports(id),
+    model        TEXT NOT NULL,
+    module       TEXT,
+    item_no      INTEGER,
+    item         TEXT,
+    spec         TEXT,
+    method       TEXT,
+    importance   REAL,
+    complaint_id TEXT,
+    result       TEXT,
+    inspector    TEXT,
+    checked_at   TEXT NOT NULL,
+    checked_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_model_module_date ON results (model, module, checked_date);
+CREATE INDEX IF NOT EXISTS idx_results_date ON results (checked_date);
+CREATE INDEX IF NOT EXISTS idx_results_export ON results (export_id);
+CREATE TABLE IF NOT EXISTS indexed_files (
+    location   TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    etag       TEXT,
+    sha256     TEXT NOT NULL,
+    export_id  INTEGER REFERENCES exports(id),
+    status     TEXT NOT NULL,
+    detail     TEXT,
+    indexed_at TEXT NOT NULL,
+    PRIMARY KEY (location, name)
+);
+CREATE INDEX IF NOT EXISTS idx_indexed_files_sha256 ON indexed_files (sha256);
+CREATE TABLE IF NOT EXISTS ng_scores (
+    key_id INTEGER PRIMARY KEY REFERENCES rollup_item_keys(id),
+    ng     REAL NOT NULL,
+    valid  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+""" + _rollup_schema()
+
+RESULT_COLUMNS = ["model", "module", "item_no", "item", "spec", "method", "importance", "complaint_id",
+                  "result", "inspector", "checked_at", "checked_date"]
+
+
+def _measures(result):
+    # 一列判定結果對各計數的貢獻：(rows, valid, ok, ng, na)
+    return (1, int(result != ""), int(result == "OK"), int(result == "NG"), int(result == "N/A"))
+
+
+def rollup_deltas(rows, keys, grain="day"):
+    # 這次匯出的判定結果依（該期第一天, 分組欄位值）先在記憶體加總，每組只 upsert 一次
+    index = [RESULT_COLUMNS.index(k) for k in keys]
+    result_at, day_at = RESULT_COLUMNS.index("result"), RESULT_COLUMNS.index("checked_date")
+    deltas = {}
+    for row in rows:
+        key = (period_start(row[day_at], grain), tuple(row[i] or "" for i in index))
+        current = deltas.get(key, (0, 0, 0, 0, 0))
+        deltas[key] = tuple(a + b for a, b in zip(current, _measures(row[result_at])))
+    return deltas
+
+
+def score_deltas(rows, ref):
+    # 這次匯出對 ng_scores 的貢獻（衰減到基準日 ref）：{(model, module, item): (加權 NG 數, 加權有效數)}
+    deltas = {}
+    for (day, key), values in rollup_deltas(rows, ROLLUPS["rollup_item"]).items():
+        if values[1]:
+            weight = decay_weight(day, ref)
+            ng, valid = deltas.get(key, (0.0, 0.0))
+            deltas[key] = (ng + values[3] * weight, valid + values[1] * weight)
+    return deltas
+
+
+def file_hash(data):
+    # 匯出 xlsx 的 sha256：同一份檔案（output/ 與 OneDrive 歷史資料夾中的複本）只記錄一次
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_time(value):
+    # 手填的時間文字 → datetime；看不懂或明顯不合理（打錯年份等）時回傳 None
+    if not value:
+        return None
+    ts = pd.to_datetime(str(value).strip(), errors="coerce")
+    if pd.isna(ts):
+        return None
+    ts = ts.to_pydatetime().replace(tzinfo=None)
+    if not EARLIEST_CHECK <= ts <= datetime.now() + FUTURE_TOLERANCE:
+        return None
+    return ts
+
+
+def parse_check_time(value):
+    # 表單上的「檢查時間」是手填文字，看不懂時以匯出當下為準
+    return parse_time(value) or datetime.now()
+
+
+def _text(value):
+    return "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value).strip()
+
+
+def form_rows(form, model, modules, inspector="", checked_at=None, row_modules=None):
+    # 表單（ipqc_data.FORM_COLUMNS）→ results 資料列；略過分隔列。
+    # row_modules 為每列的模組（與 form 對齊）；沒有時只選一個模組的表單以該模組記錄
+    checked_at = checked_at or datetime.now()
+    fallback = modules[0] if len(modules) == 1 else ""
+    row_modules = list(row_modules) if row_modules is not None else []
+    if len(row_modules) != len(form):
+        row_modules = [fallback] * len(form)
+    importance = pd.to_numeric(form["重要性"], errors="coerce")
+    rows = []
+    for record, module, weight in zip(form.to_dict("records"), row_modules, importance):
+        if record["項目"] == ipqc_data.SEPARATOR_ITEM:
+            continue
+        item_no = pd.to_numeric(record["項次"], errors="coerce")
+        rows.append((
+            model, _text(module) or fallback,
+            None if pd.isna(item_no) else int(item_no),
+            _text(record["項目"]), _text(record["規範"]), _text(record["方法"]),
+            None if pd.isna(weight) else float(weight),
+            _text(record["客訴編號"]), _text(record["判定結果"]), inspector,
+            checked_at.isoformat(timespec="seconds"), checked_at.strftime("%Y-%m-%d"),
+        ))
+    return rows
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self._local = threading.local()   # 每個執行緒各自的連線（sqlite3 連線不跨執行緒使用）
+        self._ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.create_function("decay_weight", 2, decay_weight, deterministic=True)
+            self._local.conn = conn
+        if not self._ready:
+            with conn:
+                conn.executescript(SCHEMA)
+                # 舊資料庫的 exports 還沒有 file_sha256 欄位
+                if "file_sha256" not in [r[1] for r in conn.execute("PRAGMA table_info(exports)")]:
+                    conn.execute("ALTER TABLE exports ADD COLUMN file_sha256 TEXT")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_exports_sha256 ON exports (file_sha256)")
+            # 舊資料庫（還沒有彙總表時寫入的判定結果）：第一次開啟時補建彙總
+            if conn.execute("SELECT 1 FROM results LIMIT 1").fetchone() and \
+                    not conn.execute("SELECT 1 FROM rollup_module_year LIMIT 1").fetchone():
+                self.rebuild_rollups(conn)
+            # 還沒有近期 NG 計數、舊版以固定起點加權的計數（有資料但沒有基準日），或半衰期設定改了：由日彙總重算
+            settings = dict(conn.execute("SELECT key, value FROM settings"))
+            if float(settings.get("ng_half_life", "nan")) != NG_HALF_LIFE or \
+                    ("ng_ref_day" not in settings and conn.execute("SELECT 1 FROM ng_scores LIMIT 1").fetchone()):
+                self.rebuild_scores(conn)
+            self._ready = True
+        return conn
+
+    # ---------- 寫入 ----------
+    def _insert(self, conn, form, model, modules, file="", checker="", supervisor="", checkedby="", project_no="",
+                check_time=None, seed=None, source="form", row_modules=None, file_sha256=None):
+        modules = list(modules)
+        checked_at = parse_check_time(check_time)
+        rows = form_rows(form, model, modules, checker, checked_at, row_modules)
+        if not any(row[RESULT_COLUMNS.index("result")] for row in rows):
+            return None
+        cur = conn.execute(
+            "INSERT INTO exports (file, model, modules, project_no, checker, supervisor, checkedby,"
+            " checked_at, exported_at, seed, source, file_sha256) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (file, model, "/".join(modules), project_no, checker, supervisor, checkedby,
+             checked_at.isoformat(timespec="seconds"), datetime.now().isoformat(timespec="seconds"),
+             seed, source, file_sha256))
+        export_id = cur.lastrowid
+        conn.executemany(
+            f"INSERT INTO results (export_id, {', '.join(RESULT_COLUMNS)}) VALUES (?{', ?' * len(RESULT_COLUMNS)})",
+            [(export_id,) + row for row in rows])
+        key_ids = {}
+        for name, keys in ROLLUPS.items():
+            ids = key_ids[name] = self._key_ids(conn, name, keys, rows)
+            for grain in GRAINS:
+                conn.executemany(
+                    f"INSERT INTO {rollup_table(name, grain)} (day, key_id, {', '.join(MEASURES)})"
+                    f" VALUES (?, ?{', ?' * len(MEASURES)})"
+                    " ON CONFLICT (day, key_id) DO UPDATE SET "
+                    + ", ".join(f"{m} = {m} + excluded.{m}" for m in MEASURES),
+                    [(day, ids[key]) + values for (day, key), values in rollup_deltas(rows, keys, grain).items()])
+        ref = self._score_ref(conn, max(row[RESULT_COLUMNS.index("checked_date")] for row in rows))
+        conn.executemany(
+            "INSERT INTO ng_scores (key_id, ng, valid) VALUES (?, ?, ?)"
+            " ON CONFLICT (key_id) DO UPDATE SET ng = ng + excluded.ng, valid = valid + excluded.valid",
+            [(key_ids["rollup_item"][key], ng, valid) for key, (ng, valid) in score_deltas(rows, ref).items()])
+        return export_id
+
+    def _remove(self, conn, export_id):
+        # 刪除一次匯出：彙總表扣回它的計數（扣到 0 的列一併刪除）
+        rows = conn.execute(f"SELECT {', '.join(RESULT_COLUMNS)} FROM results WHERE export_id = ?", (export_id,)).fetchall()
+        key_ids = {}
+        for name, keys in ROLLUPS.items():
+            ids = key_ids[name] = self._key_ids(conn, name, keys, rows)
+            for grain in GRAINS:
+                table = rollup_table(name, grain)
+                conn.executemany(
+                    f"UPDATE {table} SET " + ", ".join(f"{m} = {m} - ?" for m in MEASURES) + " WHERE day = ? AND key_id = ?",
+                    [values + (day, ids[key]) for (day, key), values in rollup_deltas(rows, keys, grain).items()])
+                conn.execute(f"DELETE FROM {table} WHERE rows <= 0")
+        deltas, ids = score_deltas(rows, self._score_ref(conn)), key_ids["rollup_item"]
+        conn.executemany("UPDATE ng_scores SET ng = ng - ?, valid = valid - ? WHERE key_id = ?",
+                         [(ng, valid, ids[key]) for key, (ng, valid) in deltas.items()])
+        # 已沒有任何有效判定結果的項目刪除（避免浮點數殘差留下極小的計數）
+        conn.executemany("DELETE FROM ng_scores WHERE key_id = ? AND NOT EXISTS"
+                         " (SELECT 1 FROM rollup_item_year WHERE key_id = ? AND valid > 0)",
+                         [(ids[key], ids[key]) for key in deltas])
+        conn.execute("DELETE FROM results WHERE export_id = ?", (export_id,))
+        conn.execute("UPDATE indexed_files SET export_id = NULL WHERE export_id = ?", (export_id,))
+        conn.execute("DELETE FROM exports WHERE id = ?", (export_id,))
+
+    @staticmethod
+    def _score_ref(conn, day=None):
+        # 近期 NG 計數的基準日；day 較晚時先把所有計數衰減到 day，再以 day 為基準
+        row = conn.execute("SELECT value FROM settings WHERE key = 'ng_ref_day'").fetchone()
+        ref = row[0] if row else None
+        if day is not None and (ref is None or day > ref):
+            if ref is not None:
+                factor = decay_weight(ref, day)
+                conn.execute("UPDATE ng_scores SET ng = ng * ?, valid = valid * ?", (factor, factor))
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('ng_ref_day', ?)", (day,))
+            ref = day
+        return ref
+
+    @staticmethod
+    def _key_ids(conn, name, keys, rows):
+        # 這次匯出各組分組欄位值 → {name}_keys 的 id（新的組先加入）
+        index = [RESULT_COLUMNS.index(k) for k in keys]
+        values = {tuple(row[i] or "" for i in index) for row in rows}
+        placeholders = ", ".join("?" * len(keys))
+        conn.executemany(f"INSERT OR IGNORE INTO {name}_keys ({', '.join(keys)}) VALUES ({placeholders})", values)
+        match = " AND ".join(f"{k} = ?" for k in keys)
+        return {v: conn.execute(f"SELECT id FROM {name}_keys WHERE {match}", v).fetchone()[0] for v in values}
+
+    def record(self, form, model, modules, **kwargs):
+        # 一次匯出：exports 一筆、每個項目一筆並累加每日彙總，同一個交易；回傳 export id。
+        # 沒有填任何判定結果的表單（空白表單）不記錄，回傳 None。
+        # kwargs：file, checker, supervisor, checkedby, project_no, check_time, seed, source, row_modules, file_sha256
+        with ipqc_shared.lock("results"):
+            conn = self._connect()
+            with conn:
+                return self._insert(conn, form, model, modules, **kwargs)
+
+    def record_many(self, exports):
+        # 多次匯出（每筆為 record 的參數 dict：form, model, modules, ...）在同一個交易中寫入；回傳各自的 export id
+        with ipqc_shared.lock("results"):
+            conn = self._connect()
+            with conn:
+                return [self._insert(conn, **export) for export in exports]
+
+    # ---------- 既有表單檔（補建） ----------
+    def indexed_files(self, location):
+        # 位置中已處理過的檔案：檔名 → (etag, 狀態)
+        rows = self._connect().execute("SELECT name, etag, status FROM indexed_files WHERE location = ?", (location,))
+        return {name: (etag, status) for name, etag, status in rows}
+
+    def known_hashes(self, hashes):
+        # 已記錄過的 xlsx 內容（即時匯出或先前補建）
+        hashes, known = list(hashes), set()
+        conn = self._connect()
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            marks = ", ".join("?" * len(chunk))
+            for sql in (f"SELECT file_sha256 FROM exports WHERE file_sha256 IN ({marks})",
+                        f"SELECT sha256 FROM indexed_files WHERE sha256 IN ({marks})"
+                        " AND (export_id IS NOT NULL OR status = 'blank')"):
+                known.update(r[0] for r in conn.execute(sql, chunk))
+        return known
+
+    def record_files(self, files):
+        # 一批表單檔在同一個交易中寫入：判定結果與處理紀錄一起提交，中斷後重跑不會重複也不會漏記。
+        # 每筆：location, name, etag, sha256, status, detail, export（record 的參數 dict；解析失敗時為 None）。
+        # 回傳各檔的（狀態, export id）：indexed 新記錄、known 內容已記錄過、blank 沒有判定結果（含相同內容的複本）、
+        # error 無法解析
+        now = datetime.now().isoformat(timespec="seconds")
+        outcomes = []
+        with ipqc_shared.lock("results"):
+            conn = self._connect()
+            with conn:
+                for f in files:
+                    status, export_id = f["status"], None
+                    known = conn.execute("SELECT id FROM exports WHERE file_sha256 = ?", (f["sha256"],)).fetchone() or \
+                        conn.execute("SELECT export_id FROM indexed_files WHERE sha256 = ? AND export_id IS NOT NULL",
+                                     (f["sha256"],)).fetchone()
+                    blank = known is None and conn.execute(
+                        "SELECT 1 FROM indexed_files WHERE sha256 = ? AND status = 'blank'", (f["sha256"],)).fetchone()
+                    if known:
+                        status, export_id = "known", known[0]
+                    elif blank:
+                        status = "blank"
+                    elif f.get("export") is not None:
+                        # 同一位置同名的檔案內容改了（匯出後在 Excel 修改判定結果）：以新內容取代先前記錄的那次匯出
+                        previous = conn.execute("SELECT export_id FROM indexed_files WHERE location = ? AND name = ?",
+                                                (f["location"], f["name"])).fetchone()
+                        if previous and previous[0] is not None and not conn.execute(
+                                "SELECT 1 FROM indexed_files WHERE export_id = ? AND NOT (location = ? AND name = ?)",
+                                (previous[0], f["location"], f["name"])).fetchone():
+                            self._remove(conn, previous[0])
+                        export_id = self._insert(conn, file_sha256=f["sha256"], **f["export"])
+                        status = "indexed" if export_id is not None else "blank"
+                    conn.execute(
+                        "INSERT OR REPLACE INTO indexed_files (location, name, etag, sha256, export_id, status, detail,"
+                        " indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (f["location"], f["name"], f.get("etag"), f["sha256"], export_id, status, f.get("detail"), now))
+                    outcomes.append((status, export_id))
+        return outcomes
+
+    def rebuild_rollups(self, conn=None):
+        # 由 results 全部重新計算彙總表（補建或校正用；平常由每次匯出增量更新）；{name}_keys 的 id 保留不變
+        conn = conn or self._connect()
+        with conn:
+            for name, keys in ROLLUPS.items():
+                values = ", ".join(f"COALESCE({k}, '')" for k in keys)
+                match = " AND ".join(f"k.{k} = COALESCE(r.{k}, '')" for k in keys)
+                measures = ", ".join(MEASURES)
+                for grain in GRAINS:
+                    conn.execute(f"DELETE FROM {rollup_table(name, grain)}")
+                conn.execute(f"INSERT OR IGNORE INTO {name}_keys ({', '.join(keys)}) SELECT DISTINCT {values} FROM results")
+                conn.execute(
+                    f"INSERT INTO {name} (day, key_id, {measures})"
+                    " SELECT r.checked_date, k.id, COUNT(*),"
+                    " SUM(r.result != ''), SUM(r.result = 'OK'), SUM(r.result = 'NG'), SUM(r.result = 'N/A')"
+                    f" FROM results r JOIN {name}_keys k ON {match} GROUP BY r.checked_date, k.id")
+                # 週 / 月 / 年由日彙總再加總
+                for grain in GRAINS[1:]:
+                    conn.execute(
+                        f"INSERT INTO {rollup_table(name, grain)} (day, key_id, {measures})"
+                        f" SELECT {PERIODS[grain]} AS period, key_id, {', '.join(f'SUM({m})' for m in MEASURES)}"
+                        f" FROM {name} GROUP BY period, key_id")
+        self.rebuild_scores(conn)
+
+    def rebuild_scores(self, conn=None):
+        # 由項目日彙總重算近期 NG 計數，並記下使用的半衰期與基準日（最晚的檢查日期，不晚於明天；還沒有資料時不設定）
+        conn = conn or self._connect()
+        with conn:
+            conn.execute("DELETE FROM ng_scores")
+            conn.execute("DELETE FROM settings WHERE key = 'ng_ref_day'")
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('ng_half_life', ?)", (str(NG_HALF_LIFE),))
+            latest = conn.execute("SELECT MAX(day) FROM rollup_item").fetchone()[0]
+            if latest is None:
+                return
+            ref = min(latest, (date.today() + FUTURE_TOLERANCE).isoformat())
+            conn.execute(
+                "INSERT INTO ng_scores (key_id, ng, valid)"
+                " SELECT key_id, SUM(ng * w), SUM(valid * w)"
+                " FROM (SELECT key_id, ng, valid, decay_weight(day, ?) AS w FROM rollup_item WHERE valid > 0)"
+                " GROUP BY key_id", (ref,))
+            conn.execute("INSERT INTO settings (key, value) VALUES ('ng_ref_day', ?)", (ref,))
+
+    # ---------- 查詢 ----------
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    @staticmethod
+    def _where(model=None, modules=None, start=None, end=None, date_column="checked_date"):
+        clauses, params = [], []
+        if model:
+            models = [model] if isinstance(model, str) else list(model)
+            clauses.append(f"model IN ({', '.join('?' * len(models))})")
+            params.extend(models)
+        if modules:
+            modules = [modules] if isinstance(modules, str) else list(modules)
+            clauses.append(f"module IN ({', '.join('?' * len(modules))})")
+            params.extend(modules)
+        if start:
+            clauses.append(f"{date_column} >= ?")
+            params.append(str(start))
+        if end:
+            clauses.append(f"{date_column} <= ?")
+            params.append(str(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def results(self, model=None, modules=None, start=None, end=None):
+        # 符合條件的每一列判定結果（日期為 YYYY-MM-DD，含起訖）
+        where, params = self._where(model, modules, start, end)
+        return self.query(f"SELECT {', '.join(RESULT_COLUMNS)} FROM results{where} ORDER BY checked_at, id", params)
+
+    def exports(self, limit=100):
+        return self.query("SELECT * FROM exports ORDER BY id DESC LIMIT ?", (limit,))
+
+    def version(self):
+        # 最後一次匯出的 id：報表快取以此判斷資料是否有新增
+        return self._connect().execute("SELECT MAX(id) FROM exports").fetchone()[0]
+
+    # ---------- 報表（查彙總表） ----------
+    def date_range(self):
+        first, last = self._connect().execute("SELECT MIN(day), MAX(day) FROM rollup_module").fetchone()
+        return (first, last) if first else None
+
+    def choices(self, column, model=None):
+        # 篩選選單：有判定結果的機型 / 模組
+        where, params = self._where(model)
+        return self.query(f"SELECT DISTINCT {column} FROM rollup_module_keys{where} ORDER BY {column}",
+                          params)[column].tolist()
+
+    @staticmethod
+    def _rate_columns(prefix=""):
+        return (f"SUM({prefix}rows) AS rows, SUM({prefix}valid) AS valid, SUM({prefix}ok) AS ok,"
+                f" SUM({prefix}ng) AS ng, SUM({prefix}na) AS na,"
+                f" ROUND(100.0 * SUM({prefix}ng) / NULLIF(SUM({prefix}valid), 0), 2) AS ng_rate")
+
+    def _rollup_rows(self, name, columns, grains, model, modules, start, end, keys=None, period=None):
+        # [start, end] 期間的彙總列（day, key_id, 計數；各粒度的表 UNION ALL）；回傳（子查詢, 參數），沒有資料時回傳 None。
+        # 給 period 時 day 為該期第一天（只有比 period 細的粒度需要換算）
+        bounds = self.date_range()
+        if bounds is None:
+            return None
+        start, end = max(str(start or bounds[0]), bounds[0]), min(str(end or bounds[1]), bounds[1])
+        if start > end:
+            return None
+        where, params = self._where(model, modules)
+        if keys is not None:
+            # 只看指定的組（分組欄位值的 tuple），以列值 IN (VALUES ...) 篩選
+            keys = [tuple(k) for k in keys] or [(None,) * len(columns)]
+            row = "(" + ", ".join("?" * len(columns)) + ")"
+            target = columns[0] if len(columns) == 1 else "(" + ", ".join(columns) + ")"
+            where += (" AND " if where else " WHERE ") + f"{target} IN (VALUES {', '.join([row] * len(keys))})"
+            params.extend(v for k in keys for v in k)
+        key_filter = f" AND key_id IN (SELECT id FROM {name}_keys{where})" if where else ""
+        parts, all_params = [], []
+        for grain, first, last in spans(start, end, grains):
+            day = PERIODS[period] + " AS day" if period and grain != period else "day"
+            parts.append(f"SELECT {day}, key_id, {', '.join(MEASURES)} FROM {rollup_table(name, grain)}"
+                         f" WHERE day BETWEEN ? AND ?{key_filter}")
+            all_params.extend([first, last] + params)
+        return " UNION ALL ".join(parts), all_params
+
+    def ng_rates(self, by="module", model=None, modules=None, start=None, end=None, min_valid=0, limit=None):
+        # 期間內各組的筆數與 NG 異常率（%），由高到低；by 為 DIMENSIONS 的維度
+        name, columns = DIMENSIONS[by]
+        rows = self._rollup_rows(name, columns, RANGE_GRAINS, model, modules, start, end)
+        if rows is None:
+            return pd.DataFrame(columns=columns + MEASURES + ["ng_rate"])
+        sql, params = rows
+        # 先以 key_id（整數）加總，再對應回分組欄位
+        sql = (f"SELECT {', '.join('k.' + c for c in columns)}, {self._rate_columns('t.')}"
+               f" FROM (SELECT key_id, {', '.join(f'SUM({m}) AS {m}' for m in MEASURES)} FROM ({sql}) GROUP BY key_id) t"
+               f" JOIN {name}_keys k ON k.id = t.key_id"
+               f" GROUP BY {', '.join('k.' + c for c in columns)} HAVING SUM(t.valid) >= ? ORDER BY ng_rate DESC, ng DESC")
+        params.append(min_valid)
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.query(sql, params)
+
+    def trend(self, by="model", period="week", model=None, modules=None, start=None, end=None, keys=None):
+        # 每一期（day / week / month / year，以該期第一天表示）各組的 NG 異常率；keys 限定要看的組。
+        # 期間頭尾不完整的一期只計入範圍內的日子
+        name, columns = DIMENSIONS[by]
+        rows = self._rollup_rows(name, columns, TREND_GRAINS[period], model, modules, start, end, keys, period)
+        if rows is None:
+            return pd.DataFrame(columns=["period"] + columns + MEASURES + ["ng_rate"])
+        sql, params = rows
+        return self.query(
+            f"SELECT t.day AS period, {', '.join('k.' + c for c in columns)}, {self._rate_columns('t.')}"
+            f" FROM ({sql}) t JOIN {name}_keys k ON k.id = t.key_id"
+            f" GROUP BY t.day, {', '.join('k.' + c for c in columns)} ORDER BY t.day", params)
+
+
+    # ---------- 近期 NG（抽樣權重） ----------
+    def recent_ng(self, model, as_of=None):
+        # 機型各（模組, 項目）的近期 NG 數 / 有效數，衰減到 as_of（預設今天；早於基準日時以基準日計）
+        ref = self._score_ref(self._connect())
+        factor = decay_weight(ref, as_of or date.today()) if ref else 1.0
+        frame = self.query(
+            "SELECT k.module, k.item, s.ng * ? AS ng, s.valid * ? AS valid"
+            " FROM ng_scores s JOIN rollup_item_keys k ON k.id = s.key_id WHERE k.model = ?",
+            (factor, factor, model))
+        frame[["ng", "valid"]] = frame[["ng", "valid"]].clip(lower=0)
+        return frame
+
+    def pool_history(self, pool, model, as_of=None):
+        # 項目池（ipqc_data.item_pool）逐列對應的近期 NG 數 / 有效數（沒有紀錄為 0）。
+        # 多模組表單中無法判斷模組的判定結果（module 為空）計入同機型所有同名項目
+        history = self.recent_ng(model, as_of)
+        items = pool["項目"].fillna("").astype(str).str.strip()
+        modules = pool[ipqc_data.MODULE_COLUMN].fillna("").astype(str).str.strip()
+        keys = pd.DataFrame({"module": modules, "item": items}, index=pool.index)
+        exact = keys.merge(history, on=["module", "item"], how="left")
+        loose = keys[["item"]].merge(history[history["module"] == ""].drop(columns="module"), on="item", how="left")
+        return pd.DataFrame({c: exact[c].fillna(0).to_numpy() + loose[c].fillna(0).to_numpy()
+                             for c in ("ng", "valid")}, index=pool.index)
+
+
+# 程序共用一個（每個執行緒各自連線）
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+        return _store
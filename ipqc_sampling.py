@@ -0,0 +1,277 @@
+# ========== IPQC 抽樣引擎 ==========
+# 重要性 >= 1 的項目必出現，其餘依重要性加權、不重複抽出補足數量。
+# 加權不重複抽樣用指數鍵（Efraimidis–Spirakis）：每項取 E/w（E ~ Exp(1)），取最小的 k 個，
+# 與逐次依權重抽出的結果分布相同，但整批只需一次 NumPy 運算，也能一次抽出多組方案。
+# 權重低於下限（例如重要性為 0）時以下限計算，確保每個項目都有機會被抽到；
+# 種子一律明確產生並回傳，匯出時記錄在檔案中，可重現同一份抽樣。
+# 依近期 NG 調整（選用）：權重再乘上 1 + NG_BOOST × 近期 NG 率，近期常 NG 的項目較容易被抽到；
+# 近期 NG 率由結果資料庫預先累加的衰減計數算出（ipqc_results.ResultsStore.pool_history），
+# 以 NG_PRIOR 筆虛擬的 OK 平滑，只點檢過一兩次的項目不會因一次 NG 就大幅提高。必出現規則不變。
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+FLOOR_WEIGHT = float(os.environ.get("IPQC_SAMPLING_FLOOR", 0.05))
+NG_BOOST = float(os.environ.get("IPQC_NG_BOOST", 4))   # 近期 NG 率 100% 時權重為原本的 1 + NG_BOOST 倍
+NG_PRIOR = 2.0
+_ZERO_KEY = 1e300   # 權重為 0 的項目排在所有正權重項目之後（再以亂數決定彼此順序）
+
+
+def resolve_seed(seed=None):
+    # 未指定時產生新的種子，並回傳實際使用的值以便記錄；負數（NumPy 不接受）與非整數引發 ValueError
+    if seed is None or seed == "":
+        return int(np.random.SeedSequence().entropy % (2 ** 32))
+    seed = int(seed)
+    if seed < 0:
+        raise ValueError(f"種子必須是非負整數：{seed}")
+    return seed
+
+
+def resolve_floor(floor=None):
+    # 最低權重：須為有限的非負數（nan / inf / 負數會讓權重失去意義），否則引發 ValueError
+    if floor is None or floor == "":
+        return FLOOR_WEIGHT
+    floor = float(floor)
+    if not math.isfinite(floor) or floor < 0:
+        raise ValueError(f"最低權重必須是非負的有限數字：{floor}")
+    return floor
+
+
+def importance_of(merged):
+    return pd.to_numeric(merged["重要性"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def recent_ng_rate(history, prior=NG_PRIOR):
+    # history：pool_history 回傳的衰減後 NG 數 / 有效數（與項目池逐列對齊）
+    ng = np.asarray(history["ng"], dtype=float)
+    valid = np.asarray(history["valid"], dtype=float)
+    return ng / (valid + prior)
+
+
+def sampling_weights(importance, floor=FLOOR_WEIGHT, ng_rate=None, boost=NG_BOOST):
+    weights = np.maximum(importance, floor if floor is not None else 0.0)
+    if ng_rate is not None:
+        weights = weights * (1.0 + boost * ng_rate)
+    return weights
+
+
+def _subset(ng_rate, positions):
+    return None if ng_rate is None else np.asarray(ng_rate, dtype=float)[positions]
+
+
+def _draw_keys(rng, weights, plans):
+    # 每列一組方案；鍵值越小越先被抽出
+    e = rng.exponential(size=(plans, len(weights)))
+    positive = weights > 0
+    with np.errstate(divide="ignore"):
+        keys = np.where(positive, e / np.where(positive, weights, 1.0), _ZERO_KEY * (1.0 + e))
+    return keys
+
+
+def _smallest(keys, k):
+    # 取每列最小的 k 個位置，並依鍵值排序（即抽出順序）
+    if k <= 0:
+        return np.empty((keys.shape[0], 0), dtype=int)
+    if k < keys.shape[1]:
+        part = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(keys.shape[1]), (keys.shape[0], 1))
+    order = np.argsort(np.take_along_axis(keys, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+def draw_positions(importance, sample_count, seed, floor=FLOOR_WEIGHT, plans=1, ng_rate=None):
+    # 回傳 shape (plans, 抽出數) 的列位置：必出現項目在前，其後為加權抽出的項目
+    rng = np.random.default_rng(seed)
+    fixed = np.flatnonzero(importance >= 1)
+    remaining = np.flatnonzero(importance < 1)
+
+    remain_count = sample_count - len(fixed)
+    if remain_count > 0:
+        k = min(remain_count, len(remaining))
+        keys = _draw_keys(rng, sampling_weights(importance[remaining], floor, _subset(ng_rate, remaining)), plans)
+        picked = remaining[_smallest(keys, k)]
+        return np.hstack([np.tile(fixed, (plans, 1)), picked])
+    # 必出現項目已超過數量：從中等機率抽出
+    keys = rng.random(size=(plans, len(fixed)))
+    return fixed[_smallest(keys, sample_count)]
+
+
+def draw_sample(merged, sample_count, seed=None, floor=FLOOR_WEIGHT, ng_rate=None):
+    # seed 為 None 時請先用 resolve_seed() 取得種子，才能記錄在匯出檔中
+    merged = merged.copy()
+    importance = importance_of(merged)
+    merged["重要性"] = importance
+    positions = draw_positions(importance, sample_count, seed, floor, ng_rate=ng_rate)[0]
+    return merged.iloc[positions]
+
+
+def draw_plans(merged, sample_count, plans, seed=None, floor=FLOOR_WEIGHT, ng_rate=None):
+    # 同一個項目池一次抽出多組互相獨立的方案（批次產生用）
+    merged = merged.copy()
+    importance = importance_of(merged)
+    merged["重要性"] = importance
+    return [merged.iloc[row] for row in draw_positions(importance, sample_count, seed, floor, plans, ng_rate)]
+
+
+# ========== 分層抽樣 ==========
+# 依來源分頁、客訴 / 一般、重要性層級分層，每層先保證至少抽到一定數量（已有必出現項目的層視為已涵蓋），
+# 剩餘名額依各層權重總和按比例分配（最大餘數法），所有層在同一次向量化運算中抽出。
+STRATA = {
+    "source": "來源分頁",
+    "kind": "客訴 / 一般",
+    "tier": "重要性層級",
+}
+
+
+def importance_tier(importance):
+    return np.select([importance >= 1, importance >= 0.5, importance > 0], ["必出現", "高", "低"], "零")
+
+
+def stratum_labels(merged, by):
+    # 每列的分層標籤，例如 "MINI IV V ｜一般"
+    if not by:
+        return pd.Series("全部", index=merged.index)
+    parts = []
+    for key in by:
+        if key == "source":
+            col = merged["來源分頁"] if "來源分頁" in merged.columns else pd.Series("", index=merged.index)
+            parts.append(col.fillna("").astype(str).str.strip().replace("", "未標示"))
+        elif key == "kind":
+            is_complaint = merged["客訴編號"].fillna("").astype(str).str.strip() != ""
+            parts.append(pd.Series(np.where(is_complaint, "客訴", "一般"), index=merged.index))
+        elif key == "tier":
+            parts.append(pd.Series(importance_tier(importance_of(merged)), index=merged.index))
+        else:
+            raise ValueError(f"未知的分層方式：{key}（可用：{', '.join(STRATA)}）")
+    labels = parts[0]
+    for part in parts[1:]:
+        labels = labels + "｜" + part
+    return labels
+
+
+def allocate_quotas(sizes, weights, budget, covered, min_per_stratum=1):
+    # sizes：各層可抽項目數；weights：各層權重總和；covered：已由必出現項目涵蓋的層
+    quota = np.zeros(len(sizes), dtype=int)
+    if budget <= 0:
+        return quota
+    need = (~covered) & (sizes > 0)
+    base = np.where(need, np.minimum(min_per_stratum, sizes), 0)
+    if base.sum() > budget:
+        # 名額不足以涵蓋每一層：依權重由大到小逐層給一項
+        for i in np.argsort(-weights, kind="stable"):
+            if budget <= 0:
+                break
+            if need[i]:
+                quota[i] = 1
+                budget -= 1
+        return quota
+    quota += base
+    left = budget - int(base.sum())
+    while left > 0:
+        cap = sizes - quota
+        share = np.where(cap > 0, np.maximum(weights, 1e-12), 0.0)
+        if share.sum() == 0:
+            break
+        ideal = left * share / share.sum()
+        add = np.minimum(np.floor(ideal).astype(int), cap)
+        if add.sum() == 0:
+            add = np.zeros_like(quota)
+            add[int(np.argmax(np.where(cap > 0, ideal - np.floor(ideal), -1.0)))] = 1
+        quota += add
+        left -= int(add.sum())
+    return quota
+
+
+def stratified_positions(merged, sample_count, by, seed, floor=FLOOR_WEIGHT, min_per_stratum=1, ng_rate=None):
+    # 回傳 (列位置, 分層資訊 DataFrame)
+    rng = np.random.default_rng(seed)
+    importance = importance_of(merged)
+    labels = stratum_labels(merged, by).to_numpy()
+    fixed = np.flatnonzero(importance >= 1)
+    remaining = np.flatnonzero(importance < 1)
+
+    names, codes_all = np.unique(labels, return_inverse=True)
+    n_strata = len(names)
+    sizes = np.bincount(codes_all[remaining], minlength=n_strata)
+    fixed_counts = np.bincount(codes_all[fixed], minlength=n_strata)
+    weights = sampling_weights(importance[remaining], floor, _subset(ng_rate, remaining))
+    weight_sums = np.bincount(codes_all[remaining], weights=weights, minlength=n_strata)
+
+    if sample_count <= len(fixed):
+        keys = rng.random(len(fixed))
+        positions = fixed[np.argsort(keys)[:sample_count]]
+        quota = np.zeros(n_strata, dtype=int)
+    else:
+        quota = allocate_quotas(sizes, weight_sums, sample_count - len(fixed), fixed_counts > 0, min_per_stratum)
+        # 單次向量化：依（層, 指數鍵）排序，取每層前 quota 個
+        codes = codes_all[remaining]
+        keys = _draw_keys(rng, weights, 1)[0]
+        order = np.lexsort((keys, codes))
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(n_strata))
+        rank = np.arange(len(order)) - starts[sorted_codes]
+        chosen = order[rank < quota[sorted_codes]]
+        chosen = chosen[np.argsort(keys[chosen])]
+        positions = np.concatenate([fixed, remaining[chosen]])
+
+    info = pd.DataFrame({
+        "分層": names,
+        "項目數": sizes + fixed_counts,
+        "必出現": fixed_counts,
+        "加權抽樣名額": quota,
+    })
+    return positions, info
+
+
+def draw_stratified(merged, sample_count, by=("kind",), seed=None, floor=FLOOR_WEIGHT, min_per_stratum=1, ng_rate=None):
+    merged = merged.copy()
+    positions, _ = stratified_positions(merged, sample_count, by, seed, floor, min_per_stratum, ng_rate)
+    merged["重要性"] = importance_of(merged)
+    return merged.iloc[positions]
+
+
+def coverage_report(merged, sample_count, by=("kind",), floor=FLOOR_WEIGHT, min_per_stratum=1, plans=2000, seed=0,
+                    ng_rate=None):
+    # 各層的預期涵蓋率：分層抽樣（由配額決定）vs 不分層加權抽樣（以多組方案模擬估計）
+    _, info = stratified_positions(merged, sample_count, by, seed, floor, min_per_stratum, ng_rate)
+    labels = stratum_labels(merged, by).to_numpy()
+    names, codes = np.unique(labels, return_inverse=True)
+    draws = draw_positions(importance_of(merged), sample_count, seed, floor, plans, ng_rate)
+    hit = np.zeros((plans, len(names)), dtype=bool)
+    np.put_along_axis(hit, codes[draws], True, axis=1)
+    picked = np.zeros((plans, len(names)))
+    np.add.at(picked, (np.repeat(np.arange(plans), draws.shape[1]), codes[draws].ravel()), 1)
+
+    # 必出現項目超過抽樣數時是從中等機率抽出：涵蓋率 = 1 - C(F-f, n) / C(F, n)
+    total_fixed = int(info["必出現"].sum())
+    ratio = min(1.0, sample_count / total_fixed) if total_fixed else 1.0
+    miss = [
+        math.exp(math.lgamma(total_fixed - f + 1) + math.lgamma(total_fixed - sample_count + 1)
+                 - math.lgamma(total_fixed - f - sample_count + 1) - math.lgamma(total_fixed + 1))
+        if 0 < f and ratio < 1 and total_fixed - f >= sample_count else float(f == 0)
+        for f in info["必出現"]
+    ]
+    info["分層預期抽出"] = (info["必出現"] * ratio + info["加權抽樣名額"]).round(2)
+    info["分層涵蓋率"] = np.where(info["加權抽樣名額"] > 0, 1.0, 1.0 - np.array(miss)).round(3)
+    info["不分層預期抽出"] = picked.mean(axis=0).round(2)
+    info["不分層涵蓋率"] = hit.mean(axis=0).round(3)
+    return info
+
+
+def min_full_coverage(merged, by=("kind",)):
+    # 每層至少一項所需的最少抽樣數（必出現項目 + 尚未涵蓋的層數）
+    importance = importance_of(merged)
+    labels = stratum_labels(merged, by)
+    fixed = importance >= 1
+    covered = set(labels[fixed])
+    return int(fixed.sum()) + int(labels[~fixed].nunique() - len(covered & set(labels[~fixed])))
+
+
+def sample(merged, sample_count, seed=None, floor=FLOOR_WEIGHT, strata=None, ng_rate=None):
+    # 指定 strata（例如 ["source", "kind"]）時改用分層抽樣；ng_rate（與 merged 逐列對齊）為依近期 NG 調整的權重
+    if strata:
+        return draw_stratified(merged, sample_count, by=strata, seed=seed, floor=floor, ng_rate=ng_rate)
+    return draw_sample(merged, sample_count, seed=seed, floor=floor, ng_rate=ng_rate)
@@ -0,0 +1,173 @@
+# ========== 客訴 / 點檢項目全文搜尋（n-gram 倒排索引） ==========
+# 客訴的問題描述、對策與點檢項目多為中英混雜的短句，沒有分詞：文字正規化（全形轉半形、英文小寫、去掉空白與標點）後
+# 以單字與相鄰兩字（bigram）建立倒排索引，查詢時取關鍵字各 bigram 的文件交集，再以子字串確認，
+# 不必每次重跑都對所有分頁逐列比對。索引在每個資料集版本建立一次（Dataset.search_index，暖身時預先建立）。
+# 多個關鍵字以空白或 / 分隔，符合任一個即列出；分數為各關鍵字的 idf × 欄位權重（關鍵字佔欄位越多越高），
+# 同時符合多個關鍵字、出現在問題描述 / 項目本身的排在前面，同分時較新的客訴在前。
+import math
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+KINDS = {"complaint": "客訴", "inspection": "點檢項目"}
+
+# 各類別要索引的欄位與權重（資料中沒有的欄位略過）；第一個欄位為搜尋結果顯示的內容
+FIELDS = {
+    "complaint": {"問題描述": 1.0, "客訴編號": 0.8, "客訴單異常類別": 0.6, "調查真因類別": 0.6,
+                  "立即改善對策": 0.4, "備註": 0.4},
+    "inspection": {"項目": 1.0, "規範": 0.6, "方法": 0.4},
+}
+RESULT_COLUMNS = ["score", "kind", "row", "機型", "模組", "客訴編號", "內容", "符合欄位", "來源分頁", "建立日期"]
+
+_STRIP = re.compile(r"[\W_]+")
+_SPLIT = re.compile(r"[\s/,，、;；|]+")
+
+
+def normalize(text):
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return ""
+    return _STRIP.sub("", unicodedata.normalize("NFKC", str(text)).lower())
+
+
+def grams(text):
+    # 索引用：所有單字與相鄰兩字
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def query_grams(term):
+    # 查詢用：一個字的關鍵字查單字，其餘只需相鄰兩字
+    return [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+def split_query(query):
+    terms = []
+    for part in _SPLIT.split(str(query or "")):
+        term = normalize(part)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def resolve_limit(limit=None):
+    # 結果筆數上限：None 為不限，其餘須為正整數，否則引發 ValueError
+    if limit is None:
+        return None
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError(f"筆數上限必須是正整數：{limit}")
+    return limit
+
+
+def _column(frame, col):
+    if col in frame.columns:
+        return frame[col].fillna("").astype(str).str.strip().tolist()
+    return [""] * len(frame)
+
+
+class SearchIndex:
+    def __init__(self, inspection=None, complaints=None):
+        frames = {"complaint": complaints, "inspection": inspection}
+        meta, texts = [], []
+        for kind, fields in FIELDS.items():
+            frame = frames.get(kind)
+            if frame is None or frame.empty:
+                continue
+            shown = list(fields)[0]
+            created = pd.to_datetime(frame["建立日期"], errors="coerce") if "建立日期" in frame.columns else \
+                pd.Series(pd.NaT, index=frame.index)
+            meta.append(pd.DataFrame({
+                "kind": kind, "row": np.arange(len(frame)),
+                "機型": _column(frame, "機型"), "模組": _column(frame, "模組"), "客訴編號": _column(frame, "客訴編號"),
+                "內容": _column(frame, shown), "來源分頁": _column(frame, "來源分頁"), "建立日期": created.to_numpy(),
+            }))
+            columns = {f: [normalize(v) for v in frame[f]] if f in frame.columns else None for f in fields}
+            for i in range(len(frame)):
+                texts.append([(f, w, columns[f][i]) for f, w in fields.items() if columns[f] is not None and columns[f][i]])
+        self.docs = pd.concat(meta, ignore_index=True) if meta else pd.DataFrame(columns=RESULT_COLUMNS[1:])
+        self.texts = texts
+        self._models = self.docs["機型"].to_numpy(dtype=object)
+        self._kinds = self.docs["kind"].to_numpy(dtype=object)
+        # 同分時依建立日期排序用（沒有日期的排最後）
+        created = pd.to_datetime(self.docs["建立日期"]) if len(self.docs) else pd.Series(dtype="datetime64[ns]")
+        self._created = created.fillna(pd.Timestamp.min).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+        # gram → 含有它的文件編號（由小到大）
+        postings = {}
+        for doc, fields in enumerate(texts):
+            seen = set()
+            for _, _, text in fields:
+                seen |= grams(text)
+            for gram in seen:
+                postings.setdefault(gram, []).append(doc)
+        self.postings = {gram: np.asarray(docs, dtype=np.int32) for gram, docs in postings.items()}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _matches(self, term, allowed=None):
+        # 含有 term 的文件：{文件編號: (欄位權重 × 長度比例, 欄位名稱)}，取最好的欄位；另回傳全部文件中的候選數（算 idf）。
+        # allowed 為可列出的文件（布林陣列），先篩掉再逐筆確認子字串
+        lists = [self.postings.get(g) for g in query_grams(term)]
+        if any(p is None for p in lists):
+            return {}, 0
+        lists.sort(key=len)
+        candidates = lists[0]
+        for p in lists[1:]:
+            candidates = np.intersect1d(candidates, p, assume_unique=True)
+            if not len(candidates):
+                return {}, 0
+        total = len(candidates)
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        found = {}
+        for doc in candidates.tolist():
+            best = None
+            for field, weight, text in self.texts[doc]:
+                if term in text:
+                    value = weight * (1 + len(term) / len(text))
+                    if best is None or value > best[0]:
+                        best = (value, field)
+            if best is not None:
+                found[doc] = best
+        return found, total
+
+    def search(self, query, models=None, kinds=None, limit=50):
+        # 回傳依分數排序的 DataFrame（RESULT_COLUMNS）；row 為該列在原始資料表（點檢 / 客訴）中的位置。
+        # limit 為 None 時不限筆數
+        limit = resolve_limit(limit)
+        allowed = None
+        if models or kinds:
+            allowed = np.ones(len(self), dtype=bool)
+            if models:
+                allowed &= np.isin(self._models, list(models))
+            if kinds:
+                allowed &= np.isin(self._kinds, list(kinds))
+        scores, fields = {}, {}
+        for term in split_query(query):
+            found, total = self._matches(term, allowed)
+            if not found:
+                continue
+            idf = math.log(1 + len(self) / total)
+            for doc, (value, field) in found.items():
+                scores[doc] = scores.get(doc, 0.0) + idf * value
+                fields.setdefault(doc, []).append(field)
+        if not scores:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        # 只取前 limit 筆組成結果表
+        docs = np.fromiter(scores, dtype=np.int64, count=len(scores))
+        values = np.round(np.fromiter(scores.values(), dtype=float, count=len(scores)), 3)
+        order = np.lexsort((-self._created[docs], -values))[:limit]
+        docs, values = docs[order], values[order]
+        hits = self.docs.iloc[docs].copy()
+        hits.insert(0, "score", values)
+        hits["符合欄位"] = ["、".join(dict.fromkeys(fields[d])) for d in docs]
+        return hits[RESULT_COLUMNS].reset_index(drop=True)
+
+
+def public(hits):
+    # 命令列 / API 輸出：去掉內部的列位置，日期只留年月日
+    hits = hits.drop(columns="row")
+    hits["建立日期"] = pd.to_datetime(hits["建立日期"]).dt.strftime("%Y-%m-%d").fillna("")
+    return hits
@@ -0,0 +1,240 @@
+# ========== 多個程序共用的資料夾（發佈、鎖定、版本檔） ==========
+# 負載平衡後面跑多個 app 程序（副本）時，所有副本掛載同一個資料夾：
+#   data/CURRENT.json        版本檔：目前版本、各資料檔的 sha256 / 大小 / 更新時間與來源
+#   data/versions/<版本>/    每個版本一個資料夾，發佈後內容不再改變
+#   data/<原檔名>            目前版本的複本，CLI / API / 基準測試沿用原本的路徑
+#   output/、outbox/         匯出表單與上傳待傳區
+#   locks/                   各項作業的建議鎖（Linux 用 flock，Windows 用 msvcrt）
+#   sync.json                上次從 OneDrive 同步的時間與結果
+# 所有寫入都先寫暫存檔再改名（os.replace），讀取端不會看到寫一半的檔案。
+# 發佈新版本時先寫好版本資料夾，最後才取代版本檔；各副本只看版本檔，讀到的兩個資料檔一定屬於同一版。
+#   IPQC_SHARED_DIR      共用資料夾（預設目前資料夾，單一程序時與原本的 data/、output/ 位置相同）
+#   IPQC_SYNC_INTERVAL   兩次從 OneDrive 同步的最短間隔秒數（預設 60；0 表示每次整頁重跑都檢查）
+#   IPQC_KEEP_VERSIONS   保留的舊版本資料夾數（預設 5）
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+SHARED_DIR = os.environ.get("IPQC_SHARED_DIR", ".")
+SYNC_INTERVAL = float(os.environ.get("IPQC_SYNC_INTERVAL", 60))
+KEEP_VERSIONS = int(os.environ.get("IPQC_KEEP_VERSIONS", 5))
+
+# 資料檔種類 → 檔名（版本資料夾與複本都使用原本的檔名）
+DATA_FILES = {
+    "inspection": "IPQC點檢項目最新1.xlsx",
+    "complaint": "客訴調查總表.xlsx",
+}
+
+# mkstemp / mkdtemp 只給擁有者權限；改成一般建立檔案時的權限（依 umask），其他帳號執行的副本也能讀取
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def path(*parts, root=None):
+    return os.path.normpath(os.path.join(root or SHARED_DIR, *parts))
+
+
+# ---------- 原子寫入 ----------
+def atomic_write(target, data):
+    # 同一資料夾內先寫暫存檔並 fsync，再改名取代；別的程序只會看到舊檔或完整的新檔
+    directory = os.path.dirname(target) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+# ---------- 建議鎖 ----------
+def _acquire(f, blocking, shared):
+    if fcntl is not None:
+        flags = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(f.fileno(), flags)
+            return True
+        except BlockingIOError:
+            return False
+    # msvcrt 沒有共用鎖，一律視為獨占；LK_LOCK 只重試 10 秒，等待時自行重試
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.1)
+
+
+def _release(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def lock(name, blocking=True, shared=False, root=None):
+    # with ipqc_shared.lock("publish"): ...；blocking=False 時拿不到鎖立即回傳 False（由呼叫端決定略過）
+    # flock 以開啟的檔案為單位，同一程序的不同執行緒各自開檔，彼此也會互斥
+    lock_path = path("locks", name + ".lock", root=root)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        acquired = _acquire(f, blocking, shared)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _release(f)
+
+
+def save_file(directory, filename, data, root=None):
+    # 匯出表單寫入 output/ 等共用資料夾；同名（同日同機型模組）時以最後一次匯出為準
+    with lock("files", root=root):
+        atomic_write(os.path.join(directory, filename), data)
+
+
+# ========== 資料集版本 ==========
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class DatasetVersions:
+    def __init__(self, root=None):
+        self.root = root or SHARED_DIR
+        self.data_dir = path("data", root=self.root)
+        self.versions_dir = os.path.join(self.data_dir, "versions")
+        self.version_file = os.path.join(self.data_dir, "CURRENT.json")
+        self.sync_file = path("sync.json", root=self.root)
+
+    def lock(self, name, blocking=True):
+        return lock(name, blocking, root=self.root)
+
+    # ---------- 讀取 ----------
+    def current(self):
+        # 目前版本（版本檔內容）；尚未發佈過時回傳 None
+        try:
+            with open(self.version_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def mirror_path(self, kind):
+        return os.path.join(self.data_dir, DATA_FILES[kind])
+
+    def mirror_paths(self):
+        return tuple(self.mirror_path(kind) for kind in DATA_FILES)
+
+    def version_path(self, manifest, kind):
+        # 該版本中的資料檔；版本中沒有這個種類時回到複本路徑
+        if manifest and kind in manifest["files"]:
+            return os.path.join(self.versions_dir, manifest["version"], DATA_FILES[kind])
+        return self.mirror_path(kind)
+
+    def dataset_paths(self, manifest):
+        # 該版本的（點檢, 客訴）檔案路徑，給 ipqc_data.load_dataset
+        return tuple(self.version_path(manifest, kind) for kind in DATA_FILES)
+
+    # ---------- 發佈 ----------
+    def publish(self, files, source=""):
+        # files: {"inspection": bytes, "complaint": bytes}，只給其中一種時另一種沿用目前版本。
+        # 內容與目前版本相同時不發佈，回傳 None；否則回傳新的版本檔內容（changed 為有變更的種類）
+        with self.lock("publish"):
+            current = self.current()
+            entries = dict(current["files"]) if current else {}
+            changed = {}
+            for kind, data in files.items():
+                digest = _sha256(data)
+                if entries.get(kind, {}).get("sha256") == digest:
+                    continue
+                changed[kind] = data
+                entries[kind] = {"sha256": digest, "size": len(data), "updated_at": _now(), "source": source}
+            if not changed:
+                return None
+
+            version = _sha256("".join(entries[k]["sha256"] for k in sorted(entries)).encode())[:16]
+            version_dir = os.path.join(self.versions_dir, version)
+            if not os.path.isdir(version_dir):
+                # 先寫暫存資料夾，完整後整個改名成版本資料夾
+                os.makedirs(self.versions_dir, exist_ok=True)
+                tmp = tempfile.mkdtemp(dir=self.versions_dir, prefix=".tmp-")
+                try:
+                    os.chmod(tmp, 0o777 & ~_UMASK)
+                    for kind in entries:
+                        target = os.path.join(tmp, DATA_FILES[kind])
+                        if kind in changed:
+                            atomic_write(target, changed[kind])
+                        else:
+                            shutil.copyfile(self.version_path(current, kind), target)
+                    os.replace(tmp, version_dir)
+                except BaseException:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    raise
+
+            manifest = {"version": version, "published_at": _now(), "source": source,
+                        "changed": sorted(changed), "files": entries}
+            atomic_write(self.version_file, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+            for kind, data in changed.items():
+                atomic_write(self.mirror_path(kind), data)
+            self._prune(version)
+            return manifest
+
+    def adopt(self):
+        # 第一次啟用共用版本時：把原本位置（data/ 下的複本路徑）已有的資料檔發佈成第一個版本
+        current = self.current()
+        if current is not None:
+            return current
+        files = {}
+        for kind in DATA_FILES:
+            if os.path.exists(self.mirror_path(kind)):
+                with open(self.mirror_path(kind), "rb") as f:
+                    files[kind] = f.read()
+        if not files:
+            return None
+        return self.publish(files, source="local") or self.current()
+
+    def _prune(self, keep_version):
+        # 保留目前版本與最近的 KEEP_VERSIONS 個舊版本（其他副本可能還在載入剛被取代的版本）
+        try:
+            entries = [e for e in os.scandir(self.versions_dir) if e.is_dir() and not e.name.startswith(".")]
+        except FileNotFoundError:
+            return
+        old = sorted((e for e in entries if e.name != keep_version), key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in old[KEEP_VERSIONS:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    # ---------- 從 OneDrive 同步的間隔 ----------
+    def sync_due(self, interval=SYNC_INTERVAL):
+        try:
+            with open(self.sync_file, encoding="utf-8") as f:
+                last = json.load(f).get("at", 0)
+        except (FileNotFoundError, ValueError):
+            return True
+        return time.time() - last >= interval
+
+    def mark_synced(self, error=None):
+        record = {"at": time.time(), "time": _now(), "error": error}
+        atomic_write(self.sync_file, json.dumps(record, ensure_ascii=False).encode("utf-8"))
@@ -0,0 +1,314 @@
+# ========== 儲存後端（本機資料夾 / OneDrive 同步資料夾 / Graph API） ==========
+# 三種部署只有「資料檔從哪裡來、表單存到哪裡」不同，頁面都是 try.py：
+#   local    資料檔只由管理員上傳更新，表單存在 output/（原 0812.py）
+#   folder   資料檔與表單都在 OneDrive 本機同步資料夾（原 0813.py）
+#   graph    透過 Microsoft Graph 讀寫公司 OneDrive / SharePoint，表單另存 output/ 並上傳歷史資料夾（try.py 預設）
+# 每個後端只提供 read / write / list / stat；Storage 在其上統一處理：
+#   條件式取得   以 etag（Graph 的 eTag，本機為 mtime + 大小）判斷，來源沒變就不下載；紀錄存在共用資料夾，重啟後沿用
+#   清單快取     同一輪的多次 stat 共用一次資料夾清單（Graph 每次列清單都是一個請求）
+#   原子寫入     本機與同步資料夾一律先寫暫存檔再改名（ipqc_shared.atomic_write），Graph 上傳本身即為整檔取代
+#   IPQC_STORAGE      部署模式 local / folder / graph（預設 graph）
+#   IPQC_SOURCE_DIR   folder 模式：放點檢 / 客訴資料檔的同步資料夾
+#   IPQC_EXPORT_DIR   folder 模式：存放匯出表單的同步資料夾
+import hashlib
+import json
+import os
+import threading
+import time
+
+import ipqc_metrics
+import ipqc_shared
+
+LIST_TTL = 5.0          # 資料夾清單快取秒數
+TOKEN_MARGIN = 300.0    # Graph 權杖到期前幾秒就換新的
+WRITE_RETRIES = 5       # 同步資料夾的檔案被 OneDrive / Excel 鎖住時重試次數
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+DEFAULT_UPLOAD_FOLDER = "Shared Documents/IPQC_上傳_點檢資料"
+DEFAULT_HISTORY_FOLDER = "Shared Documents/IPQC_歷史資料"
+
+
+# ========== 後端 ==========
+class LocalBackend:
+    # 本機（或共用掛載）資料夾
+    label = "本機資料夾"
+
+    def __init__(self, root):
+        self.root = root
+        self.key = "local-" + hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:12]
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def read(self, name):
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def write(self, name, data):
+        ipqc_shared.save_file(self.root, name, data)
+        return self.stat(name)
+
+    def list(self):
+        if not os.path.isdir(self.root):
+            return []
+        # 略過寫入中的暫存檔（.xxx.tmp）
+        return sorted(f for f in os.listdir(self.root) if not f.startswith(".") and not f.endswith(".tmp"))
+
+    def stat(self, name):
+        try:
+            st = os.stat(self._path(name))
+        except FileNotFoundError:
+            return None
+        return {"name": name, "size": st.st_size, "modified": st.st_mtime,
+                "etag": f"{st.st_mtime_ns:x}-{st.st_size:x}"}
+
+
+class SyncFolderBackend(LocalBackend):
+    # OneDrive 本機同步資料夾：暫存檔以 .tmp 結尾（OneDrive 不會同步），改名時檔案可能正被 OneDrive / Excel 鎖住，稍後重試
+    label = "OneDrive 同步資料夾"
+
+    def write(self, name, data):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return super().write(name, data)
+            except PermissionError:
+                if attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+
+
+class GraphClient:
+    # Microsoft Graph：權杖在到期前重複使用，site id 在程序中只查一次
+    def __init__(self, get_secret=os.environ.get):
+        self.get_secret = get_secret
+        self._lock = threading.Lock()
+        self._token = None
+        self._token_expires = 0.0
+        self._site_id = None
+
+    @ipqc_metrics.graph("token")
+    def _acquire_token(self):
+        import msal
+        client_id = self.get_secret("client_id")
+        client_secret = self.get_secret("client_secret")
+        tenant_id = self.get_secret("tenant_id")
+        if not all([client_id, client_secret, tenant_id]):
+            raise RuntimeError("Missing Graph credentials. Put client_id/client_secret/tenant_id into Streamlit secrets.")
+        authority = f"https://login.microsoftonline.com/{tenant_id}"
+        app = msal.ConfidentialClientApplication(client_id, authority=authority, client_credential=client_secret)
+        token = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
+        if "access_token" not in token:
+            raise RuntimeError(f"Failed to obtain Graph token: {token}")
+        return token
+
+    def token(self):
+        with self._lock:
+            if self._token is None or time.time() >= self._token_expires:
+                token = self._acquire_token()
+                self._token = token["access_token"]
+                self._token_expires = time.time() + float(token.get("expires_in", 0)) - TOKEN_MARGIN
+            return self._token
+
+    def _headers(self, **extra):
+        return dict({"Authorization": f"Bearer {self.token()}"}, **extra)
+
+    def site_id(self):
+        if self._site_id is None:
+            import requests
+            hostname = self.get_secret("sharepoint_hostname")  # e.g. "yourcompany.sharepoint.com"
+            site_path = self.get_secret("sharepoint_site_path") or ""  # e.g. "sites/YourSite" or empty
+            url = f"{GRAPH_URL}/sites/{hostname}:/{site_path}" if site_path else f"{GRAPH_URL}/sites/{hostname}"
+            headers = self._headers()
+            with ipqc_metrics.graph_call("site"):
+                r = requests.get(url, headers=headers)
+                r.raise_for_status()
+            self._site_id = r.json()["id"]
+        return self._site_id
+
+    def _url(self, item_path):
+        return f"{GRAPH_URL}/sites/{self.site_id()}/drive/root:/{item_path}"
+
+    @ipqc_metrics.graph("list")
+    def children(self, folder):
+        # 資料夾項目多時 Graph 分頁回傳（每頁最多 200 筆），依 @odata.nextLink 取完
+        import requests
+        items, url = [], self._url(folder) + ":/children"
+        while url:
+            r = requests.get(url, headers=self._headers())
+            r.raise_for_status()
+            page = r.json()
+            items.extend(page.get("value", []))
+            url = page.get("@odata.nextLink")
+        return items
+
+    @ipqc_metrics.graph("download")
+    def download(self, item_path):
+        import requests
+        r = requests.get(self._url(item_path) + ":/content", headers=self._headers(), stream=True)
+        r.raise_for_status()
+        return r.content
+
+    @ipqc_metrics.graph("upload")
+    def upload(self, folder, filename, data):
+        import requests
+        headers = self._headers(**{"Content-Type": "application/octet-stream"})
+        r = requests.put(self._url(f"{folder}/{filename}") + ":/content", headers=headers, data=data)
+        r.raise_for_status()
+        return r.json()
+
+
+class GraphBackend:
+    # 公司 OneDrive / SharePoint 上的一個資料夾
+    def __init__(self, client, folder, label="公司 OneDrive"):
+        self.client = client
+        self.folder = folder
+        self.label = label
+        self.key = "graph-" + hashlib.sha1(folder.encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def _stat(item):
+        # eTag 在內容或中繼資料變更時改變；沒有時以修改時間 + 大小代替
+        etag = item.get("eTag") or item.get("cTag")
+        if etag is None and item.get("lastModifiedDateTime"):
+            etag = f"{item['lastModifiedDateTime']}-{item.get('size')}"
+        return {"name": item["name"], "size": item.get("size"), "modified": item.get("lastModifiedDateTime"),
+                "etag": etag}
+
+    def read(self, name):
+        return self.client.download(f"{self.folder}/{name}")
+
+    def write(self, name, data):
+        return self._stat(dict({"name": name}, **self.client.upload(self.folder, name, data)))
+
+    def items(self):
+        return {it["name"]: self._stat(it) for it in self.client.children(self.folder) if "folder" not in it}
+
+    def list(self):
+        return sorted(self.items())
+
+    def stat(self, name):
+        return self.items().get(name)
+
+
+# ========== 統一的存取介面 ==========
+class Storage:
+    def __init__(self, backend, state_dir=None):
+        self.backend = backend
+        self.label = backend.label
+        self.state_path = os.path.join(state_dir or ipqc_shared.path("cache"), backend.key + ".json")
+        self._lock = threading.Lock()
+        self._listing = None        # (取得時間, {名稱: stat})
+
+    # ---------- 清單 / 狀態（短暫快取） ----------
+    def _items(self):
+        with self._lock:
+            if self._listing is None or time.monotonic() - self._listing[0] > LIST_TTL:
+                if hasattr(self.backend, "items"):
+                    items = self.backend.items()
+                else:
+                    items = {name: self.backend.stat(name) for name in self.backend.list()}
+                    items = {name: st for name, st in items.items() if st is not None}
+                self._listing = (time.monotonic(), items)
+            return self._listing[1]
+
+    def invalidate(self):
+        with self._lock:
+            self._listing = None
+
+    def list(self):
+        # 目前的檔案名稱（不經快取，剛寫入的檔案馬上看得到）
+        return self.backend.list()
+
+    def stat(self, name):
+        return self._items().get(name)
+
+    # ---------- 讀寫 ----------
+    def read(self, name):
+        return self.backend.read(name)
+
+    def write(self, name, data):
+        # 寫入條件式取得過的檔案時記下新內容的 etag：自己寫上去的內容，之後不必再下載回來
+        st = self.backend.write(name, data)
+        self.invalidate()
+        if st and st.get("etag") and name in self._load_state():
+            self._remember(name, st["etag"])
+        return st
+
+    # ---------- 條件式取得 ----------
+    def _load_state(self):
+        # 名稱 → 上次取得內容的 etag；每次從檔案讀，其他副本取得後的紀錄也看得到
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _remember(self, name, etag):
+        with self._lock:
+            state = self._load_state()
+            state[name] = etag
+            ipqc_shared.atomic_write(self.state_path, json.dumps(state, ensure_ascii=False).encode("utf-8"))
+
+    def fetch_changed(self, name):
+        # 來源檔與上次取得時不同才下載並回傳內容；沒變或不存在時回傳 None（沒有 etag 的後端每次都下載）
+        st = self.stat(name)
+        if st is None:
+            return None
+        with self._lock:
+            known = self._load_state().get(name)
+        if st["etag"] is not None and st["etag"] == known:
+            return None
+        data = self.read(name)
+        if st["etag"] is not None:
+            self._remember(name, st["etag"])
+        return data
+
+    def forget(self):
+        # 下載後處理失敗時清除紀錄，下一次全部重新取得
+        with self._lock:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+
+
+# ========== 部署設定 ==========
+class Deployment:
+    # source   資料檔來源（None 表示只由管理員上傳更新）；names 為來源中各種資料檔的檔名
+    # archive  匯出表單存放處（後台查詢從這裡列出）
+    # history  匯出表單另外上傳的位置（None 表示不上傳）
+    def __init__(self, mode, source, archive, history=None, names=None):
+        self.mode = mode
+        self.source = source
+        self.archive = archive
+        self.history = history
+        self.names = dict(ipqc_shared.DATA_FILES, **(names or {}))
+
+    @property
+    def archive_dir(self):
+        return self.archive.backend.root
+
+
+def deployment(get_secret=os.environ.get, mode=None):
+    mode = mode or os.environ.get("IPQC_STORAGE", "graph")
+    output = Storage(LocalBackend(ipqc_shared.path("output")))
+    if mode == "local":
+        return Deployment(mode, None, output)
+    if mode == "folder":
+        source_dir = os.environ.get("IPQC_SOURCE_DIR")
+        if not source_dir:
+            raise RuntimeError("IPQC_STORAGE=folder 需要設定 IPQC_SOURCE_DIR（OneDrive 同步資料夾）")
+        export_dir = os.environ.get("IPQC_EXPORT_DIR") or source_dir
+        return Deployment(mode, Storage(SyncFolderBackend(source_dir)), Storage(SyncFolderBackend(export_dir)))
+    if mode == "graph":
+        client = GraphClient(get_secret)
+        upload_folder = get_secret("upload_folder") or DEFAULT_UPLOAD_FOLDER
+        history_folder = get_secret("history_folder") or DEFAULT_HISTORY_FOLDER
+        # 來源中的檔名可用 inspection_filename / complaint_filename 指定
+        names = {kind: get_secret(f"{kind}_filename") for kind in ipqc_shared.DATA_FILES}
+        return Deployment(
+            mode,
+            Storage(GraphBackend(client, upload_folder, "公司 OneDrive（上傳資料夾）")),
+            output,
+            Storage(GraphBackend(client, history_folder, "公司 OneDrive（歷史資料）")),
+            {kind: name for kind, name in names.items() if name},
+        )
+    raise ValueError(f"未知的 IPQC_STORAGE：{mode}（可用 local / folder / graph）")
@@ -0,0 +1,176 @@
+# ========== 重跑分段計時 ==========
+# 每次重跑（整頁或單一 fragment）記錄一筆：session id、範圍、各階段耗時（毫秒）。
+# 紀錄保留最近若干筆在記憶體中供管理員面板計算百分位數，並以 JSON 一行一筆寫入輪替的記錄檔。
+# 預設關閉；關閉時 span() 直接回傳共用的空 context manager，幾乎沒有額外負擔。
+#   IPQC_TIMING            設為 1 啟用
+#   IPQC_TIMING_LOG        記錄檔路徑（預設 logs/timing.jsonl，留空則不寫檔）
+#   IPQC_TIMING_LOG_BYTES  單一記錄檔大小上限（預設 5 MB，保留 3 個舊檔）
+#   IPQC_TIMING_KEEP       記憶體中保留的重跑筆數（預設 2000）
+import collections
+import contextlib
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ENABLED = os.environ.get("IPQC_TIMING", "") not in ("", "0")
+WRITE_LOG = ENABLED   # 只由其他模組（例如監控指標）啟用計時時不寫記錄檔
+LOG_PATH = os.environ.get("IPQC_TIMING_LOG", "logs/timing.jsonl")
+LOG_BYTES = int(os.environ.get("IPQC_TIMING_LOG_BYTES", 5 * 1024 * 1024))
+LOG_BACKUPS = 3
+KEEP = int(os.environ.get("IPQC_TIMING_KEEP", 2000))
+
+_NULL = contextlib.nullcontext()
+_local = threading.local()   # 每個 session 的腳本在自己的執行緒中執行
+_lock = threading.Lock()
+_records = collections.deque(maxlen=KEEP)
+_listeners = []
+_logger = None
+
+
+class Rerun:
+    def __init__(self, session_id, scope):
+        self.session_id = session_id
+        self.scope = scope
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []   # [(階段, 毫秒)]，同名階段可出現多次
+
+    def to_dict(self):
+        return {
+            "time": datetime.fromtimestamp(self.started).isoformat(timespec="milliseconds"),
+            "session": self.session_id,
+            "scope": self.scope,
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "spans": [{"stage": name, "ms": round(ms, 3)} for name, ms in self.spans],
+        }
+
+
+# ---------- 重跑開始 / 結束 ----------
+def begin(session_id, scope="full"):
+    # 整頁重跑開始時呼叫；上一次未正常結束（例如發生例外）的紀錄先寫出
+    if not ENABLED:
+        return
+    end()
+    _local.rerun = Rerun(session_id, scope)
+
+
+def end():
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    record = rerun.to_dict()
+    with _lock:
+        _records.append(record)
+    _write(record)
+    for listener in _listeners:
+        listener(record)
+    return record
+
+
+def add_listener(fn):
+    # 每筆重跑紀錄完成時呼叫 fn(record)（例如累計監控指標）
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+# ---------- 階段 ----------
+class _Span:
+    __slots__ = ("rerun", "name", "t0")
+
+    def __init__(self, rerun, name):
+        self.rerun = rerun
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rerun.spans.append((self.name, (time.perf_counter() - self.t0) * 1000))
+        return False
+
+
+def span(name):
+    # with ipqc_timing.span("read_all_sheets"): ...
+    if not ENABLED:
+        return _NULL
+    rerun = getattr(_local, "rerun", None)
+    return _Span(rerun, name) if rerun is not None else _NULL
+
+
+def fragment(name, session_id=None):
+    # 套在 fragment 函式上（放在 @st.fragment 之下）：整頁重跑時是其中一個階段，
+    # 單獨重跑該 fragment 時（沒有進行中的整頁紀錄）自成一筆範圍為 fragment:名稱 的紀錄
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            if getattr(_local, "rerun", None) is not None:
+                with span(name):
+                    return fn(*args, **kwargs)
+            _local.rerun = Rerun(session_id() if callable(session_id) else session_id, f"fragment:{name}")
+            try:
+                with span(name):
+                    return fn(*args, **kwargs)
+            finally:
+                end()
+        return wrapper
+    return decorator
+
+
+# ---------- 記錄檔 ----------
+def _write(record):
+    global _logger
+    if not (WRITE_LOG and LOG_PATH):
+        return
+    if _logger is None:
+        with _lock:
+            if _logger is None:
+                os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    LOG_PATH, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("ipqc.timing")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                logger.addHandler(handler)
+                _logger = logger
+    _logger.info(json.dumps(record, ensure_ascii=False))
+
+
+# ---------- 統計 ----------
+def records():
+    with _lock:
+        return list(_records)
+
+
+def stage_stats(recs=None):
+    # 各範圍、各階段的次數與百分位數（毫秒）；同一次重跑中同名階段先加總
+    recs = records() if recs is None else recs
+    rows = []
+    for rec in recs:
+        totals = collections.defaultdict(float)
+        for s in rec["spans"]:
+            totals[s["stage"]] += s["ms"]
+        totals["（整體）"] = rec["total_ms"]
+        rows += [(rec["scope"], stage, ms) for stage, ms in totals.items()]
+    columns = ["範圍", "階段", "次數", "p50 (ms)", "p90 (ms)", "p99 (ms)", "最大 (ms)"]
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame(rows, columns=["範圍", "階段", "ms"])
+    out = []
+    for (scope, stage), group in frame.groupby(["範圍", "階段"], sort=False):
+        values = group["ms"].to_numpy()
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        out.append((scope, stage, len(values), p50, p90, p99, values.max()))
+    return pd.DataFrame(out, columns=columns).round(2)
@@ -0,0 +1,208 @@
+# ========== 資料集預先載入（背景暖身） ==========
+# 程序啟動時與資料檔變更後，在背景執行緒讀取所有分頁、清洗模組欄位並建立索引與機型 / 模組清單，
+# 完成後才切換成目前版本；切換前所有人繼續使用前一版，頁面重跑不會碰到冷的載入路徑。
+# 版本以兩個資料檔內容的 sha256 判斷（mtime / 大小沒變時沿用上次的雜湊），OneDrive 同步重寫相同內容不會重新載入。
+# 載入失敗時保留前一版並記錄錯誤，下一次檢查再試。
+# 快取指標（ipqc_cache_requests_total{cache="dataset"}）：直接取得已載入版本記為 hit，載入新版本（第一次或資料檔變更）記為 miss。
+# 多個副本共用資料夾時（SharedDatasetStore）改看共用的版本檔，載入該版本的資料夾，各副本因此收斂到同一版。
+#   IPQC_WARM_INTERVAL  檢查資料檔變更的間隔秒數（預設 5）
+# 直接執行本檔會先開始暖身再啟動頁面，連重啟後的第一位使用者也不必等待：
+#   python ipqc_warm.py [streamlit run 的其他參數，例如 --server.port 8501]
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import ipqc_data
+import ipqc_memory
+import ipqc_metrics
+import ipqc_shared
+
+WARM_INTERVAL = float(os.environ.get("IPQC_WARM_INTERVAL", 5))
+CACHE_NAME = "dataset"
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DatasetStore:
+    def __init__(self, inspection_path=ipqc_data.INSPECTION_PATH, complaint_path=ipqc_data.COMPLAINT_PATH,
+                 interval=WARM_INTERVAL):
+        self.paths = (inspection_path, complaint_path)
+        self.interval = interval
+        self._lock = threading.Lock()        # 保護目前版本與狀態
+        self._load_lock = threading.Lock()   # 同時間只做一次檢查 / 載入
+        self._loaded = threading.Event()     # 第一個版本完成（成功或失敗）
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {}                     # 路徑 → (mtime_ns, 大小, sha256)
+        self._dataset = None
+        self._version = None
+        self.state = "idle"                  # idle / warming / ready / error
+        self.error = None
+        self.loaded_at = None
+        self.duration_s = None
+        self.loads = 0
+
+    # ---------- 啟動 / 觸發 ----------
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ipqc-warm", daemon=True)
+                self._thread.start()
+        return self
+
+    def refresh(self, wait=False):
+        # 資料檔剛更新時呼叫：wait=True 在呼叫端直接檢查並載入（例如管理員上傳後），否則交給背景執行緒
+        if wait:
+            self._check()
+        else:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._check()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ---------- 目前版本 ----------
+    def get(self, timeout=None):
+        # 回傳目前的 Dataset；第一個版本尚未完成時等待（程序剛啟動，載入本身記為 miss）
+        dataset = self._dataset
+        if dataset is None:
+            self.start()
+            self._loaded.wait(timeout)
+            return self._dataset
+        ipqc_metrics.CACHE_REQUESTS.inc(cache=CACHE_NAME, result="hit")
+        return dataset
+
+    @property
+    def version(self):
+        return self._version
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "version": self._version,
+                "error": self.error,
+                "loaded_at": self.loaded_at,
+                "duration_s": self.duration_s,
+                "loads": self.loads,
+            }
+
+    # ---------- 檢查與載入 ----------
+    def _source(self):
+        # 回傳（版本, 要載入的（點檢, 客訴）路徑）
+        return self._fingerprint(), self.paths
+
+    def _fingerprint(self):
+        version = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                version.append(None)
+                continue
+            cached = self._stats.get(path)
+            if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+                cached = (st.st_mtime_ns, st.st_size, file_digest(path))
+                self._stats[path] = cached
+            version.append(cached[2])
+        return tuple(version)
+
+    def _check(self):
+        with self._load_lock:
+            try:
+                version, paths = self._source()
+                if version == self._version and self._dataset is not None:
+                    return
+                with self._lock:
+                    self.state = "warming"
+                t0 = time.perf_counter()
+                with ipqc_memory.stage("warmup"):
+                    dataset = ipqc_data.load_dataset(*paths)
+                    dataset.warm()
+                # 載入期間檔案又被改寫：以新內容的版本為準，下一次檢查再載入
+                if self._source()[0] != version:
+                    self._wake.set()
+                seconds = time.perf_counter() - t0
+            except Exception as e:
+                ipqc_metrics.WARMUPS.inc(result="error")
+                with self._lock:
+                    self.state = "error" if self._dataset is None else "ready"
+                    self.error = f"{datetime.now():%H:%M:%S} {type(e).__name__}: {e}"
+                self._loaded.set()
+                return
+            ipqc_metrics.WARMUPS.inc(result="ok")
+            ipqc_metrics.CACHE_REQUESTS.inc(cache=CACHE_NAME, result="miss")
+            ipqc_metrics.WARMUP_SECONDS.observe(seconds)
+            with self._lock:
+                self._dataset, self._version = dataset, version
+                self.state = "ready"
+                self.error = None
+                self.loaded_at = datetime.now().isoformat(timespec="seconds")
+                self.duration_s = round(seconds, 3)
+                self.loads += 1
+            self._loaded.set()
+
+
+class SharedDatasetStore(DatasetStore):
+    # 版本以共用版本檔中兩個資料檔的 sha256 表示（與 DatasetStore 相同），只讀版本檔、不必對資料檔計算雜湊；
+    # 版本資料夾發佈後不再改變，載入期間不會讀到另一個副本正在寫入的檔案
+    def __init__(self, versions=None, interval=WARM_INTERVAL):
+        self.versions = versions or ipqc_shared.DatasetVersions()
+        super().__init__(*self.versions.mirror_paths(), interval=interval)
+
+    def _source(self):
+        manifest = self.versions.adopt()
+        if manifest is None:
+            return super()._source()   # 還沒有任何資料檔
+        files = manifest["files"]
+        version = tuple(files[kind]["sha256"] if kind in files else None for kind in ipqc_shared.DATA_FILES)
+        return version, self.versions.dataset_paths(manifest)
+
+
+# ========== 程序共用的資料集 ==========
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store(inspection_path=ipqc_data.INSPECTION_PATH, complaint_path=ipqc_data.COMPLAINT_PATH):
+    # 同一組資料檔在程序中只有一個（已啟動背景暖身的）DatasetStore
+    key = (os.path.abspath(inspection_path), os.path.abspath(complaint_path))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = DatasetStore(inspection_path, complaint_path).start()
+        return _stores[key]
+
+
+def shared_store(root=None):
+    # 頁面使用：共用資料夾的版本檔在程序中只有一個監看中的 SharedDatasetStore
+    key = ("shared", os.path.abspath(root or ipqc_shared.SHARED_DIR))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = SharedDatasetStore(ipqc_shared.DatasetVersions(root)).start()
+        return _stores[key]
+
+
+def main(argv=None):
+    # 先開始暖身，再在同一個程序中啟動 streamlit；以模組名稱匯入（直接執行時本檔是 __main__），
+    # 頁面 import ipqc_warm 時才會取得同一個 SharedDatasetStore
+    argv = sys.argv[1:] if argv is None else argv
+    import ipqc_warm
+    ipqc_warm.shared_store()
+    from streamlit.web import cli
+    sys.argv = ["streamlit", "run", os.path.join(os.path.dirname(os.path.abspath(__file__)), "try.py")] + argv
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
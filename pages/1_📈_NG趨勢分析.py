@@ -0,0 +1,103 @@
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+import ipqc_results
+
+# ========== NG 趨勢分析（判定結果資料庫的彙總表） ==========
+# 每次匯出填寫版表單時已在同一個交易中累加日 / 週 / 月 / 年彙總，這一頁只查彙總表：
+# 期間 NG 異常率排行、NG 率最高幾組的趨勢。查詢結果以資料庫最後一次匯出的 id 快取，有新匯出才重查。
+st.set_page_config(page_title="三和 IPQC NG 趨勢分析", layout="wide")
+st.title("📈 NG 趨勢分析")
+
+results = ipqc_results.store()
+
+PERIOD_LABELS = {"day": "日", "week": "週", "month": "月"}
+DIMENSION_LABELS = {"model": "機型", "module": "模組", "item": "項目", "inspector": "點檢人員"}
+COLUMN_LABELS = {"model": "機型", "module": "模組", "item": "項目", "inspector": "點檢人員", "rows": "筆數",
+                 "valid": "有效總數", "ok": "OK", "ng": "異常數", "na": "N/A", "ng_rate": "NG 異常率(%)"}
+
+
+# ---------- 查詢（依資料版本快取） ----------
+@st.cache_data(show_spinner=False, max_entries=64)
+def query(version, method, **kwargs):
+    t0 = time.perf_counter()
+    df = getattr(results, method)(**kwargs)
+    return df, (time.perf_counter() - t0) * 1000
+
+
+@st.cache_data(show_spinner=False)
+def choices(version, column, model=None):
+    return results.choices(column, model)
+
+
+def series_label(row, columns):
+    return " / ".join(str(row[c]) or "（未填）" for c in columns)
+
+
+version = results.version()
+bounds = results.date_range()
+if bounds is None:
+    st.info("尚無判定結果：匯出填寫好判定結果的表單後，這裡會顯示 NG 異常率排行與趨勢。")
+    st.stop()
+
+first_day, last_day = date.fromisoformat(bounds[0]), date.fromisoformat(bounds[1])
+
+# ---------- 篩選 ----------
+with st.sidebar:
+    st.header("🔎 篩選條件")
+    default_start = max(first_day, last_day - timedelta(weeks=12))
+    picked = st.date_input("期間：", [default_start, last_day], min_value=first_day, max_value=last_day,
+                           key="ng_date_range")
+    if isinstance(picked, (list, tuple)) and len(picked) == 2:
+        start, end = picked
+    else:   # 只選了起日
+        start, end = (picked[0] if isinstance(picked, (list, tuple)) else picked), last_day
+    period = st.radio("趨勢期間：", list(PERIOD_LABELS), index=1, format_func=PERIOD_LABELS.get, horizontal=True)
+    by = st.selectbox("分組：", list(DIMENSION_LABELS), index=1, format_func=DIMENSION_LABELS.get)
+    models = st.multiselect("機型：", choices(version, "model"), placeholder="全部機型")
+    modules = st.multiselect("模組：", choices(version, "module", models or None), placeholder="全部模組")
+    top_n = st.slider("趨勢顯示 NG 率最高的前幾組：", 1, 20, 8)
+    min_valid = st.number_input("排行最少有效筆數：", min_value=0, value=10, step=5)
+
+filters = dict(model=models or None, modules=modules or None, start=str(start), end=str(end))
+ranking, ranking_ms = query(version, "ng_rates", by=by, min_valid=int(min_valid), **filters)
+totals, totals_ms = query(version, "ng_rates", by="model", **filters)
+
+# ---------- 摘要 ----------
+valid, ng = int(totals["valid"].sum()), int(totals["ng"].sum())
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("有效總數", f"{valid:,}")
+col2.metric("異常數", f"{ng:,}")
+col3.metric("NG 異常率", f"{ng / valid * 100:.2f}%" if valid else "-")
+col4.metric("匯出張數", f"{results.query('SELECT COUNT(*) AS n FROM exports')['n'][0]:,}")
+
+if totals.empty:
+    st.warning("這個期間與篩選條件沒有判定結果。")
+    st.stop()
+if ranking.empty:
+    st.warning(f"沒有有效筆數達 {int(min_valid)} 筆的{DIMENSION_LABELS[by]}，請調低「排行最少有效筆數」或放寬期間。")
+    st.stop()
+
+# ---------- 趨勢 ----------
+_, columns = ipqc_results.DIMENSIONS[by]
+top = ranking.head(top_n)
+keys = [tuple(row) for row in top[columns].itertuples(index=False)]
+trend, trend_ms = query(version, "trend", by=by, period=period, keys=keys, **filters)
+
+st.subheader(f"NG 異常率趨勢（每{PERIOD_LABELS[period]}，{DIMENSION_LABELS[by]} NG 率前 {len(keys)} 名）")
+if trend.empty:
+    st.info("沒有趨勢資料。")
+else:
+    trend = trend.assign(series=trend.apply(series_label, axis=1, columns=columns))
+    chart = trend.pivot_table(index="period", columns="series", values="ng_rate")
+    chart.index = pd.to_datetime(chart.index)
+    st.line_chart(chart, y_label="NG 異常率(%)")
+
+# ---------- 排行 ----------
+st.subheader(f"期間 NG 異常率排行（{DIMENSION_LABELS[by]}，有效筆數 ≥ {int(min_valid)}）")
+st.dataframe(ranking.rename(columns=COLUMN_LABELS), use_container_width=True, hide_index=True)
+st.caption(f"資料期間 {bounds[0]} ~ {bounds[1]}；查詢時間：排行 {ranking_ms:.0f} ms、摘要 {totals_ms:.0f} ms、"
+           f"趨勢 {trend_ms:.0f} ms（快取命中時為第一次查詢的時間）")
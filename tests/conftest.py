@@ -0,0 +1,34 @@
+# ========== 測試共用設定 ==========
+# 共用資料夾（版本、鎖、結果資料庫、輸出檔）指到暫存資料夾，並複製一份資料檔，測試不會動到專案目錄；
+# 必須在匯入任何 ipqc_* 模組之前設定（路徑在匯入時決定）。部署模式固定為 local，不連 OneDrive。
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_DIR = tempfile.mkdtemp(prefix="ipqc-test-")
+shutil.copytree(os.path.join(ROOT, "data"), os.path.join(SHARED_DIR, "data"),
+                ignore=shutil.ignore_patterns("versions", "CURRENT.json"))
+os.environ["IPQC_SHARED_DIR"] = SHARED_DIR
+os.environ["IPQC_STORAGE"] = "local"
+os.environ.pop("IPQC_BLOB_DIR", None)
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SHARED_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def pool():
+    # 小型項目池：2 個必出現、客訴 / 一般各半、兩個來源分頁
+    return pd.DataFrame({
+        "項目": [f"項目{i}" for i in range(12)],
+        "重要性": [1, 1, 0.8, 0.6, 0.5, 0.3, 0.2, 0.1, 0, 0, "", None],
+        "客訴編號": ["CC01", "", "CC02", "", "CC03", "", "CC04", "", "CC05", "", "CC06", ""],
+        "來源分頁": ["A"] * 6 + ["B"] * 6,
+    })
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+import pytest
+
+import ipqc_api
+import ipqc_export
+import ipqc_results
+import ipqc_shared
+
+
+@pytest.fixture(scope="module")
+def api():
+    server = ipqc_api.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    dataset = server.cache.get()
+    yield f"http://127.0.0.1:{server.server_port}", dataset.models()[0]
+    server.shutdown()
+    server.server_close()
+
+
+def request(base, path, body=None, raw=None):
+    data = raw if raw is not None else (json.dumps(body).encode("utf-8") if body is not None else None)
+    req = urllib.request.Request(base + path, data, {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as r:
+            payload = r.read()
+            status, content_type = r.status, r.headers["Content-Type"]
+    except urllib.error.HTTPError as e:
+        payload, status, content_type = e.read(), e.code, e.headers["Content-Type"]
+    return status, json.loads(payload) if content_type.startswith("application/json") else payload
+
+
+# ---------- /sample ----------
+def test_sample_is_reproducible(api):
+    base, model = api
+    status, first = request(base, "/sample", {"model": model, "count": 4, "seed": 9})
+    assert status == 200 and first["seed"] == 9 and first["count"] == 4
+    assert request(base, "/sample", {"model": model, "count": 4, "seed": 9})[1]["items"] == first["items"]
+    status, generated = request(base, "/sample", {"model": model, "count": 2})
+    assert status == 200 and generated["seed"] >= 0
+
+
+@pytest.mark.parametrize("body", [
+    {"count": "x"}, {"count": 0}, {"seed": -1}, {"seed": "abc"},
+    {"floor": "nan"}, {"floor": "inf"}, {"floor": -0.1}, {"strata": ["color"]},
+    {"strata": [["kind"]]}, {"strata": [{"a": 1}]}, {"strata": 5}, {"modules": 5}, {"modules": [["600"]]},
+    {"count": [1]}, {"seed": {"a": 1}},
+])
+def test_sample_rejects_bad_input(api, body):
+    base, model = api
+    status, payload = request(base, "/sample", dict(model=model, **body))
+    assert status == 400 and payload["error"]
+
+
+def test_sample_zero_floor_is_allowed(api):
+    base, model = api
+    assert request(base, "/sample", {"model": model, "count": 3, "floor": 0})[0] == 200
+
+
+def test_sample_model_errors(api):
+    base, _ = api
+    assert request(base, "/sample", {})[0] == 400
+    assert request(base, "/sample", {"model": "沒有這個機型"})[0] == 404
+    assert request(base, "/sample", raw=b"{not json")[0] == 400
+    assert request(base, "/sample", raw=b"[1, 2]")[0] == 400
+    assert request(base, "/sample", {"model": ["a"]})[0] == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length(api, length):
+    base, model = api
+    body = json.dumps({"model": model}).encode("utf-8")
+    req = urllib.request.Request(base + "/sample", body, {"Content-Type": "application/json", "Content-Length": length})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(req)
+    assert e.value.code == 400 and json.load(e.value)["error"]
+
+
+# ---------- /export ----------
+@pytest.mark.parametrize("body", [
+    {"items": "oops"}, {"items": []}, {"items": [1, 2]}, {"items": [{"項目": "x"}]},
+    {"items": "sample", "seed": "abc"}, {"items": "sample", "seed": -1},
+])
+def test_export_rejects_bad_items_and_seed(api, body):
+    base, model = api
+    if body["items"] == "sample":
+        body = dict(body, items=request(base, "/sample", {"model": model, "count": 2, "seed": 1})[1]["items"])
+    status, payload = request(base, "/export", dict(model=model, **body))
+    assert status == 400 and payload["error"]
+
+
+def test_export_items_round_trip_and_record(api):
+    base, model = api
+    items = request(base, "/sample", {"model": model, "count": 3, "seed": 3})[1]["items"]
+    for item in items:
+        item["判定結果"] = "NG" if item is items[0] else "OK"
+    status, data = request(base, "/export", {"model": model, "items": items, "seed": "3", "checker": "王"})
+    assert status == 200 and isinstance(data, bytes)
+    parsed = ipqc_export.parse_export(data)
+    assert parsed["model"] == model and parsed["seed"] == 3 and parsed["checker"] == "王"
+    exports = ipqc_results.store().exports(1)
+    assert exports.loc[0, "source"] == "api" and exports.loc[0, "seed"] == 3
+    assert os.path.exists(ipqc_shared.path("output", exports.loc[0, "file"]))
+
+
+def test_export_survives_results_db_failure(api, monkeypatch):
+    base, model = api
+    monkeypatch.setattr(ipqc_results, "_store", ipqc_results.ResultsStore("/proc/nonexistent/results.sqlite"))
+    items = request(base, "/sample", {"model": model, "count": 2, "seed": 5})[1]["items"]
+    items[0]["判定結果"] = "OK"
+    status, data = request(base, "/export", {"model": model, "items": items})
+    assert status == 200 and isinstance(data, bytes)
+
+
+def test_unexpected_error_is_500(api, monkeypatch):
+    base, model = api
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(ipqc_export, "export_form", broken)
+    status, payload = request(base, "/export", {"model": model, "count": 2, "seed": 1})
+    assert status == 500 and payload == {"error": "boom"}
+
+
+# ---------- 其他路徑 ----------
+def test_search_and_unknown_paths(api):
+    base, _ = api
+    assert request(base, "/search")[0] == 400
+    for limit in ["x", "0", "-1"]:
+        assert request(base, f"/search?q=a&limit={limit}")[0] == 400
+    status, payload = request(base, "/search?q=a&limit=1")
+    assert status == 200 and len(payload["hits"]) <= 1
+    assert request(base, "/search?q=a&kind=other")[0] == 400
+    assert request(base, "/nowhere")[0] == 404
+    assert request(base, f"/models/{quote('沒有這個機型')}/modules")[0] == 404
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import ipqc_backfill
+import ipqc_export
+import ipqc_results
+
+
+def form(results):
+    return pd.DataFrame({"項次": range(1, len(results) + 1), "項目": [f"項目{i}" for i in range(len(results))],
+                         "規範": "", "方法": "目視", "重要性": 0.5, "客訴編號": "", "判定結果": results})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ipqc_results.ResultsStore(str(tmp_path / "results.sqlite"))
+
+
+def write(folder, name, data):
+    folder.mkdir(exist_ok=True)
+    (folder / name).write_bytes(data)
+
+
+def backfill(store, *folders):
+    return ipqc_backfill.run(ipqc_backfill.sources([str(f) for f in folders]), store, workers=1)
+
+
+def statuses(store):
+    return store.query("SELECT name, status, export_id, detail FROM indexed_files ORDER BY location, name")
+
+
+def test_duplicate_of_unparseable_file_keeps_the_error(store, tmp_path):
+    for folder in ("a", "b"):
+        write(tmp_path / folder, "FR301_600_20240501_IPQC填寫版.xlsx", b"not a workbook")
+    counts = backfill(store, tmp_path / "a", tmp_path / "b")
+    assert counts["error"] == 2 and counts["known"] == 0
+    rows = statuses(store)
+    assert rows["status"].tolist() == ["error", "error"] and rows["detail"].notna().all()
+    assert ipqc_backfill.summary(counts)["無法解析"] == 2
+    # 無法解析的檔案每次重跑都再試
+    assert backfill(store, tmp_path / "a", tmp_path / "b")["error"] == 2
+
+
+def test_duplicate_copies_are_recorded_once(store, tmp_path):
+    data = ipqc_export.export_form(form(["OK", "NG"]), "FR301", ["600"], mode="build", check_time="2024-05-01 08:00")
+    blank = ipqc_export.export_form(form(["", ""]), "FR301", ["1000"], mode="build")
+    for folder in ("a", "b"):
+        write(tmp_path / folder, "FR301_600_20240501_IPQC填寫版.xlsx", data)
+        write(tmp_path / folder, "FR301_1000_20240501_IPQC填寫版.xlsx", blank)
+    counts = backfill(store, tmp_path / "a", tmp_path / "b")
+    assert (counts["indexed"], counts["known"], counts["blank"]) == (1, 1, 2)
+    rows = statuses(store)
+    assert rows.loc[rows["status"] != "blank", "export_id"].nunique() == 1
+    assert len(store.results()) == 2
+    # 再跑一次：etag 沒變的全部略過
+    assert backfill(store, tmp_path / "a", tmp_path / "b")["unchanged"] == 4
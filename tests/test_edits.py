@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ipqc_edits
+
+
+@pytest.fixture
+def base():
+    return pd.DataFrame({"項目": ["a", "b", "c", "d"], "重要性": [1.0, 0.5, 1.0, 0.2], "備註": ["", "", "", ""]})
+
+
+# ---------- 套用編輯紀錄 ----------
+def test_apply_log_order(base):
+    # 修改 → 刪除 → 新增；位置 >= 基底筆數的修改 / 刪除作用在新增列
+    frame = ipqc_edits._apply_log(
+        base,
+        {0: {"備註": "x"}, 4: {"重要性": 1}, 5: {"項目": "gone"}},
+        [{"項目": "e", "重要性": 0}, {"項目": "f"}],
+        [1, 5],
+    )
+    assert frame["項目"].tolist() == ["a", "c", "d", "e"]
+    assert frame.loc[0, "備註"] == "x"
+    assert frame.loc[3, "重要性"] == 1
+    assert frame.index.tolist() == [0, 1, 2, 3]
+
+
+def test_apply_log_keeps_base_and_widens_dtype(base):
+    frame = ipqc_edits._apply_log(base, {1: {"重要性": "高"}, 2: {"重要性": None}}, [], [])
+    assert frame.loc[1, "重要性"] == "高" and frame["重要性"].dtype == object
+    assert pd.isna(frame.loc[2, "重要性"])
+    assert base["重要性"].tolist() == [1.0, 0.5, 1.0, 0.2]
+
+
+def test_frame_matches_importance_counts(base):
+    grid = ipqc_edits.EditedFrame(base)
+    assert grid.importance_counts() == (4, 2)
+    grid.sync({"edited_rows": {"1": {"重要性": 2}, "0": {"備註": "x"}},
+               "added_rows": [{"項目": "e", "重要性": 1}, {"項目": "f", "重要性": 0}],
+               "deleted_rows": [2]})
+    frame = grid.frame()
+    assert len(grid) == len(frame) == 5
+    assert grid.importance_counts() == (5, int((pd.to_numeric(frame["重要性"]) >= 1).sum())) == (5, 3)
+    assert grid.edit_count == 5
+
+
+def test_sync_bumps_version_only_on_change(base):
+    grid = ipqc_edits.EditedFrame(base)
+    state = {"edited_rows": {"0": {"備註": "x"}}, "added_rows": [], "deleted_rows": []}
+    grid.sync(state)
+    version = grid.version
+    grid.sync(state)
+    assert grid.version == version
+    grid.sync(None)
+    assert grid.version == version + 1 and grid.edit_count == 0
+
+
+# ---------- 分頁編輯 ----------
+def test_commit_folds_edits_into_added_rows(base):
+    grid = ipqc_edits.EditedFrame(base)
+    grid.sync({"edited_rows": {"4": {"重要性": 1}, "0": {"備註": "x"}}, "added_rows": [{"項目": "e"}]})
+    before = grid.frame()
+    grid.commit()
+    assert grid.edited_rows == {0: {"備註": "x"}}
+    assert grid.added_rows == [{"項目": "e", "重要性": 1}]
+    assert grid.commits == 1
+    pd.testing.assert_frame_equal(grid.frame(), before)
+
+
+def test_sync_page_maps_positions(base):
+    grid = ipqc_edits.EditedFrame(base)
+    positions, page, total = grid.window(sort_by="重要性", ascending=False, page=1, page_size=2)
+    assert total == 4 and page["項目"].tolist() == ["a", "c"]
+    grid.sync_page(positions, {"edited_rows": {"1": {"備註": "page"}}, "deleted_rows": [0]})
+    frame = grid.frame()
+    assert frame["項目"].tolist() == ["b", "c", "d"]
+    assert frame.loc[frame["項目"] == "c", "備註"].item() == "page"
+
+    # 換頁：先確認目前的編輯（刪除後剩 c、b、d），第二頁的編輯併入同一份紀錄
+    positions, page, total = grid.window(sort_by="重要性", ascending=False, page=2, page_size=2)
+    assert total == 3 and page["項目"].tolist() == ["d"]
+    grid.sync_page(positions, {"edited_rows": {"0": {"重要性": 1}}, "added_rows": [{"項目": "e", "重要性": 1}]})
+    frame = grid.frame()
+    assert frame["項目"].tolist() == ["b", "c", "d", "e"]
+    assert grid.importance_counts() == (4, 3)
+
+
+def test_window_filters_on_committed_values(base):
+    grid = ipqc_edits.EditedFrame(base)
+    grid.sync_page(np.arange(4), {"edited_rows": {"3": {"備註": "刮傷"}}})
+    positions, page, total = grid.window(query="刮傷")
+    assert positions.tolist() == [3] and total == 1 and page["項目"].tolist() == ["d"]
+    assert grid.rows([3, 0])["項目"].tolist() == ["d", "a"]
+
+
+def test_append_adds_rows_and_resets_window(base):
+    grid = ipqc_edits.EditedFrame(base)
+    grid.window()
+    grid.append([{"項目": "z", "重要性": 1}])
+    assert grid.frame()["項目"].tolist()[-1] == "z"
+    positions, page, total = grid.window()
+    assert total == 5 and page["項目"].tolist()[-1] == "z"
+
+
+def test_pool_counts(base):
+    one = ipqc_edits.EditedFrame(base)
+    two = ipqc_edits.EditedFrame(base.iloc[:2]).sync({"deleted_rows": [0]})
+    assert ipqc_edits.pool_counts(one, two) == (5, 2)
+
+
+def test_editor_key_is_stable():
+    assert ipqc_edits.editor_key("grid", ("FR301", "600")) == ipqc_edits.editor_key("grid", ("FR301", "600"))
+    assert ipqc_edits.editor_key("grid", ("FR301", "600")) != ipqc_edits.editor_key("grid", ("FR301", "1000"))
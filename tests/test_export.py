@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import ipqc_export
+
+
+@pytest.fixture
+def form():
+    return pd.DataFrame({
+        "項次": [1, 2, 3, 4],
+        "項目": ["確認外觀", "👇 以下為客訴相關項目 👇", "鎖附扭力", "接頭 <確認> & 標籤"],
+        "規範": ["無刮傷", "", "5 N·m", ""],
+        "方法": ["目視", "", "扭力計", "目視"],
+        "重要性": [1, "", 0.5, 0.2],
+        "客訴編號": ["", "", "CC2401-001", ""],
+        "判定結果": ["OK", "", "NG", ""],
+    })
+
+
+HEADER = dict(project_no="P-01", check_time="2024-05-01 08:30", supervisor="陳", checkedby="林", checker="王", seed=123)
+
+MODES = [
+    ("build", {"mode": "build"}),
+    ("template", {"mode": "template", "fast": False}),
+    ("xml", {"mode": "template", "fast": True}),
+]
+
+
+def export(form, mode, options):
+    if mode == "build":
+        return ipqc_export.export_form(form, "FR301", ["600", "1000"], **HEADER)
+    return ipqc_export.export_ipqc_template_xlsx(form, "FR301", ["600", "1000"], fast=options["fast"], **HEADER)
+
+
+@pytest.mark.parametrize("mode,options", MODES, ids=[m for m, _ in MODES])
+def test_parse_export_round_trip(form, mode, options):
+    parsed = ipqc_export.parse_export(export(form, mode, options))
+    assert parsed["model"] == "FR301" and parsed["modules"] == ["600", "1000"]
+    assert {k: parsed[k] for k in ("project_no", "check_time", "supervisor", "checkedby", "checker", "seed")} == HEADER
+    expected = ipqc_export.form_rows(form)
+    assert parsed["form"]["項目"].tolist() == expected["項目"].tolist()
+    assert parsed["form"]["項次"].tolist() == [1, 2, 3]
+    assert parsed["form"]["判定結果"].tolist() == ["OK", "NG", ""]
+    assert parsed["form"]["客訴編號"].tolist() == ["", "CC2401-001", ""]
+    assert pd.to_numeric(parsed["form"]["重要性"]).tolist() == [1, 0.5, 0.2]
+    assert parsed["stats"] == {"NG 異常率": 50.0, "異常數": 1, "有效總數": 2}
+
+
+def test_parse_export_without_seed(form):
+    data = ipqc_export.export_form(form, "FR301", ["600"], mode="build")
+    parsed = ipqc_export.parse_export(data)
+    assert parsed["seed"] is None and parsed["checker"] == "" and parsed["modules"] == ["600"]
+
+
+def test_parse_export_rejects_other_files():
+    with pytest.raises(ipqc_export.FormLayoutError):
+        ipqc_export.parse_export(b"not a workbook")
+    other = ipqc_export.workbook_bytes(ipqc_export.Workbook())
+    with pytest.raises(ipqc_export.FormLayoutError):
+        ipqc_export.parse_export(other)
+
+
+def test_filename_date():
+    name = ipqc_export.export_filename("FR301", ["600", "1000"], datetime(2024, 5, 1))
+    assert name == "FR301_600_1000_20240501_IPQC填寫版.xlsx"
+    assert ipqc_export.filename_date(name) == datetime(2024, 5, 1)
+    assert ipqc_export.filename_date("FR301_20241399_IPQC填寫版.xlsx") is None
+    assert ipqc_export.filename_date("other.xlsx") is None
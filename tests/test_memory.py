@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+import ipqc_memory
+
+
+@pytest.fixture
+def profiling():
+    ipqc_memory.clear()
+    ipqc_memory.enable()
+    yield
+    ipqc_memory.enable(False)
+    ipqc_memory.clear()
+
+
+def test_stage_records_when_enabled(profiling):
+    with ipqc_memory.stage("sample", "s1"):
+        data = [bytearray(1024) for _ in range(100)]
+    assert len(data) == 100
+    (record,) = ipqc_memory.records()
+    assert record["stage"] == "sample" and record["session"] == "s1"
+    assert record["traced_diff_mb"] >= 0.05
+    assert list(ipqc_memory.summary().columns)[:3] == ["time", "session", "stage"]
+
+
+def test_disabled_is_a_no_op():
+    assert not ipqc_memory.enabled()
+    with ipqc_memory.stage("export"):
+        pass
+    assert ipqc_memory.records() == []
+
+
+def test_turning_off_during_stage_does_not_raise(profiling):
+    with ipqc_memory.stage("export"):
+        ipqc_memory.enable(False)
+        result = "done"
+    assert result == "done" and ipqc_memory.records() == []
+
+
+def test_errors_inside_stage_propagate(profiling):
+    with pytest.raises(KeyError):
+        with ipqc_memory.stage("export"):
+            raise KeyError("x")
+
+
+def test_stages_run_concurrently(profiling):
+    # 兩個階段同時進行：彼此不必等待對方結束
+    inside = threading.Barrier(2, timeout=5)
+    errors = []
+
+    def work(name):
+        with ipqc_memory.stage(name):
+            try:
+                inside.wait()
+            except threading.BrokenBarrierError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(f"s{i}",)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert errors == []
+    assert sorted(r["stage"] for r in ipqc_memory.records()) == ["s0", "s1"]
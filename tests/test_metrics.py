@@ -0,0 +1,18 @@
+import ipqc_metrics
+import ipqc_shared
+
+
+def test_dataset_version_follows_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(ipqc_shared, "SHARED_DIR", str(tmp_path))
+    assert "ipqc_dataset_version_info{" not in ipqc_metrics.render()
+
+    versions = ipqc_shared.DatasetVersions()
+    first = versions.publish({"inspection": b"a", "complaint": b"b"}, source="test")
+    text = ipqc_metrics.render()
+    assert f'ipqc_dataset_version_info{{version="{first["version"]}"}} 1' in text
+    sha = first["files"]["inspection"]["sha256"][:12]
+    assert f'ipqc_dataset_version_timestamp_seconds{{dataset="inspection",sha256="{sha}"}}' in text
+
+    second = versions.publish({"complaint": b"c"}, source="test")
+    text = ipqc_metrics.render()
+    assert f'version="{second["version"]}"' in text and f'version="{first["version"]}"' not in text
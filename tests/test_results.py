@@ -0,0 +1,182 @@
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import ipqc_data
+import ipqc_results
+
+
+def make_form(results, items=None):
+    items = items or [f"項目{i}" for i in range(len(results))]
+    return pd.DataFrame({
+        "項次": range(1, len(results) + 1), "項目": items, "規範": "規範", "方法": "目視",
+        "重要性": 0.5, "客訴編號": "", "判定結果": results,
+    })[ipqc_data.FORM_COLUMNS]
+
+
+def days_ago(n):
+    return (date.today() - timedelta(days=n)).isoformat() + " 09:00"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ipqc_results.ResultsStore(str(tmp_path / "results.sqlite"))
+
+
+def rollup(store, name, grain="day"):
+    table = ipqc_results.rollup_table(name, grain)
+    return store.query(f"SELECT day, key_id, rows, valid, ok, ng, na FROM {table} ORDER BY day, key_id")
+
+
+# ---------- 寫入 ----------
+def test_blank_form_is_not_recorded(store):
+    assert store.record(make_form(["", ""]), "FR301", ["600"]) is None
+    assert store.version() is None
+
+
+def test_record_rows_and_separator(store):
+    form = make_form(["OK", "NG", "", "N/A"], ["a", "b", ipqc_data.SEPARATOR_ITEM, "c"])
+    export_id = store.record(form, "FR301", ["600"], checker="王", check_time=days_ago(3), seed=7)
+    assert export_id == store.version() == 1
+    results = store.results(model="FR301")
+    assert results["item"].tolist() == ["a", "b", "c"]
+    assert results["module"].eq("600").all() and results["inspector"].eq("王").all()
+    assert results["checked_date"].eq(days_ago(3)[:10]).all()
+    exports = store.exports()
+    assert exports.loc[0, "seed"] == 7 and exports.loc[0, "modules"] == "600"
+
+
+def test_row_modules_override_fallback(store):
+    store.record(make_form(["OK", "NG"]), "FR301", ["600", "1000"], row_modules=["600", "1000"])
+    store.record(make_form(["OK"]), "FR301", ["600", "1000"])
+    assert store.results()["module"].tolist() == ["600", "1000", ""]
+
+
+def test_rollups_match_results(store):
+    for n, results in enumerate([["OK", "NG", "OK"], ["NG", "N/A", ""], ["OK", "OK", "NG"]]):
+        store.record(make_form(results), "FR301", ["600"], check_time=days_ago(40 * n))
+    rates = store.ng_rates(by="item", model="FR301")
+    raw = store.results(model="FR301")
+    expected = raw.groupby("item")["result"].agg(
+        rows="size", valid=lambda r: (r != "").sum(), ng=lambda r: (r == "NG").sum())
+    got = rates.set_index("item")[["rows", "valid", "ng"]].sort_index()
+    assert (got.to_numpy() == expected.sort_index().to_numpy()).all()
+    # 各粒度加總一致
+    totals = {g: tuple(rollup(store, "rollup_module", g)[["rows", "valid", "ok", "ng", "na"]].sum()) for g in ipqc_results.GRAINS}
+    assert len(set(totals.values())) == 1 and totals["day"] == (9, 8, 4, 3, 1)
+
+
+def test_rebuild_rollups_matches_incremental(store):
+    for n in range(5):
+        store.record(make_form(["OK", "NG"] if n % 2 else ["NG", ""]), "FR301", ["600"], check_time=days_ago(n * 17))
+    before = {(name, g): rollup(store, name, g) for name in ipqc_results.ROLLUPS for g in ipqc_results.GRAINS}
+    store.rebuild_rollups()
+    for key, frame in before.items():
+        pd.testing.assert_frame_equal(rollup(store, *key), frame)
+
+
+def test_trend_and_ranges(store):
+    store.record(make_form(["NG", "OK"]), "FR301", ["600"], check_time="2024-01-31 10:00")
+    store.record(make_form(["OK", "OK"]), "FR301", ["600"], check_time="2024-02-01 10:00")
+    trend = store.trend(by="model", period="month")
+    assert trend["period"].tolist() == ["2024-01-01", "2024-02-01"]
+    assert trend["ng_rate"].tolist() == [50.0, 0.0]
+    assert store.ng_rates(by="model", start="2024-02-01")["ng"].tolist() == [0]
+    assert store.date_range() == ("2024-01-31", "2024-02-01")
+
+
+def test_replaced_file_removes_previous_export(store):
+    def entry(results, sha):
+        return {"location": "output", "name": "a.xlsx", "etag": sha, "sha256": sha, "status": "indexed",
+                "export": {"form": make_form(results), "model": "FR301", "modules": ["600"], "check_time": days_ago(1)}}
+    assert store.record_files([entry(["NG", "NG"], "x")])[0][0] == "indexed"
+    (status, export_id), = store.record_files([entry(["OK", "NG"], "y")])
+    assert status == "indexed" and len(store.exports()) == 1
+    assert store.record_files([entry(["OK", "NG"], "y")]) == [("known", export_id)]
+    assert store.results()["result"].tolist() == ["OK", "NG"]
+    assert tuple(rollup(store, "rollup_module")[["rows", "ng"]].iloc[0]) == (2, 1)
+
+
+# ---------- 日期 ----------
+def test_spans_cover_range():
+    parts = ipqc_results.spans("2023-12-30", "2025-03-02", ipqc_results.RANGE_GRAINS)
+    assert [p[0] for p in parts] == ["day", "year", "month", "day"]
+    assert parts[1][1:] == ["2024-01-01", "2024-01-01"] and parts[2][1:] == ["2025-01-01", "2025-02-01"]
+    assert parts[0][1] == "2023-12-30" and parts[-1][2] == "2025-03-02"
+
+
+def test_parse_time_rejects_implausible():
+    assert ipqc_results.parse_time("2024-05-01 08:30") == datetime(2024, 5, 1, 8, 30)
+    for text in ["", None, "明天", "1999-12-31", "2150-01-01", "9999-01-01"]:
+        assert ipqc_results.parse_time(text) is None
+    assert abs(ipqc_results.parse_check_time("2150-01-01") - datetime.now()) < timedelta(minutes=1)
+
+
+# ---------- 近期 NG（衰減計數） ----------
+def scores(store):
+    return store.query("SELECT key_id, ng, valid FROM ng_scores ORDER BY key_id").set_index("key_id")
+
+
+def test_decay_weight_bounds():
+    assert ipqc_results.decay_weight("2024-03-01", "2024-03-01") == 1.0
+    assert ipqc_results.decay_weight("2024-02-20", "2024-03-01", half_life=10) == pytest.approx(0.5)
+    assert ipqc_results.decay_weight("2024-03-05", "2024-03-01") == 1.0
+    # 半衰期最短、相隔很久：下溢為 0，不會溢位
+    assert ipqc_results.decay_weight("2000-01-01", "2026-01-01", half_life=1) == 0.0
+
+
+@pytest.mark.parametrize("value", [0, -3, 0.5, "nan", "inf", "x"])
+def test_half_life_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        ipqc_results._half_life(value)
+
+
+def test_incremental_scores_match_rebuild(store):
+    # 日期亂序寫入（基準日往後移時整批衰減），再刪除其中一次
+    for n in [30, 5, 200, 0, 90]:
+        store.record(make_form(["NG", "OK", "NG" if n % 2 else "OK"]), "FR301", ["600"], check_time=days_ago(n))
+    incremental = scores(store)
+    store.rebuild_scores()
+    pd.testing.assert_frame_equal(scores(store), incremental, rtol=1e-9)
+    conn = store._connect()
+    with conn:
+        store._remove(conn, 2)
+    incremental = scores(store)
+    store.rebuild_scores()
+    pd.testing.assert_frame_equal(scores(store), incremental, rtol=1e-9, atol=1e-9)
+
+
+def test_recent_ng_matches_direct_weights(store):
+    for n, results in [(0, ["NG", "OK"]), (10, ["NG", "NG"]), (400, ["OK", "NG"])]:
+        store.record(make_form(results, ["a", "b"]), "FR301", ["600"], check_time=days_ago(n))
+    as_of = date.today() + timedelta(days=3)
+    got = store.recent_ng("FR301", as_of).set_index("item")
+    raw = store.results(model="FR301")
+    weight = raw["checked_date"].map(lambda d: ipqc_results.decay_weight(d, as_of))
+    expected = pd.DataFrame({"ng": (raw["result"] == "NG") * weight, "valid": weight, "item": raw["item"]})
+    expected = expected.groupby("item").sum()
+    assert got["ng"].to_numpy() == pytest.approx(expected["ng"].to_numpy())
+    assert got["valid"].to_numpy() == pytest.approx(expected["valid"].to_numpy())
+    # 早於基準日（最晚的檢查日期）的查詢日以基準日計，權重不會超過 1
+    earlier = store.recent_ng("FR301", date.today() - timedelta(days=30))
+    pd.testing.assert_frame_equal(earlier, store.recent_ng("FR301", date.today()))
+
+
+def test_old_and_future_dates_stay_bounded(store):
+    store.record(make_form(["NG"]), "FR301", ["600"], check_time="2000-01-02 08:00")
+    store.record(make_form(["NG"]), "FR301", ["600"], check_time="2150-01-01 08:00")   # 打錯年份：以現在計
+    assert store.results()["checked_date"].tolist()[-1] == date.today().isoformat()
+    frame = store.recent_ng("FR301")
+    assert frame["ng"].between(0, 2).all() and frame["valid"].between(0, 2).all()
+    assert frame["valid"].iloc[0] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_pool_history_alignment(store):
+    store.record(make_form(["NG", "OK"], ["a", "b"]), "FR301", ["600"], check_time=days_ago(0))
+    store.record(make_form(["NG"], ["a"]), "FR301", ["600", "1000"])   # 無法判斷模組：計入所有同名項目
+    pool = pd.DataFrame({"項目": ["a", "a", "b", "z"], "模組": ["600", "1000", "600", "600"]}, index=[5, 6, 7, 8])
+    history = store.pool_history(pool, "FR301")
+    assert history.index.tolist() == [5, 6, 7, 8]
+    assert history["ng"].round(6).tolist() == [2, 1, 0, 0]
+    assert history["valid"].round(6).tolist() == [2, 1, 1, 0]
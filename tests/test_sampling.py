@@ -0,0 +1,161 @@
+import numpy as np
+import pytest
+
+import ipqc_sampling
+
+
+# ---------- 種子 ----------
+def test_resolve_seed_generates_and_parses():
+    generated = ipqc_sampling.resolve_seed()
+    assert isinstance(generated, int) and 0 <= generated < 2 ** 32
+    assert ipqc_sampling.resolve_seed("") >= 0
+    assert ipqc_sampling.resolve_seed("42") == 42
+    assert ipqc_sampling.resolve_seed(0) == 0
+
+
+@pytest.mark.parametrize("seed", [-1, "-5", "abc", "1.5"])
+def test_resolve_seed_rejects_invalid(seed):
+    with pytest.raises(ValueError):
+        ipqc_sampling.resolve_seed(seed)
+
+
+def test_same_seed_same_sample(pool):
+    first = ipqc_sampling.draw_sample(pool, 6, seed=123)
+    again = ipqc_sampling.draw_sample(pool, 6, seed=123)
+    assert first["項目"].tolist() == again["項目"].tolist()
+    others = {tuple(ipqc_sampling.draw_sample(pool, 6, seed=s)["項目"]) for s in range(20)}
+    assert len(others) > 1
+
+
+def test_plans_are_reproducible_and_independent(pool):
+    plans = ipqc_sampling.draw_plans(pool, 5, 4, seed=7)
+    assert [p["項目"].tolist() for p in plans] == [p["項目"].tolist() for p in ipqc_sampling.draw_plans(pool, 5, 4, seed=7)]
+    assert plans[0]["項目"].tolist() == ipqc_sampling.draw_sample(pool, 5, seed=7)["項目"].tolist()
+
+
+# ---------- 必出現 / 不重複 ----------
+def test_must_include_first_and_no_duplicates(pool):
+    for seed in range(50):
+        picked = ipqc_sampling.draw_sample(pool, 6, seed=seed)
+        assert picked["項目"].tolist()[:2] == ["項目0", "項目1"]
+        assert picked["項目"].is_unique
+        assert len(picked) == 6
+
+
+def test_count_larger_than_pool(pool):
+    assert len(ipqc_sampling.draw_sample(pool, 100, seed=1)) == len(pool)
+
+
+def test_count_below_must_include_draws_from_fixed(pool):
+    picked = ipqc_sampling.draw_sample(pool, 1, seed=3)
+    assert len(picked) == 1 and picked["項目"].iloc[0] in {"項目0", "項目1"}
+
+
+# ---------- 最低權重 ----------
+def test_resolve_floor():
+    assert ipqc_sampling.resolve_floor() == ipqc_sampling.FLOOR_WEIGHT
+    assert ipqc_sampling.resolve_floor("") == ipqc_sampling.FLOOR_WEIGHT
+    assert ipqc_sampling.resolve_floor("0") == 0.0
+    assert ipqc_sampling.resolve_floor(0.2) == 0.2
+
+
+@pytest.mark.parametrize("floor", ["nan", "inf", "-inf", -0.1, "x"])
+def test_resolve_floor_rejects_invalid(floor):
+    with pytest.raises(ValueError):
+        ipqc_sampling.resolve_floor(floor)
+
+
+def test_floor_gives_zero_importance_a_chance(pool):
+    zero = {"項目8", "項目9", "項目10", "項目11"}
+    hits = sum(bool(zero & set(ipqc_sampling.draw_sample(pool, 4, seed=s, floor=1.0)["項目"])) for s in range(200))
+    assert hits > 50
+
+
+def test_zero_floor_draws_zero_weight_items_last(pool):
+    # 正權重項目有 6 個：抽 2 + 6 項時不會出現重要性 0 的項目，超過才會
+    for seed in range(30):
+        picked = ipqc_sampling.draw_sample(pool, 8, seed=seed, floor=0)
+        assert set(picked["重要性"]) <= {1, 0.8, 0.6, 0.5, 0.3, 0.2, 0.1}
+        assert len(ipqc_sampling.draw_sample(pool, 10, seed=seed, floor=0)) == 10
+
+
+def test_sampling_weights():
+    importance = np.array([0.0, 0.02, 0.5])
+    assert ipqc_sampling.sampling_weights(importance, 0.05).tolist() == [0.05, 0.05, 0.5]
+    assert ipqc_sampling.sampling_weights(importance, None).tolist() == [0.0, 0.02, 0.5]
+
+
+# ---------- 分層抽樣 ----------
+def test_stratum_labels(pool):
+    labels = ipqc_sampling.stratum_labels(pool, ["source", "kind"])
+    assert labels.iloc[0] == "A｜客訴" and labels.iloc[11] == "B｜一般"
+    assert ipqc_sampling.stratum_labels(pool, []).eq("全部").all()
+    with pytest.raises(ValueError):
+        ipqc_sampling.stratum_labels(pool, ["color"])
+
+
+def test_allocate_quotas_respects_budget_and_sizes():
+    sizes = np.array([5, 3, 0, 10])
+    weights = np.array([2.0, 1.0, 0.0, 0.5])
+    covered = np.array([False, True, False, False])
+    for budget in range(0, 19):
+        quota = ipqc_sampling.allocate_quotas(sizes, weights, budget, covered)
+        assert quota.sum() == min(budget, sizes.sum())
+        assert (quota <= sizes).all()
+        if budget >= 2:
+            # 未涵蓋且有項目的層至少一項
+            assert quota[0] >= 1 and quota[3] >= 1
+    assert ipqc_sampling.allocate_quotas(sizes, weights, 1, covered).tolist() == [1, 0, 0, 0]
+
+
+def test_stratified_covers_every_stratum(pool):
+    by = ["source", "kind"]
+    need = ipqc_sampling.min_full_coverage(pool, by)
+    for seed in range(30):
+        picked = ipqc_sampling.draw_stratified(pool, need, by=by, seed=seed)
+        assert len(picked) == need and picked["項目"].is_unique
+        assert picked["項目"].tolist()[:2] == ["項目0", "項目1"]
+        assert set(ipqc_sampling.stratum_labels(picked, by)) == set(ipqc_sampling.stratum_labels(pool, by))
+
+
+def test_stratified_quotas_match_info(pool):
+    positions, info = ipqc_sampling.stratified_positions(pool, 8, ["kind"], seed=5)
+    assert len(positions) == 8
+    assert info["項目數"].sum() == len(pool)
+    assert info["必出現"].sum() + info["加權抽樣名額"].sum() == 8
+    labels = ipqc_sampling.stratum_labels(pool, ["kind"]).to_numpy()[positions]
+    counts = dict(zip(*np.unique(labels, return_counts=True)))
+    for _, row in info.iterrows():
+        assert counts.get(row["分層"], 0) == row["必出現"] + row["加權抽樣名額"]
+
+
+def test_stratified_is_reproducible(pool):
+    first = ipqc_sampling.sample(pool, 7, seed=11, strata=["tier"])
+    assert first["項目"].tolist() == ipqc_sampling.sample(pool, 7, seed=11, strata=["tier"])["項目"].tolist()
+
+
+def test_coverage_report_columns(pool):
+    report = ipqc_sampling.coverage_report(pool, 4, by=["kind"], plans=200)
+    assert {"分層涵蓋率", "不分層涵蓋率", "分層預期抽出"} <= set(report.columns)
+    assert report["分層涵蓋率"].between(0, 1).all() and report["不分層涵蓋率"].between(0, 1).all()
+
+
+# ---------- 依近期 NG 調整 ----------
+def test_recent_ng_rate_is_smoothed():
+    rate = ipqc_sampling.recent_ng_rate({"ng": [0, 1, 10, 0], "valid": [0, 1, 10, 5]})
+    assert rate.tolist() == pytest.approx([0, 1 / 3, 10 / 12, 0])
+
+
+def test_ng_boost_weights():
+    importance = np.array([0.0, 0.02, 0.5])
+    boosted = ipqc_sampling.sampling_weights(importance, 0.05, ng_rate=np.array([0.0, 0.5, 1.0]), boost=4)
+    assert boosted.tolist() == pytest.approx([0.05, 0.15, 2.5])
+
+
+def test_ng_rate_raises_pick_rate_but_keeps_must_include(pool):
+    rate = np.zeros(len(pool))
+    rate[9] = 1.0
+    plain = ipqc_sampling.draw_positions(ipqc_sampling.importance_of(pool), 3, 1, plans=2000)
+    boosted = ipqc_sampling.draw_positions(ipqc_sampling.importance_of(pool), 3, 1, plans=2000, ng_rate=rate)
+    assert (boosted[:, :2] == [0, 1]).all()
+    assert (boosted == 9).any(axis=1).mean() > (plain == 9).any(axis=1).mean() * 2
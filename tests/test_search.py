@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+import ipqc_search
+
+
+@pytest.fixture
+def index():
+    complaints = pd.DataFrame({
+        "機型": ["FR301", "FR301", "LP500"],
+        "模組": ["600", "1000", "200"],
+        "客訴編號": ["CC2401-001", "CC2402-002", "CC2403-003"],
+        "問題描述": ["外觀刮傷", "Devicenet 斷線異音", "刮傷與漏氣"],
+        "立即改善對策": ["重新包裝", "", None],
+        "建立日期": ["2024-01-05", "2024-02-10", "2024-03-01"],
+    })
+    inspection = pd.DataFrame({
+        "機型": ["FR301", "LP500"], "模組": ["600", "200"],
+        "項目": ["確認外觀無刮傷", "ＤＥＶＩＣＥＮＥＴ 接頭鎖緊"], "規範": ["無刮傷", ""], "方法": ["目視", "手動"],
+    })
+    return ipqc_search.SearchIndex(inspection, complaints)
+
+
+def test_normalize_and_split():
+    assert ipqc_search.normalize("ＤｅｖｉｃｅＮｅｔ 斷線！") == "devicenet斷線"
+    assert ipqc_search.normalize(float("nan")) == ""
+    assert ipqc_search.split_query("刮傷 / 異音，刮傷") == ["刮傷", "異音"]
+    assert ipqc_search.split_query(None) == []
+
+
+def test_search_finds_all_kinds(index):
+    hits = index.search("刮傷")
+    assert len(index) == 5
+    assert set(zip(hits["kind"], hits["row"])) == {("complaint", 0), ("complaint", 2), ("inspection", 0)}
+    assert list(hits.columns) == ipqc_search.RESULT_COLUMNS
+    assert hits["score"].is_monotonic_decreasing
+
+
+def test_search_is_case_and_width_insensitive(index):
+    hits = index.search("devicenet")
+    assert set(hits["kind"]) == {"complaint", "inspection"}
+    assert hits.loc[hits["kind"] == "inspection", "內容"].item() == "ＤＥＶＩＣＥＮＥＴ 接頭鎖緊"
+
+
+def test_any_term_matches_and_more_terms_rank_higher(index):
+    hits = index.search("刮傷 漏氣")
+    assert hits.iloc[0]["客訴編號"] == "CC2403-003"
+    assert hits.iloc[0]["符合欄位"] == "問題描述"
+
+
+def test_filters_and_limit(index):
+    assert index.search("刮傷", models=["LP500"])["機型"].tolist() == ["LP500"]
+    assert index.search("刮傷", kinds=["inspection"])["kind"].tolist() == ["inspection"]
+    assert len(index.search("刮傷", limit=1)) == 1
+    assert len(index.search("刮傷", limit=None)) == 3
+    for limit in (0, -1):
+        with pytest.raises(ValueError):
+            index.search("刮傷", limit=limit)
+    assert index.search("沒有這個").empty and index.search("").empty
+
+
+def test_single_character_and_substring_confirmed(index):
+    # bigram 都在但不相鄰時不算符合
+    assert index.search("傷").shape[0] == 3
+    assert index.search("刮漏").empty
+
+
+def test_ties_prefer_newer_complaints():
+    complaints = pd.DataFrame({"機型": ["A", "A"], "問題描述": ["異音", "異音"], "建立日期": ["2023-01-01", "2024-01-01"]})
+    hits = ipqc_search.SearchIndex(None, complaints).search("異音")
+    assert hits["row"].tolist() == [1, 0]
+
+
+def test_public_output(index):
+    out = ipqc_search.public(index.search("刮傷"))
+    assert "row" not in out.columns
+    assert set(out["建立日期"]) == {"2024-01-05", "2024-03-01", ""}
+
+
+def test_empty_index():
+    index = ipqc_search.SearchIndex()
+    assert len(index) == 0 and index.search("刮傷").empty
@@ -0,0 +1,33 @@
+import ipqc_data
+import ipqc_metrics
+import ipqc_warm
+
+
+class TaggedStore(ipqc_warm.DatasetStore):
+    # 版本由測試指定（不必真的改寫資料檔）
+    tag = 1
+
+    def _source(self):
+        return self.tag, self.paths
+
+
+def counts():
+    return {r: ipqc_metrics.CACHE_REQUESTS.value(cache=ipqc_warm.CACHE_NAME, result=r) for r in ("hit", "miss")}
+
+
+def test_cache_counts_hits_and_reloads():
+    store = TaggedStore(ipqc_data.INSPECTION_PATH, ipqc_data.COMPLAINT_PATH, interval=3600)
+    before = counts()
+
+    dataset = store.get()   # 第一次載入
+    assert counts() == {"hit": before["hit"], "miss": before["miss"] + 1}
+
+    assert store.get() is dataset and store.get() is dataset
+    store.refresh(wait=True)   # 版本沒變：不重新載入
+    assert counts() == {"hit": before["hit"] + 2, "miss": before["miss"] + 1}
+
+    store.tag = 2
+    store.refresh(wait=True)
+    assert store.get() is not dataset
+    assert counts() == {"hit": before["hit"] + 3, "miss": before["miss"] + 2}
+    assert f'ipqc_cache_requests_total{{cache="dataset",result="miss"}} {before["miss"] + 2}' in ipqc_metrics.render()
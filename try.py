@@ -3,16 +3,25 @@ import os
 import pandas as pd
 import io
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
 import re
-from datetime import datetime
-import os
+import time
 import zipfile
-# ----- Microsoft Graph (OneDrive / SharePoint) helper functions -----
-import requests
-import json
-from msal import ConfidentialClientApplication
+import uuid
+import pytz
+import ipqc_batch
+import ipqc_blobs
+import ipqc_data
+import ipqc_edits
+import ipqc_export
+import ipqc_memory
+import ipqc_metrics
+import ipqc_results
+import ipqc_sampling
+import ipqc_search
+import ipqc_shared
+import ipqc_storage
+import ipqc_timing
+import ipqc_warm
 
 def _get_secret(key):
     # 先試 st.secrets，再 fallback 到環境變數（方便開發）
@@ -21,111 +30,98 @@ def _get_secret(key):
     except Exception:
         return os.environ.get(key)
 
-def get_graph_token():
-    client_id = _get_secret("client_id")
-    client_secret = _get_secret("client_secret")
-    tenant_id = _get_secret("tenant_id")
-    if not all([client_id, client_secret, tenant_id]):
-        raise RuntimeError("Missing Graph credentials. Put client_id/client_secret/tenant_id into Streamlit secrets.")
-    authority = f"https://login.microsoftonline.com/{tenant_id}"
-    app = ConfidentialClientApplication(client_id, authority=authority, client_credential=client_secret)
-    token = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-    if "access_token" not in token:
-        raise RuntimeError(f"Failed to obtain Graph token: {token}")
-    return token["access_token"]
-
-def get_cached_site_id():
-    # cache site id in session_state to avoid repeated requests
-    if "_site_id" not in st.session_state:
-        hostname = _get_secret("sharepoint_hostname")  # e.g. "yourcompany.sharepoint.com"
-        site_path = _get_secret("sharepoint_site_path") or ""  # e.g. "sites/YourSite" or empty
-        token = get_graph_token()
-        hdrs = {"Authorization": f"Bearer {token}"}
-        if site_path:
-            url = f"https://graph.microsoft.com/v1.0/sites/{hostname}:/{site_path}"
-        else:
-            url = f"https://graph.microsoft.com/v1.0/sites/{hostname}"
-        r = requests.get(url, headers=hdrs)
-        r.raise_for_status()
-        st.session_state["_site_id"] = r.json()["id"]
-    return st.session_state["_site_id"]
-
-def list_folder_children(site_id, folder_path):
-    token = get_graph_token()
-    hdrs = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:/{folder_path}:/children"
-    r = requests.get(url, headers=hdrs)
-    r.raise_for_status()
-    return r.json().get("value", [])
-
-def find_file_in_folder(site_id, folder_path, filename):
-    items = list_folder_children(site_id, folder_path)
-    for it in items:
-        if it.get("name") == filename:
-            return it
-    return None
+# 部署模式（IPQC_STORAGE：local / folder / graph）決定資料檔來源與表單存放處；
+# 程序共用一份（Graph 權杖、site id 與資料夾清單快取）
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    return ipqc_storage.deployment(_get_secret)
+
+def flush_outbox(outbox_dir=ipqc_batch.OUTBOX_DIR):
+    # 將上傳待傳區的表單傳到 OneDrive 歷史資料夾，成功一筆就移除一筆（失敗的留待下次）
+    # 待傳區在共用資料夾：同時間只有一個副本上傳，其他副本略過（由正在上傳的副本一併傳完）
+    with ipqc_shared.lock("outbox", blocking=False) as acquired:
+        if not acquired:
+            return 0
+        uploaded = 0
+        for fname in ipqc_batch.outbox_files(outbox_dir):
+            fpath = os.path.join(outbox_dir, fname)
+            with open(fpath, "rb") as f:
+                storage.history.write(fname, f.read())
+            os.remove(fpath)
+            uploaded += 1
+        return uploaded
+
+
+# 目前版本的複本（共用資料夾 IPQC_SHARED_DIR 下的 data/）；頁面載入的是版本檔指向的版本資料夾
+INSPECTION_PATH = ipqc_data.INSPECTION_PATH
+COMPLAINT_PATH = ipqc_data.COMPLAINT_PATH
 
-def download_file_bytes(site_id, item_path):
-    token = get_graph_token()
-    hdrs = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:/{item_path}:/content"
-    r = requests.get(url, headers=hdrs, stream=True)
-    r.raise_for_status()
-    return r.content
+st.set_page_config(page_title="三和 IPQC點檢表系統", layout="wide")
+storage = get_storage()
 
-def upload_bytes_to_folder(site_id, folder_path, filename, file_bytes):
-    token = get_graph_token()
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:/{folder_path}/{filename}:/content"
-    hdrs = {"Authorization": f"Bearer {token}", "Content-Type": "application/octet-stream"}
-    r = requests.put(url, headers=hdrs, data=file_bytes)
-    r.raise_for_status()
-    return r.json()
+# ========== 重跑分段計時（IPQC_TIMING=1 啟用）與監控指標（IPQC_METRICS_PORT / IPQC_METRICS_FILE） ==========
+def session_id():
+    return st.session_state.setdefault("_session_id", uuid.uuid4().hex[:8])
 
+def is_admin():
+    # 網址帶 ?admin=<admin_token> 才顯示管理員面板（admin_token 放在 secrets 或環境變數）
+    token = _get_secret("admin_token")
+    return bool(token) and st.query_params.get("admin") == token
 
-INSPECTION_PATH = "data/IPQC點檢項目最新1.xlsx"
-COMPLAINT_PATH = "data/客訴調查總表.xlsx"
+ipqc_metrics.start_from_env()
+ipqc_timing.begin(session_id())
 
-st.set_page_config(page_title="三和 IPQC點檢表系統", layout="wide")
 st.title("📋三和 IPQC 點檢表產出工具")
 
+# ========== 頁面分區（fragment） ==========
+# 每個區塊各自重跑：在後台上傳、查詢表單、批次產生、選擇/編輯項目、填寫匯出中操作時，
+# 只重跑該區塊，不會重新同步 OneDrive、載入資料與重畫其他表格。
+# 只有資料檔案變更（上傳新檔）時才整頁重跑。
+
 # ✅ 後台管理功能（收合式）
-st.sidebar.header("⚙️ 後台管理")
-with st.sidebar.expander("📂 後台資料管理", expanded=False):
-        new_inspection = st.file_uploader("📄 上傳新的點檢資料", type=["xlsx"], key="upload_inspection")
-        if new_inspection:
-            data = new_inspection.read()
-            with open(INSPECTION_PATH, "wb") as f:
-                f.write(data)
-            st.cache_data.clear()
-            st.success("✅ 點檢資料已更新（本機暫存）")
-        # 上傳到 OneDrive
-        try:
-            site_id = get_cached_site_id()
-            upload_folder = _get_secret("upload_folder") or "Shared Documents/IPQC_上傳_點檢資料"
-            upload_bytes_to_folder(site_id, upload_folder, new_inspection.name, data)
-            st.sidebar.success("✅ 已上傳到公司 OneDrive（上傳資料夾）")
-        except Exception as e:
-            st.sidebar.error("⛔ 上傳到 OneDrive 失敗：" + str(e))
-
-        new_complaint = st.file_uploader("📄 上傳新的客訴資料", type=["xlsx"], key="upload_complaint")
-        if new_complaint:
-            data = new_complaint.read()
-            with open(COMPLAINT_PATH, "wb") as f:
-                f.write(data)
-            st.cache_data.clear()
-            st.success("✅ 客訴資料已更新（本機暫存）")
-        try:
-            site_id = get_cached_site_id()
-            upload_folder = _get_secret("upload_folder") or "Shared Documents/IPQC_上傳_點檢資料"
-            upload_bytes_to_folder(site_id, upload_folder, new_complaint.name, data)
-            st.sidebar.success("✅ 已上傳客訴檔到公司 OneDrive（上傳資料夾）")
-        except Exception as e:
-            st.sidebar.error("⛔ 上傳到 OneDrive 失敗：" + str(e))
+@st.fragment(key="admin_upload")
+@ipqc_timing.fragment("admin_upload", session_id)
+def admin_upload_section():
+    with st.expander("📂 後台資料管理", expanded=False):
+        # 上一次上傳後整頁重跑，訊息保留到這裡顯示
+        for kind, msg in st.session_state.pop("_admin_notice", []):
+            getattr(st, kind)(msg)
+
+        handled = st.session_state.setdefault("_uploaded_ids", set())
+        notices = []
+        for label, key, kind, local_msg, remote_msg in [
+            ("📄 上傳新的點檢資料", "upload_inspection", "inspection",
+             "✅ 點檢資料已更新（本機暫存）", "✅ 已上傳到"),
+            ("📄 上傳新的客訴資料", "upload_complaint", "complaint",
+             "✅ 客訴資料已更新（本機暫存）", "✅ 已上傳客訴檔到"),
+        ]:
+            uploaded = st.file_uploader(label, type=["xlsx"], key=key)
+            # 同一個檔案只處理一次（上傳元件在之後每次重跑都還會回傳該檔）
+            if uploaded is None or uploaded.file_id in handled:
+                continue
+            handled.add(uploaded.file_id)
+            data = uploaded.read()
+            # 發佈成共用資料夾的新版本（發佈鎖內寫入版本資料夾再取代版本檔），其他副本看到版本檔後各自載入
+            dataset_versions.publish({kind: data}, source="upload")
+            # 由上傳的管理員等待新版本載入完成，其他人在完成前繼續使用前一版
+            with st.spinner("新資料載入中..."):
+                data_store.refresh(wait=True)
+            notices.append(("success", local_msg))
+            # 同時寫回資料檔來源（以來源中的固定檔名取代，之後的同步不會再以舊檔覆蓋）
+            if storage.source is not None:
+                try:
+                    storage.source.write(storage.names[kind], data)
+                    notices.append(("success", remote_msg + storage.source.label))
+                except Exception as e:
+                    notices.append(("error", f"⛔ 上傳到{storage.source.label}失敗：" + str(e)))
+
+        if notices:
+            # 資料已更新：整頁重跑以重新載入資料與選單
+            st.session_state["_admin_notice"] = notices
+            st.rerun()
 
 
 # ✅ IPQC Excel 匯出樣式優化 + 多檔案後台查詢功能（依日期、機型、模組）
-st.sidebar.markdown("### 📁 查詢已儲存表單")
-
 def extract_date_from_filename(f):
     match = re.search(r'_(\d{8})_IPQC填寫版', f)
     if match:
@@ -141,8 +137,30 @@ def extract_model_and_module(f):
         return parts[0], parts[1]  # 機型, 模組
     return None, None
 
-output_dir = "output"
-if os.path.exists(output_dir):
+output_dir = storage.archive_dir
+
+def zip_output_files(selected_files):
+    zip_buffer = io.BytesIO()
+    # 打包期間其他副本不會寫入 output（共用鎖，多個打包可同時進行）
+    with ipqc_shared.lock("files", shared=True), zipfile.ZipFile(zip_buffer, "w") as zipf:
+        for fname in selected_files:
+            fpath = os.path.join(output_dir, fname)
+            zipf.write(fpath, arcname=fname)
+    return zip_buffer.getvalue()
+
+# 匯出檔與批次 zip 存在磁碟暫存區，session 只保存 handle（整個伺服器共用一個暫存區）
+blob_store = st.cache_resource(ipqc_blobs.BlobStore)()
+# 資料集在背景預先載入（程序共用），監看共用資料夾的版本檔，新版本載入完成才切換
+data_store = ipqc_warm.shared_store()
+dataset_versions = data_store.versions
+
+@st.fragment(key="archive")
+@ipqc_timing.fragment("archive", session_id)
+def archive_section():
+    st.markdown("### 📁 查詢已儲存表單")
+    if not os.path.exists(output_dir):
+        st.info("📁 尚未建立 output 資料夾")
+        return
     files = sorted(os.listdir(output_dir), reverse=True)
     detailed_files = []
     for f in files:
@@ -151,63 +169,61 @@ if os.path.exists(output_dir):
         if date and model and module:
             detailed_files.append({"file": f, "date": date, "model": model, "module": module})
 
-    if detailed_files:
-        df_files = pd.DataFrame(detailed_files)
-
-        # 條件選單（分區整齊）
-        with st.sidebar.expander("📅 選擇日期區間", expanded=False):
-            min_date = df_files["date"].min()
-            max_date = df_files["date"].max()
-            date_range = st.date_input("選擇範圍：", [min_date, max_date], key="date_range")
-
-        with st.sidebar.expander("📦 機型與模組條件 (可留空)", expanded=False):
-            unique_models = sorted(df_files["model"].unique())
-            unique_modules = sorted(df_files["module"].unique())
-            selected_models = st.multiselect("📦 機型", unique_models, key="model_sel")
-            selected_modules = st.multiselect("🔢 模組", unique_modules, key="module_sel")
-
-        # 條件過濾
-        df_filtered = df_files[
-            (df_files["date"] >= date_range[0]) & (df_files["date"] <= date_range[1])
-        ]
-        if selected_models:
-            df_filtered = df_filtered[df_filtered["model"].isin(selected_models)]
-        if selected_modules:
-            df_filtered = df_filtered[df_filtered["module"].isin(selected_modules)]
-
-        # 勾選要下載的檔案（左邊 checkbox，非 dropdown）
-        if not df_filtered.empty:
-            with st.sidebar.expander("📋 勾選並下載表單", expanded=True):
-                selected_files = []
-                for file in df_filtered["file"].tolist():
-                    if st.checkbox(file, key=f"chk_{file}"):
-                        selected_files.append(file)
-
-                if selected_files:
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-                        for fname in selected_files:
-                            fpath = os.path.join(output_dir, fname)
-                            zipf.write(fpath, arcname=fname)
-                    st.download_button(
-                        "📦 下載選取表單 (.zip)",
-                        data=zip_buffer.getvalue(),
-                        file_name="IPQC_表單打包下載.zip",
-                        mime="application/zip"
-                    )
-                else:
-                    st.info("✅ 可勾選左方清單來下載表單")
+    if not detailed_files:
+        st.info("📭 沒有符合條件的表單")
+        return
+    df_files = pd.DataFrame(detailed_files)
+
+    # 條件選單（分區整齊）
+    with st.expander("📅 選擇日期區間", expanded=False):
+        min_date = df_files["date"].min()
+        max_date = df_files["date"].max()
+        date_range = st.date_input("選擇範圍：", [min_date, max_date], key="date_range")
+
+    with st.expander("📦 機型與模組條件 (可留空)", expanded=False):
+        unique_models = sorted(df_files["model"].unique())
+        unique_modules = sorted(df_files["module"].unique())
+        selected_models = st.multiselect("📦 機型", unique_models, key="model_sel")
+        selected_modules = st.multiselect("🔢 模組", unique_modules, key="module_sel")
+
+    # 條件過濾（日期區間只選了起日時，先視為同一天）
+    date_range = list(date_range) or [min_date, max_date]
+    df_filtered = df_files[
+        (df_files["date"] >= date_range[0]) & (df_files["date"] <= date_range[-1])
+    ]
+    if selected_models:
+        df_filtered = df_filtered[df_filtered["model"].isin(selected_models)]
+    if selected_modules:
+        df_filtered = df_filtered[df_filtered["module"].isin(selected_modules)]
+
+    # 勾選要下載的檔案（左邊 checkbox，非 dropdown）
+    if df_filtered.empty:
+        st.info("📭 此條件下沒有符合的表單")
+        return
+    with st.expander("📋 勾選並下載表單", expanded=True):
+        selected_files = []
+        for file in df_filtered["file"].tolist():
+            if st.checkbox(file, key=f"chk_{file}"):
+                selected_files.append(file)
+
+        if selected_files:
+            # 點擊下載時才打包，勾選時不必每次壓縮、也不佔用 session 記憶體
+            st.download_button(
+                "📦 下載選取表單 (.zip)",
+                data=lambda: zip_output_files(selected_files),
+                file_name="IPQC_表單打包下載.zip",
+                mime="application/zip"
+            )
         else:
-            st.sidebar.info("📭 此條件下沒有符合的表單")
-    else:
-        st.sidebar.info("📭 沒有符合條件的表單")
-else:
-    st.sidebar.info("📁 尚未建立 output 資料夾")
+            st.info("✅ 可勾選左方清單來下載表單")
+
+
+st.sidebar.header("⚙️ 後台管理")
+with st.sidebar:
+    admin_upload_section()
+    archive_section()
 
 # ========== 顯示資料更新時間 ==========
-from datetime import datetime
-import pytz
-import os
 tz = pytz.timezone("Asia/Taipei")  # 台灣時區
 def get_last_modified(path):
     if os.path.exists(path):
@@ -218,423 +234,476 @@ inspection_time = get_last_modified(INSPECTION_PATH)
 complaint_time = get_last_modified(COMPLAINT_PATH)
 st.caption(f"📁 資料更新時間：點檢資料（{inspection_time}），客訴資料（{complaint_time}）")
 
-# ========== 載入資料 ==========
-@st.cache_data
-def read_all_sheets(path):
-    if not os.path.exists(path):
-        return pd.DataFrame()
-    xls = pd.ExcelFile(path)
-    all_dfs = []
-    for sheet in xls.sheet_names:
-        df_raw = pd.read_excel(xls, sheet_name=sheet, header=None)
-        header_row = df_raw[df_raw.apply(lambda row: row.astype(str).str.contains("機型").any() and row.astype(str).str.contains("模組").any(), axis=1)].index
-        if not header_row.empty:
-            header_idx = header_row[0]
-            df = pd.read_excel(xls, sheet_name=sheet, header=header_idx)
-            df.columns = df.columns.astype(str).str.strip()
-            if "機型" in df.columns and "模組" in df.columns:
-                df['來源分頁'] = sheet
-                all_dfs.append(df)
-    return pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
-
-
-# ========== 模組欄位清洗 ==========
-def normalize_module(val):
-    if pd.isna(val) or str(val).strip() == "":
-        return ""  # 空的就不處理
-
-    val = str(val).strip().upper()
-    if val in ["NA", "NAN", "QQA", "NQA", "QQC"]:
-        return "NA"  # 全部歸類為 NA
-
-    try:
-        return str(int(float(val)))  # 數字轉為整數字串，例如 100.0 → "100"
-    except:
-        return ""  # 非數字且不是 NA 類，就當作無效，排除
-
-
 # ========== 載入並處理資料 ==========
-# ---- 嘗試從 OneDrive/SharePoint 同步最新上傳檔案到本機暫存（如果設定了 secret） ----
-try:
-    site_id = get_cached_site_id()
-    upload_folder = _get_secret("upload_folder") or "Shared Documents/IPQC_上傳_點檢資料"
-    # 你原先預設的檔名（如果你常用固定檔名）
-    inspection_name = _get_secret("inspection_filename") or os.path.basename(INSPECTION_PATH)
-    complaint_name = _get_secret("complaint_filename") or os.path.basename(COMPLAINT_PATH)
-
-    # 先檢查 inspection 檔
-    itm = find_file_in_folder(site_id, upload_folder, inspection_name)
-    if itm:
-        bytes_data = download_file_bytes(site_id, f"{upload_folder}/{inspection_name}")
-        with open(INSPECTION_PATH, "wb") as f:
-            f.write(bytes_data)
-        st.info(f"已從公司 OneDrive 同步點檢檔：{inspection_name}")
-
-    # 再檢查 complaint 檔
-    itm2 = find_file_in_folder(site_id, upload_folder, complaint_name)
-    if itm2:
-        bytes_data = download_file_bytes(site_id, f"{upload_folder}/{complaint_name}")
-        with open(COMPLAINT_PATH, "wb") as f:
-            f.write(bytes_data)
-        st.info(f"已從公司 OneDrive 同步客訴檔：{complaint_name}")
-
-except Exception as e:
-    # 不要中斷 App，僅顯示警告（可能是尚未設定 secrets 或權限）
-    st.warning("OneDrive 同步失敗（可忽略）： " + str(e))
-
-
-df = read_all_sheets(INSPECTION_PATH)
-complaint_df = read_all_sheets(COMPLAINT_PATH)
-
-if df.empty:
+# ---- 從資料檔來源（OneDrive / 同步資料夾）同步最新檔案到共用資料夾 ----
+# 多個副本時只有拿到 sync 鎖、且距離上次同步超過 IPQC_SYNC_INTERVAL 秒的那一個檢查；
+# 來源檔的 etag 沒變就不下載，內容有變才發佈新版本，其他副本從版本檔取得，不必各自下載
+if storage.source is not None:
+    with ipqc_timing.span("graph_sync"), dataset_versions.lock("sync", blocking=False) as acquired:
+        if acquired and dataset_versions.sync_due():
+            sync_error = None
+            try:
+                files = {}
+                for kind, name in storage.names.items():
+                    data = storage.source.fetch_changed(name)
+                    if data is not None:
+                        files[kind] = data
+
+                # 內容有變才發佈新版本並在背景重新載入（以 sha256 判斷），這次重跑仍使用目前版本
+                manifest = dataset_versions.publish(files, source=storage.mode) if files else None
+                if manifest:
+                    for kind in manifest["changed"]:
+                        st.info(f"已從{storage.source.label}同步{'點檢' if kind == 'inspection' else '客訴'}檔：{storage.names[kind]}")
+                    # 第一次取得資料（還沒有任何版本）時直接等待載入
+                    data_store.refresh(wait=data_store.get(timeout=0) is None)
+
+            except Exception as e:
+                # 不要中斷 App，僅顯示警告（可能是尚未設定 secrets 或權限）；下次重新取得全部檔案
+                sync_error = str(e)
+                storage.source.forget()
+                st.warning("OneDrive 同步失敗（可忽略）： " + str(e))
+            dataset_versions.mark_synced(sync_error)
+
+
+# 讀取、欄位清洗（只保留有效模組）與（機型, 模組）索引都在背景完成；只有程序剛啟動時需要等待第一個版本
+with ipqc_timing.span("dataset"):
+    dataset = data_store.get(timeout=0)
+    if dataset is None:
+        with st.spinner("資料載入中..."):
+            dataset = data_store.get()
+
+
+# ========== 資料就緒狀態（側邊欄） ==========
+# 背景載入新版本期間每 2 秒更新一次；載入結束（新版本就緒或失敗）時整頁重跑，切換到新資料並停止更新
+warming = data_store.status()["state"] == "warming"
+
+@st.fragment(key="readiness", run_every=2 if warming else None)
+@ipqc_timing.fragment("readiness", session_id)
+def readiness_panel():
+    status = data_store.status()
+    if status["state"] == "warming":
+        st.info("⏳ 新版本資料載入中，完成前繼續使用目前版本")
+    elif status["version"] is not None:
+        st.success(f"✅ 資料已就緒（版本 {'/'.join((v or '-')[:8] for v in status['version'])}，"
+                   f"{status['loaded_at']} 載入，耗時 {status['duration_s']:.1f} 秒）")
+    if status["error"]:
+        st.warning(f"⚠️ 最近一次載入失敗：{status['error']}")
+    if data_store.get(timeout=0) is not dataset or (warming and status["state"] != "warming"):
+        st.rerun(scope="app")
+
+
+with st.sidebar:
+    readiness_panel()
+
+if dataset is None or dataset.empty:
     st.warning("⚠️ 無法讀取點檢資料，請至左側上傳 inspection.xlsx")
+    ipqc_timing.end()
     st.stop()
 
-# 欄位處理與清洗
-df.columns = df.columns.str.strip()
-df["機型"] = df["機型"].astype(str).str.strip()
-df["模組"] = df["模組"].apply(normalize_module)
-
-if not complaint_df.empty:
-    complaint_df.columns = complaint_df.columns.str.strip()
-    complaint_df["機型"] = complaint_df["機型"].astype(str).str.strip()
-    complaint_df["模組"] = complaint_df["模組"].apply(normalize_module)
-
-# 過濾模組只保留非空值（已排除完全無效模組）
-df = df[df['模組'] != ""]
-complaint_df = complaint_df[complaint_df['模組'] != ""]
-
-# 合併主資料與客訴資料的機型與模組組合
-model_module_df = pd.concat([
-    df[['機型', '模組']],
-    complaint_df[['機型', '模組']] if not complaint_df.empty else pd.DataFrame(columns=["機型", "模組"])
-]).drop_duplicates().reset_index(drop=True)
-
-models = sorted(model_module_df["機型"].dropna().unique())
-selected_model = st.selectbox("選擇機型", models)
-
-if selected_model:
-    # 建立模組清單，加入「全部項目」
-    modules = sorted(
-        model_module_df[model_module_df['機型'] == selected_model]['模組'].dropna().unique(),
-        key=lambda x: (x == "NA", int(x) if x.isdigit() else float('inf'))
-    )
-    modules_with_all = ["全部項目"] + modules
-    
-    # 改用 multiselect 可複選模組
-    selected_modules_raw = st.multiselect("選擇模組（可複選）", modules_with_all)
-    
-    # 判斷是否選了「全部項目」
-    if "全部項目" in selected_modules_raw:
-        selected_modules = modules
-    else:
-        selected_modules = selected_modules_raw
-    
-    # 檢查是否有選模組，開始處理資料
-    if selected_modules:
-        # 點檢資料
-        filtered = df[(df['機型'] == selected_model) & (df['模組'].isin(selected_modules))].copy()
-        filtered["判定結果"] = ""
-        filtered["客訴編號"] = ""
-    
-        # 客訴資料
-        complaints_filtered = pd.DataFrame()
-        if not complaint_df.empty:
-            complaints = complaint_df[
-                (complaint_df['機型'] == selected_model) & (complaint_df['模組'].isin(selected_modules))
-            ].copy()
-            if not complaints.empty:
-                complaints["項目"] = complaints["問題描述"] if "問題描述" in complaints.columns else ""
-                for col in ["項目", "規範", "方法", "重要性", "客訴編號"]:
-                    if col not in complaints.columns:
-                        complaints[col] = ""
-                complaints_filtered = complaints[["項目", "規範", "方法", "重要性", "客訴編號"]].copy()
-                complaints_filtered["判定結果"] = ""
-
-        st.subheader("📋 點檢項目（可直接編輯）")
-        filtered = st.data_editor(
-            filtered[["項目", "規範", "方法", "重要性", "客訴編號", "判定結果"]],
-            key="ipqc_edit",
+# ========== 批次產生空白表單 ==========
+BATCH_SCOPES = ["全部機型的全部模組", "指定機型（每個模組一張）", "指定機型（整個機型一張）"]
+
+@st.fragment(key="batch")
+@ipqc_timing.fragment("batch", session_id)
+def batch_section(dataset):
+    models = dataset.models()
+    model_module_df = dataset.model_module_df
+    with st.expander("🗂️ 批次產生空白表單", expanded=False):
+        batch_scope = st.radio("範圍", BATCH_SCOPES, key="batch_scope")
+        batch_models = st.multiselect("機型", models, key="batch_models") if batch_scope != BATCH_SCOPES[0] else None
+        batch_count = st.number_input("每張抽樣數量", min_value=1, value=5, key="batch_count")
+        batch_seed = st.text_input("亂數種子（可留空，填入可重現結果）", key="batch_seed")
+        if st.button("🚀 批次產生", key="batch_run"):
+            seed = int(batch_seed) if batch_seed.strip().isdigit() else None
+            if batch_scope == BATCH_SCOPES[2]:
+                jobs = ipqc_batch.model_jobs(model_module_df, batch_models or [], batch_count, seed=seed)
+            else:
+                jobs = ipqc_batch.all_module_jobs(model_module_df, batch_count, models=batch_models, seed=seed)
+            if not jobs:
+                st.warning("⚠️ 請先選擇機型")
+            else:
+                with st.spinner(f"批次產生 {len(jobs)} 張表單中..."), ipqc_timing.span("batch"), \
+                        ipqc_memory.stage("batch", session_id()):
+                    # 有上傳位置（Graph 模式）時另存一份到上傳待傳區
+                    bundle, summary = ipqc_batch.run_batch(
+                        jobs, dataset, output_dir=storage.archive_dir,
+                        outbox_dir=ipqc_batch.OUTBOX_DIR if storage.history is not None else None)
+                ipqc_metrics.EXPORTS.inc(sum(1 for r in summary if r['檔案']), source="batch")
+                st.session_state["batch_blob"] = blob_store.put(bundle, ipqc_batch.BUNDLE_NAME, ipqc_blobs.ZIP_MIME)
+                st.session_state["batch_summary"] = summary
+                if storage.history is None:
+                    st.success(f"✅ 已產生 {sum(1 for r in summary if r['檔案'])} 張表單（已存入{storage.archive.label}）")
+                else:
+                    st.success(f"✅ 已產生 {sum(1 for r in summary if r['檔案'])} 張表單（已存入 output 與上傳待傳區）")
+                    try:
+                        with ipqc_timing.span("graph_upload"):
+                            uploaded = flush_outbox()
+                        st.success(f"✅ 已上傳 {uploaded} 張表單至{storage.history.label}")
+                    except Exception as e:
+                        st.warning("⚠️ 上傳待傳區到 OneDrive 失敗（下次會再試）：" + str(e))
+        batch_blob = st.session_state.get("batch_blob")
+        if batch_blob and not blob_store.exists(batch_blob):
+            st.session_state.pop("batch_blob")
+            st.info("批次表單下載檔已過期，請重新產生（表單仍保存在 output 資料夾）")
+        elif batch_blob:
+            st.dataframe(pd.DataFrame(st.session_state["batch_summary"]), use_container_width=True)
+            st.download_button(
+                "📦 下載批次表單 (.zip)",
+                data=blob_store.reader(batch_blob),
+                file_name=ipqc_batch.BUNDLE_NAME,
+                mime="application/zip",
+                key="batch_download"
+            )
+
+
+with st.sidebar:
+    batch_section(dataset)
+
+# ========== 填寫判定結果與匯出 ==========
+# 編輯判定結果、填寫表頭時只重跑這個區塊
+@st.fragment(key="export_form")
+@ipqc_timing.fragment("export_form", session_id)
+def export_section(selected_model, selected_modules):
+    final_form = st.session_state.get('final_form')
+    if selected_modules and final_form is not None:
+        st.subheader("📄 填寫判定結果與匯出")
+
+        # 每次抽樣使用新的編輯器；session 只保存抽樣結果一次與判定結果的編輯紀錄
+        result_key = ipqc_edits.editor_key("result_edit", final_form.signature)
+        st.data_editor(
+            final_form.base,
+            key=result_key,
             use_container_width=True,
-            num_rows="dynamic"
+            column_config={
+                "判定結果": st.column_config.SelectboxColumn("判定結果", options=["", "OK", "NG", "N/A"])
+            },
+            disabled=final_form.base["項目"].str.contains("👇").fillna(False)  # 分隔列禁用編輯
+        )
+        final_form.sync(st.session_state.get(result_key))
+
+        with st.form("save_form"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                checker = st.selectbox("點檢人員", ["嚴瑋莉", "陳孟函", "羅文良", "鍾佳蓉"])
+            with col2:
+                supervisor = st.text_input("主管確認")
+            with col3:
+                project_no = st.text_input("專案序號")
+
+            checkedby = st.text_input("被點檢人員確認")
+            check_time = st.text_input("檢查時間", value=datetime.now().strftime("%Y-%m-%d %H:%M"))
+            submitted = st.form_submit_button("📤 匯出結果")
+
+            if submitted:
+                edited_df = final_form.frame()
+                # 匯出引擎：預設以範本填入（IPQC_EXPORT_MODE=build 改回完整建立），活頁簿只序列化一次
+                with ipqc_timing.span("export"), ipqc_memory.stage("export", session_id()):
+                    xlsx_bytes = ipqc_export.export_form(
+                        edited_df, selected_model, selected_modules,
+                        project_no=project_no, check_time=check_time,
+                        supervisor=supervisor, checkedby=checkedby, checker=checker,
+                        seed=st.session_state.get('sample_seed')
+                    )
+                ipqc_metrics.EXPORTS.inc(source="form")
+                filename = ipqc_export.export_filename(selected_model, selected_modules)
+                st.session_state['download_blob'] = blob_store.put(xlsx_bytes, filename)
+                st.success("✅ 匯出成功，請點選下方下載")
+
+                # ✅ 匯出完成後自動儲存至表單存放處（output 或同步資料夾；與下載共用同一份 bytes，加鎖並以改名寫入）
+                storage.archive.write(filename, xlsx_bytes)
+
+                # 判定結果同時附加到結果資料庫（NG 率等歷史查詢不必再開 xlsx）
+                try:
+                    with ipqc_timing.span("results"):
+                        ipqc_results.store().record(
+                            edited_df, selected_model, selected_modules, file=filename,
+                            checker=checker, supervisor=supervisor, checkedby=checkedby, project_no=project_no,
+                            check_time=check_time, seed=st.session_state.get('sample_seed'),
+                            row_modules=st.session_state.get('final_modules'), file_sha256=ipqc_results.file_hash(xlsx_bytes))
+                except Exception as e:
+                    st.warning("⚠️ 判定結果寫入資料庫失敗：" + str(e))
+
+                # 同步上傳到 OneDrive 歷史資料夾
+                if storage.history is not None:
+                    try:
+                        with ipqc_timing.span("graph_upload"):
+                            storage.history.write(filename, xlsx_bytes)
+                        st.success(f"✅ 匯出結果已上傳至{storage.history.label}")
+                    except Exception as e:
+                        st.warning("⚠️ 匯出後上傳到 OneDrive 失敗：" + str(e))
+    download_blob = st.session_state.get('download_blob')
+    if download_blob and not blob_store.exists(download_blob):
+        st.session_state.pop('download_blob')
+        st.info("下載檔已過期，請重新匯出（表單仍保存在 output 資料夾）")
+    elif download_blob:
+        st.download_button(
+            "📥 下載 Excel 檔案",
+            data=blob_store.reader(download_blob),
+            file_name=f"{selected_model}_{selected_modules}_IPQC填寫版_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime=download_blob["mime"]
         )
 
-        if not complaints_filtered.empty:
-            st.subheader("📂 客訴項目（可直接編輯）")
-            complaints_filtered = st.data_editor(
-                complaints_filtered[["項目", "規範", "方法", "重要性", "客訴編號", "判定結果"]],
-                key="complaint_edit",
-                use_container_width=True,
-                num_rows="dynamic"
-            )
-        else:
-            complaints_filtered = pd.DataFrame(columns=["項目", "規範", "方法", "重要性", "客訴編號", "判定結果"])
-            st.info("⚠️ 此模組尚無對應客訴資料")
-
-        # 存進 session
-        st.session_state["ipqc_data"] = filtered
-        st.session_state["complaint_data"] = complaints_filtered
-        
-        # 計算必出現與其他
-        merged_temp = pd.concat([filtered, complaints_filtered], ignore_index=True)
-        merged_temp["重要性"] = pd.to_numeric(merged_temp["重要性"], errors="coerce").fillna(0)
-        must_count = len(merged_temp[merged_temp["重要性"] >= 1])
-        other_count = len(merged_temp[merged_temp["重要性"] < 1])
-
-        # 顯示數量
-        st.write(f"✴️ 目前共 {len(merged_temp)} 筆項目可供抽樣（必出現：{must_count} 項，其餘：{other_count} 項）")
-        
-        sample_count = st.number_input(
-            "輸入欲抽樣的數量：",
-            min_value=1,
-            max_value=len(merged_temp),
-            value=min(5, len(merged_temp))
+
+# ========== 項目編輯器（項目多時改為伺服器端分頁） ==========
+# 分頁時只把目前頁面送到瀏覽器，篩選 / 排序在伺服器上對整份項目進行；
+# 頁面上的編輯寫回同一份編輯紀錄，筆數統計與抽樣仍以完整項目為準（篩選只影響顯示）。
+PAGED_THRESHOLD = int(os.environ.get("IPQC_EDITOR_PAGE_THRESHOLD", 300))
+PAGE_SIZES = [50, 100, 200, 500]
+
+def item_editor(grid, prefix, signature):
+    view_key = lambda name: ipqc_edits.editor_key(f"{prefix}_{name}", signature)
+    paged = st.toggle("分頁編輯", value=len(grid.base) > PAGED_THRESHOLD, key=view_key("paged"),
+                      help=f"超過 {PAGED_THRESHOLD} 筆時預設開啟，只傳送目前頁面")
+    query, column, sort_by, ascending, page, page_size = "", None, None, True, 1, None
+    if paged:
+        columns = list(grid.base.columns)
+        col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 1, 1])
+        query = col1.text_input("篩選關鍵字", key=view_key("query")).strip()
+        column = col2.selectbox("篩選欄位", [None] + columns, key=view_key("column"),
+                                format_func=lambda c: "全部欄位" if c is None else c)
+        sort_by = col3.selectbox("排序", [None] + columns, key=view_key("sort"),
+                                 format_func=lambda c: "原始順序" if c is None else c)
+        ascending = not col4.toggle("遞減", key=view_key("desc"))
+        page_size = col5.selectbox("每頁", PAGE_SIZES, index=1, key=view_key("size"))
+        # 頁碼的 key 隨篩選條件改變，條件一變就回到第 1 頁
+        page_key = ipqc_edits.editor_key(f"{prefix}_page", (signature, query, column, sort_by, ascending, page_size))
+        page = st.session_state.get(page_key, 1)
+
+    positions, page_df, matched = grid.window(query, column, sort_by, ascending, page, page_size)
+    # 編輯器 key 隨確認次數改變：換頁 / 換條件後以新的頁面資料重新開始記錄
+    key = ipqc_edits.editor_key(prefix, (signature, grid.commits))
+    with ipqc_timing.span("data_editor"):
+        st.data_editor(
+            page_df,
+            key=key,
+            use_container_width=True,
+            num_rows="dynamic",
+            disabled=[ipqc_data.SOURCE_COLUMN, ipqc_data.MODULE_COLUMN]
         )
+        grid.sync_page(positions, st.session_state.get(key))
+
+    if paged:
+        pages = max(1, -(-matched // page_size))
+        col1, col2 = st.columns([1, 3])
+        col1.number_input("頁碼", min_value=1, max_value=pages, value=1, key=page_key)
+        col2.caption(f"第 {page} / {pages} 頁，符合條件 {matched} 筆（全部 {len(grid)} 筆）；換頁或變更條件時保留已編輯內容")
+
+
+# ========== 搜尋客訴 / 點檢項目，加入目前的項目池 ==========
+SEARCH_LIMIT = 50
+SEARCH_SCOPES = {None: "客訴與點檢項目", "complaint": "客訴", "inspection": "點檢項目"}
+
+
+def search_section(dataset, model, inspection_grid, complaint_grid):
+    # 全文搜尋不限目前選的模組；勾選的結果加入下方的點檢 / 客訴項目（已在項目池中的略過）
+    with st.expander("🔎 搜尋客訴 / 點檢項目（可加入目前的項目池）"):
+        col1, col2, col3 = st.columns([3, 2, 1])
+        query = col1.text_input("關鍵字（多個以空白或 / 分隔，例如：刮傷 / 異音）", key="search_query").strip()
+        scope = col2.selectbox("範圍", list(SEARCH_SCOPES), format_func=SEARCH_SCOPES.get, key="search_scope")
+        only_model = col3.checkbox("只看此機型", value=True, key="search_only_model")
+        if not query:
+            return
+
+        t0 = time.perf_counter()
+        with ipqc_timing.span("search"):
+            hits = dataset.search_index().search(query, models=[model] if only_model else None,
+                                                 kinds=[scope] if scope else None, limit=SEARCH_LIMIT)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if hits.empty:
+            st.info("沒有符合的客訴 / 點檢項目")
+            return
+        st.caption(f"依相關程度列出前 {len(hits)} 筆（搜尋 {elapsed:.1f} ms）")
+
+        table = hits[["機型", "模組", "客訴編號", "內容", "符合欄位", "來源分頁", "建立日期"]].copy()
+        table.insert(0, "類別", hits["kind"].map(ipqc_search.KINDS))
+        table.insert(0, "加入", False)
+        # 加入後換一個編輯器，勾選狀態重新開始
+        added = st.session_state.get("search_added", 0)
+        picked = st.data_editor(
+            table,
+            key=ipqc_edits.editor_key("search_hits", (query, scope, only_model, model, added)),
+            use_container_width=True,
+            hide_index=True,
+            disabled=[c for c in table.columns if c != "加入"]
+        )["加入"].to_numpy(dtype=bool)
+
+        if st.button("➕ 加入目前的項目池", disabled=not picked.any()):
+            counts = {}
+            for kind, grid in (("complaint", complaint_grid), ("inspection", inspection_grid)):
+                rows = dataset.hit_items(hits[picked], kind)
+                if rows.empty:
+                    continue
+                current = grid.frame()
+                existing = set(zip(current["項目"].astype(str), current["客訴編號"].astype(str),
+                                   current[ipqc_data.MODULE_COLUMN].astype(str)))
+                keys = zip(rows["項目"].astype(str), rows["客訴編號"].astype(str), rows[ipqc_data.MODULE_COLUMN].astype(str))
+                new = rows[[key not in existing for key in keys]]
+                if len(new):
+                    grid.append(new.to_dict("records"))
+                counts[kind] = (len(new), len(rows) - len(new))
+            st.session_state["search_added"] = added + 1
+            st.success("✅ " + "；".join(f"{ipqc_search.KINDS[k]}加入 {n} 筆" + (f"（{dup} 筆已在項目池中）" if dup else "")
+                                        for k, (n, dup) in counts.items()))
+
+
+# ========== 選擇機型 / 模組、編輯項目與抽樣 ==========
+@st.fragment(key="editors")
+@ipqc_timing.fragment("editors", session_id)
+def editor_section(dataset):
+    models = dataset.models()
+    selected_model = st.selectbox("選擇機型", models)
+
+    if selected_model:
+        # 建立模組清單，加入「全部項目」
+        modules = dataset.modules(selected_model)
+        modules_with_all = [ipqc_data.ALL_MODULES] + modules
+
+        # 改用 multiselect 可複選模組
+        selected_modules_raw = st.multiselect("選擇模組（可複選）", modules_with_all)
+
+        # 判斷是否選了「全部項目」
+        selected_modules = dataset.resolve_modules(selected_model, selected_modules_raw)
+
+        # 檢查是否有選模組，開始處理資料
+        if selected_modules:
+            # 點檢 / 客訴項目的基底資料每個（機型, 模組）組合只取一次，session 中只另存編輯紀錄
+            signature = (selected_model, tuple(selected_modules))
+            grids = st.session_state.get("item_grids")
+            if grids is None or grids["signature"] != signature:
+                with ipqc_timing.span("filter"):
+                    grids = {
+                        "signature": signature,
+                        "inspection": ipqc_edits.EditedFrame(
+                            dataset.inspection_items(selected_model, selected_modules)[ipqc_data.POOL_COLUMNS]),
+                        "complaint": ipqc_edits.EditedFrame(
+                            dataset.complaint_items(selected_model, selected_modules)[ipqc_data.POOL_COLUMNS]),
+                    }
+                st.session_state["item_grids"] = grids
+            inspection_grid, complaint_grid = grids["inspection"], grids["complaint"]
+
+            # 搜尋結果加入項目池後，下方的編輯器在同一次重跑中就顯示新增的列
+            search_section(dataset, selected_model, inspection_grid, complaint_grid)
+
+            st.subheader("📋 點檢項目（可直接編輯）")
+            item_editor(inspection_grid, "ipqc_edit", signature)
+
+            if len(complaint_grid):
+                st.subheader("📂 客訴項目（可直接編輯）")
+                item_editor(complaint_grid, "complaint_edit", signature)
+            else:
+                st.info("⚠️ 此模組尚無對應客訴資料")
 
-        if st.button("🔍 執行抽樣"):
-            merged_all = pd.concat([st.session_state["ipqc_data"], st.session_state["complaint_data"]], ignore_index=True)
-            merged_all["重要性"] = pd.to_numeric(merged_all["重要性"], errors="coerce").fillna(0)
+            # 計算必出現與其他（由編輯紀錄增減，不必合併整張表）
+            total_count, must_count = ipqc_edits.pool_counts(inspection_grid, complaint_grid)
+            other_count = total_count - must_count
 
-            fixed = merged_all[merged_all['重要性'] >= 1]
-            remaining = merged_all[merged_all['重要性'] < 1]
+            # 顯示數量
+            st.write(f"✴️ 目前共 {total_count} 筆項目可供抽樣（必出現：{must_count} 項，其餘：{other_count} 項）")
 
-            remain_count = sample_count - len(fixed)
-            if remain_count > 0:
-                weights = remaining['重要性'].tolist()
-                sampled = remaining.sample(n=remain_count, weights=weights) if not remaining.empty else pd.DataFrame()
-                combined = pd.concat([fixed, sampled])
-            else:
-                combined = fixed.sample(n=sample_count)
-
-            # 區分客訴
-            df_normal = combined[combined["客訴編號"].astype(str).str.strip() == ""].copy()
-            df_complaint = combined[combined["客訴編號"].astype(str).str.strip() != ""].copy()
-
-            df_normal = df_normal.reset_index(drop=True)
-            df_normal["項次"] = range(1, len(df_normal)+1)
-            df_complaint = df_complaint.reset_index(drop=True)
-            df_complaint["項次"] = range(len(df_normal)+2, len(df_normal)+2+len(df_complaint))
-
-            separator_row = pd.DataFrame([{
-                "項次": "",
-                "項目": "👇 以下為客訴相關項目 👇",
-                "規範": "",
-                "方法": "",
-                "重要性": "",
-                "客訴編號": "",
-                "判定結果": ""
-            }])
-
-            final_df = pd.concat([df_normal, separator_row, df_complaint], ignore_index=True)
-            st.session_state['final_df'] = final_df
-            st.success(f"✅ 抽樣完成！共 {len(df_normal)+len(df_complaint)} 筆，可開始填寫判定結果")
-        
-        # ========== 填寫判定結果與匯出 ==========
-        if 'final_df' in st.session_state:
-            st.subheader("📄 填寫判定結果與匯出")
-        
-            edited_df = st.data_editor(
-                st.session_state['final_df'][["項次", "項目", "規範", "方法", "重要性", "客訴編號", "判定結果"]],
-                use_container_width=True,
-                column_config={
-                    "判定結果": st.column_config.SelectboxColumn("判定結果", options=["", "OK", "NG", "N/A"])
-                },
-                disabled=st.session_state['final_df']["項目"].str.contains("👇").fillna(False)  # 分隔列禁用編輯
+            sample_count = st.number_input(
+                "輸入欲抽樣的數量：",
+                min_value=1,
+                max_value=max(total_count, 1),
+                value=min(5, max(total_count, 1))
             )
-        
-            with st.form("save_form"):
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    checker = st.selectbox("點檢人員", ["嚴瑋莉", "陳孟函", "羅文良", "鍾佳蓉"])
-                with col2:
-                    supervisor = st.text_input("主管確認")
-                with col3:
-                    project_no = st.text_input("專案序號")
-        
-                checkedby = st.text_input("被點檢人員確認")
-                check_time = st.text_input("檢查時間", value=datetime.now().strftime("%Y-%m-%d %H:%M"))
-                submitted = st.form_submit_button("📤 匯出結果")
-        
-                if submitted:
-                    from openpyxl.styles import Alignment, PatternFill
-                    from openpyxl.utils import get_column_letter
-                    from openpyxl.worksheet.table import Table, TableStyleInfo
-                    
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "IPQC點檢"
-                    
-                    # === 表頭 ===
-                    from openpyxl.styles import Font
-
-                    ws["A1"] = "IPQC重點點檢表"
-                    ws.merge_cells("A1:H1")
-                    ws["A1"].font = Font(bold=True, size=14)
-                    
-                    ws["A2"] = f"機型: {selected_model}    模組: {'/'.join(selected_modules) if isinstance(selected_modules, list) else selected_modules}"
-                    ws.merge_cells("A2:H2")
-                    ws["A2"].font = Font(bold=True, size=12)
-                    
-                    ws["A3"] = f"專案序號: {project_no}    檢查時間: {check_time}"
-                    ws.merge_cells("A3:H3")
-                    ws["A3"].font = Font(bold=True, size=12)
-                    
-                    # === 寫入表格 ===
-                    headers = [str(col) for col in edited_df.columns]
-
-                    from openpyxl.styles import PatternFill, Border, Side, Alignment
-
-                    # 黑色粗邊框
-                    thick_border = Border(
-                        left=Side(style="medium", color="000000"),
-                        right=Side(style="medium", color="000000"),
-                        top=Side(style="medium", color="000000"),
-                        bottom=Side(style="medium", color="000000")
-                    )
-                    
-                    # 標題列樣式
-                    header_fill = PatternFill("solid", fgColor="DDEBF7")
-                    header_font = Font(bold=True)
-                    headers = [str(col) for col in edited_df.columns]
-                   
-                    # === 表頭列樣式 ===
-                    headers = [str(col) for col in edited_df.columns]
-                    start_row = 4
-                    for col_num, col_name in enumerate(headers, start=1):
-                        cell = ws.cell(row=start_row, column=col_num, value=col_name)
-                        cell.font = Font(bold=True, size=12)
-                        cell.fill = PatternFill("solid", fgColor="DDEBF7")
-                        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-                        cell.border = Border(
-                            left=Side(style="medium"),
-                            right=Side(style="medium"),
-                            top=Side(style="medium"),
-                            bottom=Side(style="medium")
-                        )
-                        
-                    # === 寫入資料列（同時移除「以下為客訴相關項目」標題列，並取消底色） ==
-                    filtered_rows = [
-                        row for row in edited_df.values.tolist()
-                        if any(pd.notna(cell) and str(cell).strip() != "" for cell in row)
-                        and "以下為客訴相關項目" not in " ".join([str(cell) for cell in row if pd.notna(cell)])
-                    ]
-                    
-                    # 重新編號項次欄（第一欄）
-                    for idx, row in enumerate(filtered_rows, start=1):
-                        row[0] = idx  # 項次欄重新編號（index 0）
-                        for j, val in enumerate(row, start=1):
-                            cell = ws.cell(row=start_row + idx, column=j, value=val)
-                            cell.border = Border(
-                                left=Side(style="medium"),
-                                right=Side(style="medium"),
-                                top=Side(style="medium"),
-                                bottom=Side(style="medium")
-                            )
-                            cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-
-                    # === 建立 Excel 樣式表格 ===
-                    start_row = 4
-                    end_row = ws.max_row
-                    end_col_letter = get_column_letter(len(headers))
-                    table = Table(displayName="IPQCTable", ref=f"A{start_row}:{end_col_letter}{end_row}")
-                    style = TableStyleInfo(name="TableStyleMedium9", showRowStripes=False, showColumnStripes=False)
-                    table.tableStyleInfo = style
-                    ws.add_table(table)
-                    
-                    # === 統計資訊 ===
-                    判定結果列表 = edited_df['判定結果'].dropna().tolist()
-                    有效筆數 = len([r for r in 判定結果列表 if str(r).strip()])
-                    NG筆數 = 判定結果列表.count("NG")
-                    異常百分比 = (NG筆數 / 有效筆數) * 100 if 有效筆數 > 0 else 0
-                    
-                    try:
-                        判定結果_col = list(edited_df.columns).index("判定結果") + 1
-                    except ValueError:
-                        判定結果_col = len(edited_df.columns)
-                    
-                    stats_col = 判定結果_col + 6
-                    stats_row = start_row
-                    
-                    ws.cell(row=stats_row, column=stats_col, value="統計資訊").font = Font(bold=True)
-                    ws.cell(row=stats_row, column=stats_col).fill = PatternFill("solid", fgColor="DDEBF7")
-                    ws.cell(row=stats_row, column=stats_col).border = Border(
-                        left=Side(style="medium"),
-                        right=Side(style="medium"),
-                        top=Side(style="medium"),
-                        bottom=Side(style="medium")
-                    )
-                    ws.cell(row=stats_row, column=stats_col).alignment = Alignment(horizontal="center", vertical="center")
-                    
-                    stats = [
-                        f"1. NG 異常率: {異常百分比:.2f}%",
-                        f"2. 異常數: {NG筆數}",
-                        f"3. 有效總數: {有效筆數}"
-                    ]
-                    for i, text in enumerate(stats, start=1):
-                        cell = ws.cell(row=stats_row + i, column=stats_col, value=text)
-                        cell.border = Border(
-                            left=Side(style="medium"),
-                            right=Side(style="medium"),
-                            top=Side(style="medium"),
-                            bottom=Side(style="medium")
-                        )
-                        cell.alignment = Alignment(horizontal="left", vertical="center")
-
-                   # ✅ 主管 / 被點檢人員 / 點檢人員 各自獨立欄位
-                    ws.append([])
-                    confirm_row = ws.max_row + 3
-                    ws.merge_cells(start_row=confirm_row, start_column=1, end_row=confirm_row, end_column=8)
-                    ws.cell(row=confirm_row, column=1, value=f"主管確認: {supervisor}        被點檢人員確認: {checkedby}        點檢人員: {checker}")
-                    ws.cell(row=confirm_row, column=1).font = Font(bold=True, size=12)
-                    
-                    # === 自動調整欄寬 ===
-                    for col in ws.columns:
-                        max_len = 0
-                        col_letter = get_column_letter(col[0].column)
-                        for cell in col:
-                            if cell.value:
-                                max_len = max(max_len, len(str(cell.value)))
-                        
-                        # 自動寬度 + 限制最大長度（例如 20）
-                        adjusted_width = min(max_len + 2, 30)
-                    
-                        # 額外針對「項次」欄（A欄）強制設短寬度
-                        if col_letter == "A":
-                            ws.column_dimensions[col_letter].width = 6
-                        else:
-                            ws.column_dimensions[col_letter].width = adjusted_width
-                    # === 儲存為下載檔 ===
-                    bio = io.BytesIO()
-                    wb.save(bio)
-                    st.session_state['download_ready'] = True
-                    st.session_state['download_data'] = bio.getvalue()
-                    st.success("✅ 匯出成功，請點選下方下載")
-
-                    # ✅ 匯出完成後自動儲存至 output 資料夾（放在 wb.save(bio) 後）
-                    # ✅ 儲存為下載檔，並使用西元日期、不包含時間
-                    bio = io.BytesIO()
-                    wb.save(bio)
-                    
-                    now = datetime.now()
-                    date_str = now.strftime('%Y%m%d')  # 只保留西元日期
-                    filename = f"{selected_model}_{'_'.join(selected_modules)}_{date_str}_IPQC填寫版.xlsx"
-                    save_path = os.path.join("output", filename)
-                    os.makedirs("output", exist_ok=True)
-                    with open(save_path, "wb") as f:
-                        f.write(bio.getvalue()) 
-                        
-                        # 同步上傳到 OneDrive 歷史資料夾
-                        try:
-                            site_id = get_cached_site_id()
-                            history_folder = _get_secret("history_folder") or "Shared Documents/IPQC_歷史資料"
-                            upload_bytes_to_folder(site_id, history_folder, filename, bio.getvalue())
-                            st.success("✅ 匯出結果已上傳至公司 OneDrive（歷史資料）")
-                        except Exception as e:
-                            st.warning("⚠️ 匯出後上傳到 OneDrive 失敗：" + str(e))
-
-        if st.session_state.get('download_ready', False):
-            st.download_button(
-                "📥 下載 Excel 檔案",
-                data=st.session_state['download_data'],
-                file_name=f"{selected_model}_{selected_modules}_IPQC填寫版_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            )
\ No newline at end of file
+            seed_text = st.text_input("亂數種子（可留空，自動產生並記錄在匯出檔）", key="sample_seed_text")
+
+            # 分層抽樣：每一層（來源分頁 / 客訴與一般 / 重要性層級）至少抽到一項
+            strata = st.multiselect(
+                "分層抽樣（可留空，維持原本的加權抽樣）",
+                list(ipqc_sampling.STRATA),
+                format_func=lambda k: ipqc_sampling.STRATA[k],
+                key="sample_strata"
+            )
+            if strata:
+                with st.expander("📊 各層預期涵蓋率"):
+                    merged_temp = ipqc_data.item_pool(inspection_grid.frame(), complaint_grid.frame())
+                    st.caption(f"每層至少一項所需的最少抽樣數：{ipqc_sampling.min_full_coverage(merged_temp, strata)}")
+                    st.dataframe(ipqc_sampling.coverage_report(merged_temp, sample_count, strata),
+                                 use_container_width=True, hide_index=True)
+
+            # 依近期 NG 調整：近期常 NG 的項目權重提高（判定結果資料庫中的衰減計數，必出現項目不受影響）
+            adaptive = st.checkbox(
+                f"依近期 NG 紀錄提高權重（半衰期 {ipqc_results.NG_HALF_LIFE:g} 天）",
+                key="sample_adaptive"
+            )
+
+            if st.button("🔍 執行抽樣"):
+                # 只有抽樣時才套用編輯紀錄產生完整項目池
+                with ipqc_timing.span("sampling"), ipqc_memory.stage("sample", session_id()):
+                    merged_all = ipqc_data.item_pool(inspection_grid.frame(), complaint_grid.frame())
+                    seed = ipqc_sampling.resolve_seed(seed_text.strip() if seed_text.strip().isdigit() else None)
+                    st.session_state['sample_seed'] = seed
+                    ng_rate, ng_items = None, 0
+                    if adaptive:
+                        history = ipqc_results.store().pool_history(merged_all, selected_model)
+                        ng_rate = ipqc_sampling.recent_ng_rate(history)
+                        ng_items = int((history["ng"] > 0.01).sum())
+                    combined = ipqc_sampling.sample(merged_all, sample_count, seed=seed, strata=strata, ng_rate=ng_rate)
+
+                    # 區分客訴並加入分隔列；每列的模組另外保存，匯出時寫入判定結果資料庫
+                    layout = ipqc_data.layout_form(combined)
+                    final_df = layout[ipqc_data.FORM_COLUMNS]
+                st.session_state['final_modules'] = layout[ipqc_data.MODULE_COLUMN].fillna("").tolist()
+                serial = st.session_state.get("sample_serial", 0) + 1
+                st.session_state["sample_serial"] = serial
+                st.session_state['final_form'] = ipqc_edits.EditedFrame(final_df, signature=serial)
+                st.success(f"✅ 抽樣完成！共 {len(combined)} 筆（抽樣種子：{seed}），可開始填寫判定結果")
+                if adaptive:
+                    st.caption(f"項目池中近期有 NG 紀錄的項目：{ng_items} 項")
+
+        export_section(selected_model, selected_modules)
+
+
+editor_section(dataset)
+
+
+# ========== 管理員面板：重跑分段耗時 ==========
+def timing_panel():
+    with st.expander("⏱️ 重跑分段耗時（管理員）", expanded=False):
+        if not ipqc_timing.ENABLED:
+            st.info("尚未啟用計時：以環境變數 IPQC_TIMING=1 啟動後即開始記錄")
+            return
+        recs = ipqc_timing.records()
+        only_mine = st.checkbox("只看目前 session", key="timing_only_mine")
+        if only_mine:
+            recs = [r for r in recs if r["session"] == session_id()]
+        st.caption(f"最近 {len(recs)} 次重跑（session：{session_id()}；記錄檔：{ipqc_timing.LOG_PATH if ipqc_timing.WRITE_LOG else '未寫檔'}）")
+        st.dataframe(ipqc_timing.stage_stats(recs), use_container_width=True, hide_index=True)
+        if recs:
+            st.json(recs[-1], expanded=False)
+
+
+# ========== 管理員面板：記憶體分析 ==========
+def memory_panel():
+    with st.expander("🧠 記憶體分析（管理員）", expanded=False):
+        # 執行中開關，不必重新啟動；開啟期間 Python 配置會變慢，查完請關閉
+        on = st.toggle("開啟記憶體分析（tracemalloc）", value=ipqc_memory.enabled(), key="memory_profiling")
+        if on != ipqc_memory.enabled():
+            ipqc_memory.enable(on)
+        st.caption(f"目前 RSS：{ipqc_memory.rss() / 2 ** 20:.1f} MB；下載暫存區：{blob_store.usage()['bytes'] / 2 ** 20:.1f} MB")
+
+        recs = ipqc_memory.records()
+        if recs:
+            st.dataframe(ipqc_memory.summary(recs), use_container_width=True, hide_index=True)
+            labels = [f"{i}. {r['time']} {r['stage']}（{r['session']}）" for i, r in enumerate(recs)]
+            picked = st.selectbox("配置最多的位置", range(len(recs)), index=len(recs) - 1,
+                                  format_func=lambda i: labels[i], key="memory_record")
+            st.dataframe(pd.DataFrame(recs[picked]["top"]), use_container_width=True, hide_index=True)
+            if st.button("清除紀錄", key="memory_clear"):
+                ipqc_memory.clear()
+        elif on:
+            st.info("已開啟：執行載入、抽樣、匯出或批次產生後會在此顯示各階段的記憶體變化")
+
+        # 目前 session 中保存的資料量（編輯表格、抽樣結果、下載 handle 等）
+        sizes = [(k, ipqc_memory.sizeof(v)) for k, v in st.session_state.items()]
+        sizes = pd.DataFrame(sizes, columns=["session 項目", "bytes"]).sort_values("bytes", ascending=False)
+        st.dataframe(sizes.head(15), use_container_width=True, hide_index=True)
+
+
+if is_admin():
+    with st.sidebar:
+        timing_panel()
+        memory_panel()
+
+ipqc_timing.end()